@@ -0,0 +1,143 @@
+# backend/answer_cache.py
+
+import json
+import math
+import operator
+import os
+import sqlite3
+import threading
+import time
+from array import array
+
+# 노트 채팅 답변 캐시 파일
+ANSWER_CACHE_PATH = os.getenv("ANSWER_CACHE_PATH", "answer_cache.db")
+ANSWER_CACHE_ENABLED = os.getenv("ANSWER_CACHE_ENABLED", "true").lower() == "true"
+# 새 질문과 캐시된 질문의 임베딩 코사인 유사도가 이 값 이상이면 저장된 답변을 재생합니다.
+ANSWER_CACHE_SIMILARITY_THRESHOLD = float(os.getenv("ANSWER_CACHE_SIMILARITY_THRESHOLD", "0.95"))
+# 노트당 보관할 최대 답변 수. 초과하면 가장 오래 사용하지 않은 답변부터 삭제합니다.
+ANSWER_CACHE_MAX_PER_NOTE = int(os.getenv("ANSWER_CACHE_MAX_PER_NOTE", "200"))
+
+
+def _normalize(vector: list[float]) -> array:
+    norm = math.sqrt(sum(value * value for value in vector)) or 1.0
+    return array("f", (value / norm for value in vector))
+
+
+class AnswerCache:
+    """
+    노트별로 (질문 임베딩, 답변 이벤트 목록)을 SQLite에 저장하는 의미 기반 답변 캐시입니다.
+    노트에 소스가 추가되면 노트의 내용 버전이 올라가고 이전 버전의 답변은 삭제됩니다.
+    """
+
+    def __init__(self, path: str = ANSWER_CACHE_PATH, threshold: float = ANSWER_CACHE_SIMILARITY_THRESHOLD,
+                 max_per_note: int = ANSWER_CACHE_MAX_PER_NOTE):
+        self.path = path
+        self.threshold = threshold
+        self.max_per_note = max_per_note
+        self.hits = 0
+        self.misses = 0
+        self.saved_ms = 0.0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS answers ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT, note_id INTEGER NOT NULL, version INTEGER NOT NULL,"
+            " question TEXT NOT NULL, vector BLOB NOT NULL, events TEXT NOT NULL, latency_ms REAL NOT NULL,"
+            " last_used REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS ix_answers_note ON answers (note_id, version)")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS note_versions (note_id INTEGER PRIMARY KEY, version INTEGER NOT NULL)")
+        self._conn.commit()
+
+    def _note_version(self, note_id: int) -> int:
+        row = self._conn.execute("SELECT version FROM note_versions WHERE note_id = ?", (note_id,)).fetchone()
+        return row[0] if row else 0
+
+    def lookup(self, note_id: int, question_vector: list[float]) -> tuple[list[str] | None, int]:
+        """
+        (답변 이벤트 목록, 노트의 내용 버전)을 반환합니다. 가장 비슷한 캐시된 질문이 임계값보다 낮으면 이벤트 목록은 None입니다.
+        캐시되지 않은 질문의 답변은 이 버전과 함께 store에 넘깁니다.
+        """
+        started = time.perf_counter()
+        query = _normalize(question_vector)
+        with self._lock:
+            version = self._note_version(note_id)
+            rows = self._conn.execute(
+                "SELECT id, vector, events, latency_ms FROM answers WHERE note_id = ? AND version = ?", (note_id, version)
+            ).fetchall()
+            best = None
+            for entry_id, blob, events, latency_ms in rows:
+                if len(blob) != len(query) * query.itemsize:
+                    # 임베딩 백엔드가 바뀌어 차원이 다른 항목은 비교하지 않습니다.
+                    continue
+                similarity = sum(map(operator.mul, query, array("f", blob)))
+                if similarity >= self.threshold and (best is None or similarity > best[0]):
+                    best = (similarity, entry_id, events, latency_ms)
+            if best is None:
+                self.misses += 1
+                return None, version
+            _, entry_id, events, latency_ms = best
+            self._conn.execute("UPDATE answers SET last_used = ? WHERE id = ?", (time.time(), entry_id))
+            self._conn.commit()
+            self.hits += 1
+            self.saved_ms += max(0.0, latency_ms - (time.perf_counter() - started) * 1000)
+        return json.loads(events), version
+
+    def store(self, note_id: int, version: int, question: str, question_vector: list[float], events: list[str],
+              latency_ms: float):
+        """
+        답변을 저장합니다. version은 검색 전에 lookup이 반환한 내용 버전이며,
+        답변을 만드는 동안 소스가 바뀌어 버전이 올라갔으면 이전 내용으로 만든 답변이므로 저장하지 않습니다.
+        """
+        with self._lock:
+            if self._note_version(note_id) != version:
+                return
+            self._conn.execute(
+                "INSERT INTO answers (note_id, version, question, vector, events, latency_ms, last_used) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (note_id, version, question, _normalize(question_vector).tobytes(), json.dumps(events), latency_ms, time.time())
+            )
+            self._conn.execute(
+                "DELETE FROM answers WHERE note_id = ? AND id NOT IN ("
+                " SELECT id FROM answers WHERE note_id = ? ORDER BY last_used DESC LIMIT ?)",
+                (note_id, note_id, self.max_per_note)
+            )
+            self._conn.commit()
+
+    def invalidate_note(self, note_id: int):
+        """노트의 내용 버전을 올리고 이전 답변을 삭제합니다. 소스가 추가되거나 삭제될 때 호출합니다."""
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO note_versions (note_id, version) VALUES (?, 1)"
+                " ON CONFLICT(note_id) DO UPDATE SET version = version + 1",
+                (note_id,)
+            )
+            self._conn.execute("DELETE FROM answers WHERE note_id = ?", (note_id,))
+            self._conn.commit()
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM answers").fetchone()[0]
+        lookups = self.hits + self.misses
+        return {
+            "entries": entries,
+            "threshold": self.threshold,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "saved_ms_total": round(self.saved_ms, 1),
+            "saved_ms_per_hit": round(self.saved_ms / self.hits, 1) if self.hits else 0.0,
+        }
+
+
+_cache: AnswerCache | None = None
+_cache_lock = threading.Lock()
+
+
+def get_answer_cache() -> AnswerCache:
+    """프로세스에서 공유하는 답변 캐시를 반환합니다."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = AnswerCache()
+        return _cache
@@ -1,6 +1,9 @@
+from collections import OrderedDict
 from datetime import datetime, timedelta, timezone
 from typing import Optional
 import os
+import threading
+import time
 
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
@@ -9,7 +12,8 @@ from sqlalchemy.orm import Session
 from passlib.context import CryptContext
 
 from . import crud, models, schemas
-from .database import SessionLocal
+from .database import get_db
+from .executor_handler import password_executor
 
 # --- 설정 ---
 SECRET_KEY = os.getenv("SECRET_KEY")
@@ -18,16 +22,36 @@ if not SECRET_KEY:
 
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
+# 토큰 subject별로 확인한 사용자를 메모리에 보관하는 시간(초)과 최대 수 (0이면 캐시하지 않음)
+USER_CACHE_TTL_SECONDS = float(os.getenv("USER_CACHE_TTL_SECONDS", "60"))
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", "10000"))
+# bcrypt 작업 계수(2^rounds회 반복). 바꾸면 다른 계수로 저장된 해시는 다음 로그인 때 새 계수로 다시 해싱됩니다.
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+pwd_context = CryptContext(
+    schemes=["bcrypt"], deprecated="auto",
+    bcrypt__rounds=BCRYPT_ROUNDS, bcrypt__min_rounds=BCRYPT_ROUNDS, bcrypt__max_rounds=BCRYPT_ROUNDS,
+)
 
 # --- 함수 ---
 
 def verify_password(plain_password, hashed_password):
     return pwd_context.verify(plain_password, hashed_password)
 
+# bcrypt는 한 번에 수백 ms의 CPU를 사용하므로 이벤트 루프가 아닌 password_executor에서 실행합니다.
+# 대기열이 가득 차면 ExecutorBusyError가 발생합니다.
+
+async def hash_password(plain_password: str) -> str:
+    return await password_executor.run(pwd_context.hash, plain_password)
+
+async def verify_and_update_password(plain_password: str, hashed_password: str) -> tuple[bool, Optional[str]]:
+    """
+    비밀번호를 검증하고, 해시 설정(BCRYPT_ROUNDS 등)이 바뀌었으면 새 설정으로 만든 해시도 함께 반환합니다.
+    """
+    return await password_executor.run(pwd_context.verify_and_update, plain_password, hashed_password)
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
     if expires_delta:
@@ -38,30 +62,97 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-# --- 의존성 함수 ---
+# --- 사용자 캐시 ---
+# 요청마다 같은 사용자를 DB에서 다시 확인하지 않도록, 토큰 subject(사용자 이름)별로 짧은 시간 보관합니다.
+# 캐시에는 id와 사용자 이름만 담은 schemas.User를 넣으며, 세션에 묶인 ORM 객체는 보관하지 않습니다.
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+_user_cache: OrderedDict[str, tuple[float, schemas.User]] = OrderedDict()
+_user_cache_lock = threading.Lock()
+
+
+def _cached_user(username: str, user_id: Optional[int]) -> Optional[schemas.User]:
+    with _user_cache_lock:
+        entry = _user_cache.get(username)
+        if entry is None:
+            return None
+        expires_at, user = entry
+        if expires_at < time.monotonic():
+            del _user_cache[username]
+            return None
+        _user_cache.move_to_end(username)
+    # 같은 이름으로 다시 가입한 사용자 등 토큰의 uid와 다르면 DB에서 다시 확인합니다.
+    if user_id is not None and user.id != user_id:
+        return None
+    return user
+
+def _cache_user(db_user: models.User) -> schemas.User:
+    user = schemas.User(id=db_user.id, username=db_user.username)
+    if USER_CACHE_TTL_SECONDS <= 0:
+        return user
+    with _user_cache_lock:
+        _user_cache[user.username] = (time.monotonic() + USER_CACHE_TTL_SECONDS, user)
+        _user_cache.move_to_end(user.username)
+        while len(_user_cache) > USER_CACHE_SIZE:
+            _user_cache.popitem(last=False)
+    return user
 
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
-    credentials_exception = HTTPException(
+def forget_user(username: str):
+    """사용자 정보가 바뀌거나 삭제되었을 때 캐시에서 제거합니다."""
+    with _user_cache_lock:
+        _user_cache.pop(username, None)
+
+def clear_user_cache():
+    with _user_cache_lock:
+        _user_cache.clear()
+
+# --- 의존성 함수 ---
+
+def _credentials_exception():
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+
+def _decode_token(token: str) -> schemas.TokenData:
+    """토큰을 검증하고 subject(사용자 이름)와 uid 클레임을 반환합니다. uid가 없는 이전 토큰도 허용합니다."""
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         username: str = payload.get("sub")
         if username is None:
-            raise credentials_exception
-        token_data = schemas.TokenData(username=username)
+            raise _credentials_exception()
+        user_id = payload.get("uid")
+        return schemas.TokenData(username=username, user_id=user_id if isinstance(user_id, int) else None)
     except JWTError:
-        raise credentials_exception
-    user = crud.get_user_by_username(db, username=token_data.username)
-    if user is None:
-        raise credentials_exception
-    return user
+        raise _credentials_exception()
+
+def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> schemas.User:
+    """
+    캐시에 있으면 DB를 조회하지 않습니다. 반환하는 사용자는 id와 사용자 이름만 담은 schemas.User입니다.
+    """
+    token_data = _decode_token(token)
+    user = _cached_user(token_data.username, token_data.user_id)
+    if user is not None:
+        return user
+    db_user = crud.get_user_by_username(db, username=token_data.username)
+    if db_user is None or (token_data.user_id is not None and db_user.id != token_data.user_id):
+        raise _credentials_exception()
+    return _cache_user(db_user)
+
+def get_current_note(note_id: int, token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> models.LearningNote:
+    """
+    경로의 note_id가 현재 사용자의 노트인지 확인하고 노트를 반환합니다.
+    사용자가 캐시에 있으면 노트만, 없으면 사용자와 노트를 한 번의 쿼리로 읽습니다.
+    """
+    token_data = _decode_token(token)
+    user = _cached_user(token_data.username, token_data.user_id)
+    if user is not None:
+        db_note = crud.get_note(db, note_id=note_id, user_id=user.id)
+    else:
+        db_user, db_note = crud.get_user_with_note(db, username=token_data.username, note_id=note_id)
+        if db_user is None or (token_data.user_id is not None and db_user.id != token_data.user_id):
+            raise _credentials_exception()
+        _cache_user(db_user)
+    if db_note is None:
+        raise HTTPException(status_code=404, detail="노트를 찾을 수 없습니다.")
+    return db_note
@@ -0,0 +1,118 @@
+# backend/benchmarks/bench_auth_overhead.py
+"""
+보호된 엔드포인트가 요청마다 인증/권한 확인에 쓰는 시간과 SQL 쿼리 수를 비교합니다.
+- legacy: 변경 전 방식 (토큰 디코드, 사용자 이름으로 사용자 조회, 노트 조회)
+- miss: auth.get_current_note에서 사용자가 캐시에 없을 때 (사용자 + 노트를 한 번의 쿼리로 조회)
+- cached: auth.get_current_note에서 사용자가 캐시에 있을 때 (노트만 조회)
+- user-only: 노트가 없는 엔드포인트의 auth.get_current_user (legacy는 매번 사용자 조회, cached는 조회 없음)
+임시 SQLite 파일을 사용합니다.
+
+실행: python -m backend.benchmarks.bench_auth_overhead --requests 5000 (저장소 루트에서)
+"""
+
+import argparse
+import os
+import tempfile
+import time
+from datetime import timedelta
+
+os.environ.setdefault("SECRET_KEY", "bench-secret")
+
+from fastapi import HTTPException
+from jose import JWTError, jwt
+from sqlalchemy import event
+from sqlalchemy.orm import sessionmaker
+
+from backend import auth, crud, models
+from backend.database import Base, create_db_engine
+
+
+def legacy_get_current_user(token: str, db):
+    """변경 전 auth.get_current_user와 같은 순서로 확인합니다."""
+    try:
+        payload = jwt.decode(token, auth.SECRET_KEY, algorithms=[auth.ALGORITHM])
+    except JWTError:
+        raise HTTPException(status_code=401)
+    user = crud.get_user_by_username(db, username=payload.get("sub"))
+    if user is None:
+        raise HTTPException(status_code=401)
+    return user
+
+def legacy_get_note(note_id: int, token: str, db):
+    user = legacy_get_current_user(token, db)
+    db_note = crud.get_note(db, note_id=note_id, user_id=user.id)
+    if db_note is None:
+        raise HTTPException(status_code=404)
+    return db_note
+
+def cached_get_note(note_id: int, token: str, db):
+    return auth.get_current_note(note_id, token=token, db=db)
+
+def miss_get_note(note_id: int, token: str, db):
+    auth.clear_user_cache()
+    return auth.get_current_note(note_id, token=token, db=db)
+
+CASES = {
+    "note legacy": legacy_get_note,
+    "note miss": miss_get_note,
+    "note cached": cached_get_note,
+    "user-only legacy": lambda note_id, token, db: legacy_get_current_user(token, db),
+    "user-only cached": lambda note_id, token, db: auth.get_current_user(token=token, db=db),
+}
+
+
+def run(case: str, requests: int, users: int, notes: int) -> dict:
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_db_engine(f"sqlite:///{os.path.join(directory, 'bench.db')}")
+        Base.metadata.create_all(bind=engine)
+        Session = sessionmaker(bind=engine, autoflush=False)
+        targets = []
+        with Session() as db:
+            for user_index in range(users):
+                db_user = models.User(username=f"user{user_index}", hashed_password="x")
+                db.add(db_user)
+                db.flush()
+                db_notes = [models.LearningNote(title=f"note {i}", owner_id=db_user.id) for i in range(notes)]
+                db.add_all(db_notes)
+                db.flush()
+                token = auth.create_access_token({"sub": db_user.username, "uid": db_user.id}, timedelta(minutes=30))
+                targets += [(db_note.id, token) for db_note in db_notes]
+            db.commit()
+
+        auth.clear_user_cache()
+        statements = [0]
+        event.listen(engine, "before_cursor_execute", lambda *args: statements.__setitem__(0, statements[0] + 1))
+        latencies = []
+        for i in range(requests):
+            note_id, token = targets[i % len(targets)]
+            started = time.perf_counter()
+            # 요청마다 새 세션을 사용합니다 (database.get_db와 같음).
+            with Session() as db:
+                CASES[case](note_id, token, db)
+            latencies.append((time.perf_counter() - started) * 1_000_000)
+        engine.dispose()
+
+    latencies.sort()
+    return {
+        "mean_us": sum(latencies) / len(latencies),
+        "p50_us": latencies[len(latencies) // 2],
+        "p99_us": latencies[int(len(latencies) * 0.99) - 1],
+        "queries_per_request": statements[0] / requests,
+    }
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--notes", type=int, default=10, help="사용자당 노트 수")
+    args = parser.parse_args()
+
+    print(f"{'case':<18}{'mean us':>10}{'p50 us':>10}{'p99 us':>10}{'queries':>9}")
+    for case in CASES:
+        result = run(case, args.requests, args.users, args.notes)
+        print(f"{case:<18}{result['mean_us']:>10.0f}{result['p50_us']:>10.0f}{result['p99_us']:>10.0f}"
+              f"{result['queries_per_request']:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+# backend/benchmarks/bench_db_writes.py
+"""
+기본 SQLite 엔진(롤백 저널, PRAGMA 없음)과 database.create_db_engine(WAL, busy_timeout, synchronous=NORMAL 등)의
+동시 쓰기 성능을 비교합니다. 쓰기 스레드는 노트를 읽고 소스를 추가한 뒤 커밋하고, 읽기 스레드는 노트 목록을 계속 조회합니다.
+처리량, 커밋 지연 시간(p50/p95), 'database is locked' 오류 수를 출력합니다. 임시 파일을 사용합니다.
+
+실행: python -m backend.benchmarks.bench_db_writes --writers 8 --readers 4 --writes 200 (저장소 루트에서)
+"""
+
+import argparse
+import os
+import tempfile
+import threading
+import time
+
+from sqlalchemy import create_engine
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import selectinload, sessionmaker
+
+from backend import models
+from backend.database import Base, create_db_engine
+
+
+def build_engine(mode: str, url: str):
+    if mode == "default":
+        # 변경 전 database.py와 같은 설정
+        return create_engine(url, connect_args={"check_same_thread": False})
+    return create_db_engine(url)
+
+def run(mode: str, writers: int, readers: int, writes: int, notes: int) -> dict:
+    with tempfile.TemporaryDirectory() as directory:
+        engine = build_engine(mode, f"sqlite:///{os.path.join(directory, 'bench.db')}")
+        Base.metadata.create_all(bind=engine)
+        Session = sessionmaker(bind=engine, autoflush=False)
+        with Session() as db:
+            db_user = models.User(username="bench", hashed_password="x")
+            db.add(db_user)
+            db.flush()
+            db.add_all(models.LearningNote(title=f"note {i}", owner_id=db_user.id) for i in range(notes))
+            db.commit()
+            user_id = db_user.id
+
+        latencies, errors = [], []
+        lock = threading.Lock()
+        stop = threading.Event()
+        reads = [0]
+
+        def write(worker: int):
+            for i in range(writes):
+                started = time.perf_counter()
+                try:
+                    with Session() as db:
+                        # 읽은 뒤 쓰는 트랜잭션 (롤백 저널에서는 공유 잠금을 쓰기 잠금으로 올리다 충돌합니다)
+                        db_note = db.get(models.LearningNote, 1 + (worker * writes + i) % notes)
+                        db.add(models.Source(type="text", path=f"w{worker}-{i}", content="미리보기 " * 50, note_id=db_note.id))
+                        db.commit()
+                except OperationalError as e:
+                    with lock:
+                        errors.append(str(e.orig))
+                    continue
+                with lock:
+                    latencies.append((time.perf_counter() - started) * 1000)
+
+        def read():
+            while not stop.is_set():
+                try:
+                    with Session() as db:
+                        db.query(models.LearningNote).options(selectinload(models.LearningNote.sources)).filter(
+                            models.LearningNote.owner_id == user_id
+                        ).limit(20).all()
+                    with lock:
+                        reads[0] += 1
+                except OperationalError as e:
+                    with lock:
+                        errors.append(str(e.orig))
+
+        reader_threads = [threading.Thread(target=read) for _ in range(readers)]
+        writer_threads = [threading.Thread(target=write, args=(worker,)) for worker in range(writers)]
+        started = time.perf_counter()
+        for thread in reader_threads + writer_threads:
+            thread.start()
+        for thread in writer_threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        stop.set()
+        for thread in reader_threads:
+            thread.join()
+        engine.dispose()
+
+    latencies.sort()
+    return {
+        "commits": len(latencies),
+        "commits_per_second": len(latencies) / elapsed,
+        "reads_per_second": reads[0] / elapsed,
+        "p50_ms": latencies[len(latencies) // 2] if latencies else 0.0,
+        "p95_ms": latencies[int(len(latencies) * 0.95) - 1] if latencies else 0.0,
+        "locked_errors": sum("locked" in error for error in errors),
+        "other_errors": sum("locked" not in error for error in errors),
+    }
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--writers", type=int, default=8)
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--writes", type=int, default=200, help="쓰기 스레드 하나가 커밋하는 횟수")
+    parser.add_argument("--notes", type=int, default=50)
+    args = parser.parse_args()
+
+    print(f"{'mode':<10}{'commits':>9}{'commit/s':>10}{'read/s':>10}{'p50 ms':>9}{'p95 ms':>9}{'locked':>8}{'other':>7}")
+    for mode in ("default", "tuned"):
+        result = run(mode, args.writers, args.readers, args.writes, args.notes)
+        print(f"{mode:<10}{result['commits']:>9}{result['commits_per_second']:>10.0f}{result['reads_per_second']:>10.0f}"
+              f"{result['p50_ms']:>9.1f}{result['p95_ms']:>9.1f}{result['locked_errors']:>8}{result['other_errors']:>7}")
+
+
+if __name__ == "__main__":
+    main()
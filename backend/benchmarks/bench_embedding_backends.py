@@ -0,0 +1,93 @@
+# backend/benchmarks/bench_embedding_backends.py
+"""
+임베딩 백엔드(원격 Gemini, 로컬 hashing, 로컬 sentence-transformers)의 수집 처리량과 검색 품질을 비교합니다.
+처리량은 add_sources_to_vector_store와 같은 크기의 배치로 조각을 임베딩하여 측정하고,
+검색 품질은 eval_retrieval의 고정 말뭉치로 벡터 검색과 하이브리드 검색의 recall@k/MRR을 측정합니다.
+GEMINI_API_KEY가 없거나 sentence-transformers가 설치되어 있지 않으면 해당 백엔드는 건너뜁니다.
+
+실행: python -m backend.benchmarks.bench_embedding_backends [--chunks 2000] (저장소 루트에서)
+"""
+
+import argparse
+import tempfile
+import time
+
+import chromadb
+from dotenv import load_dotenv
+from langchain_core.documents import Document
+from langchain_community.vectorstores.chroma import Chroma
+
+from backend import client_registry, rag_handler
+from backend.benchmarks import eval_retrieval
+from backend.embedding_dispatcher import EmbeddingDispatcher
+from backend.lexical_index import LexicalIndex
+from backend.local_embeddings import HashingEmbeddings, SentenceTransformerEmbeddings
+
+CHUNK_TEXT = "마이크로러닝은 긴 학습 자료를 짧은 단위로 나누어 학습하는 방법입니다. 조각 번호 {n}, 주제 {topic}. "
+
+
+def available_backends() -> dict:
+    backends = {"hashing": HashingEmbeddings()}
+    try:
+        backends["sentence-transformers"] = SentenceTransformerEmbeddings()
+    except ImportError:
+        print("sentence-transformers: 설치되어 있지 않아 건너뜁니다.")
+    api_key = client_registry.get_api_key()
+    if api_key:
+        from langchain_google_genai import GoogleGenerativeAIEmbeddings
+        # 캐시 적중이 처리량에 섞이지 않도록 캐시 없이 디스패처만 거칩니다.
+        backends["gemini"] = EmbeddingDispatcher(
+            GoogleGenerativeAIEmbeddings(model=client_registry.EMBEDDING_MODEL_NAME, google_api_key=api_key))
+    else:
+        print("gemini: GEMINI_API_KEY가 없어 건너뜁니다.")
+    return backends
+
+def measure_throughput(embeddings, chunks: int, batch_size: int):
+    topics = list(eval_retrieval.CORPUS.values())
+    texts = [CHUNK_TEXT.format(n=n, topic=topics[n % len(topics)]) * 4 for n in range(chunks)]
+    latencies = []
+    started = time.perf_counter()
+    for start in range(0, len(texts), batch_size):
+        batch_started = time.perf_counter()
+        embeddings.embed_documents(texts[start:start + batch_size])
+        latencies.append((time.perf_counter() - batch_started) * 1000)
+    seconds = time.perf_counter() - started
+    query_started = time.perf_counter()
+    for question, _ in eval_retrieval.QUERIES:
+        embeddings.embed_query(question)
+    query_ms = (time.perf_counter() - query_started) * 1000 / len(eval_retrieval.QUERIES)
+    latencies.sort()
+    return chunks / seconds, latencies[len(latencies) // 2], query_ms
+
+def measure_quality(name: str, embeddings):
+    documents = [Document(page_content=text, metadata={"source": "fixture", "doc_id": doc_id})
+                 for doc_id, text in eval_retrieval.CORPUS.items()]
+    k = max(eval_retrieval.K_VALUES)
+    with tempfile.TemporaryDirectory() as tmp:
+        vector_store = Chroma(collection_name="eval", client=chromadb.PersistentClient(path=tmp), embedding_function=embeddings)
+        vector_store.add_documents(documents)
+        index = LexicalIndex(path=f"{tmp}/lexical.db")
+        index.add(eval_retrieval.NOTE_ID, documents)
+        eval_retrieval.evaluate(f"{name} vector", vector_store.as_retriever(search_kwargs={"k": k}), k)
+        eval_retrieval.evaluate(f"{name} hybrid", rag_handler.build_hybrid_retriever(vector_store, eval_retrieval.NOTE_ID, index=index, k=k), k)
+
+def main():
+    load_dotenv()
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--chunks", type=int, default=2000)
+    parser.add_argument("--batch-size", type=int, default=rag_handler.VECTOR_WRITE_BATCH_SIZE)
+    args = parser.parse_args()
+
+    backends = available_backends()
+    print(f"\n처리량: 조각 {args.chunks}개, 배치 {args.batch_size}개")
+    for name, embeddings in backends.items():
+        chunks_per_second, batch_p50, query_ms = measure_throughput(embeddings, args.chunks, args.batch_size)
+        print(f"{name:>22}: {chunks_per_second:>9,.0f} chunks/s  batch p50={batch_p50:.1f}ms  query={query_ms:.2f}ms")
+
+    print(f"\n검색 품질: 질문 {len(eval_retrieval.QUERIES)}개, 문서 {len(eval_retrieval.CORPUS)}개")
+    for name, embeddings in backends.items():
+        measure_quality(name, embeddings)
+
+
+if __name__ == "__main__":
+    main()
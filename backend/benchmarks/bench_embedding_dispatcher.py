@@ -0,0 +1,77 @@
+# backend/benchmarks/bench_embedding_dispatcher.py
+"""
+여러 수집 작업이 동시에 임베딩할 때 직접 호출(기존 방식)과 EmbeddingDispatcher(배치, 분당 한도, 재시도)를 비교합니다.
+가짜 임베딩 백엔드(fixtures.FakeEmbeddings)는 초당 호출 수를 넘으면 429를 발생시키므로 네트워크 없이 실행됩니다.
+
+실행: python -m backend.benchmarks.bench_embedding_dispatcher [--ingests 8] [--chunks 300] (저장소 루트에서)
+"""
+
+import argparse
+import threading
+import time
+
+from backend import rag_handler
+from backend.embedding_dispatcher import EmbeddingDispatcher
+from backend.benchmarks.fixtures import FakeEmbeddings
+
+CHUNK_TEXT = "마이크로러닝은 긴 학습 자료를 짧은 단위로 나누어 학습하는 방법입니다. 조각 {ingest}-{chunk}. "
+
+
+def run_ingests(embeddings, ingests: int, chunks: int, write_batch_size: int):
+    """ingests개의 스레드가 각각 chunks개 조각을 write_batch_size개씩 임베딩합니다 (add_sources_to_vector_store와 같은 방식)."""
+    failed, latencies = [], []
+
+    def ingest(ingest_index: int):
+        texts = [CHUNK_TEXT.format(ingest=ingest_index, chunk=chunk) * 8 for chunk in range(chunks)]
+        started = time.perf_counter()
+        try:
+            for start in range(0, len(texts), write_batch_size):
+                embeddings.embed_documents(texts[start:start + write_batch_size])
+        except Exception as e:
+            failed.append(f"{type(e).__name__}: {str(e)[:60]}")
+        latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=ingest, args=(index,)) for index in range(ingests)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - started, failed, max(latencies)
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--ingests", type=int, default=8)
+    parser.add_argument("--chunks", type=int, default=300)
+    parser.add_argument("--write-batch-size", type=int, default=rag_handler.VECTOR_WRITE_BATCH_SIZE)
+    parser.add_argument("--quota-per-second", type=int, default=10, help="가짜 API의 초당 호출 한도")
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--tokens-per-minute", type=float, default=100_000_000,
+                        help="디스패처의 분당 토큰 한도 (가짜 API는 토큰 한도가 없으므로 기본값은 사실상 무제한)")
+    args = parser.parse_args()
+
+    total = args.ingests * args.chunks
+    print(f"ingests={args.ingests}, chunks/ingest={args.chunks}, write batch={args.write_batch_size}, "
+          f"quota={args.quota_per_second} req/s, latency={args.latency * 1000:.0f}ms")
+
+    backend = FakeEmbeddings(latency_seconds=args.latency, max_requests=args.quota_per_second)
+    seconds, failed, slowest = run_ingests(backend, args.ingests, args.chunks, args.write_batch_size)
+    print(f"  direct    : {seconds:6.2f}s  ingests failed={len(failed)}/{args.ingests}  api calls={backend.calls}  "
+          f"429={backend.rejected}  texts/s={total / seconds:,.0f}")
+    for error in sorted(set(failed)):
+        print(f"              {error}")
+
+    time.sleep(1)
+    backend = FakeEmbeddings(latency_seconds=args.latency, max_requests=args.quota_per_second)
+    # 가짜 API의 한도가 초 단위이므로 버킷도 1초치만 채우고, 한도의 90%로 설정하여 창 경계에서 429가 나지 않도록 합니다.
+    dispatcher = EmbeddingDispatcher(backend, name="bench", requests_per_minute=args.quota_per_second * 60 * 0.9,
+                                     tokens_per_minute=args.tokens_per_minute, backoff_seconds=0.2, burst_seconds=1)
+    seconds, failed, slowest = run_ingests(dispatcher, args.ingests, args.chunks, args.write_batch_size)
+    stats = dispatcher.stats()
+    print(f"  dispatcher: {seconds:6.2f}s  ingests failed={len(failed)}/{args.ingests}  api calls={backend.calls}  "
+          f"429={backend.rejected}  texts/s={total / seconds:,.0f}  avg batch={stats['avg_batch_size']}  "
+          f"retries={stats['retries']}  throttled={stats['throttled_seconds']}s")
+
+
+if __name__ == "__main__":
+    main()
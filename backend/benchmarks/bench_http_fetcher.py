@@ -0,0 +1,110 @@
+# backend/benchmarks/bench_http_fetcher.py
+"""
+로컬 스텁 HTTP 서버를 띄워 블로킹 순차 요청(기존 방식)과 AsyncFetcher(연결 풀, 동시 요청, 디스크 캐시)를 비교합니다.
+trafilatura.fetch_url은 로컬 주소를 차단하므로 기준선은 같은 방식의 urllib 요청으로 측정합니다.
+스텁 서버는 응답마다 지연을 두고 ETag를 돌려주며, 일부 경로는 처음 한 번 503을 응답하여 재시도를 확인합니다.
+
+실행: python -m backend.benchmarks.bench_http_fetcher (저장소 루트에서)
+"""
+
+import asyncio
+import hashlib
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import trafilatura
+
+from backend import http_fetcher
+
+PAGES = 40
+LATENCY_SECONDS = 0.1
+ARTICLE = "<html><body><article><h1>제목 {n}</h1>" + "<p>스텁 서버가 돌려주는 본문 문단입니다. " * 40 + "</p></article></body></html>"
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    hits = 0
+    not_modified = 0
+    failed_once = set()
+    lock = threading.Lock()
+
+    def do_GET(self):
+        with StubHandler.lock:
+            StubHandler.hits += 1
+            fail = self.path.startswith("/flaky") and self.path not in StubHandler.failed_once
+            StubHandler.failed_once.add(self.path)
+        time.sleep(LATENCY_SECONDS)
+        if fail:
+            self.send_response(503)
+            self.send_header("Retry-After", "0")
+            self.end_headers()
+            return
+
+        body = ARTICLE.format(n=self.path).encode("utf-8")
+        etag = '"' + hashlib.md5(body).hexdigest() + '"'
+        if self.headers.get("If-None-Match") == etag:
+            with StubHandler.lock:
+                StubHandler.not_modified += 1
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", etag)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+async def fetch_all(fetcher: http_fetcher.AsyncFetcher, urls: list[str]) -> list[str]:
+    results = await asyncio.gather(*(fetcher.fetch(url) for url in urls))
+    await fetcher.aclose()
+    return [result.origin for result in results]
+
+
+async def run_fetcher_passes(urls: list[str]):
+    # 공유 실행기(io_executor)가 하나의 이벤트 루프에 묶이므로 모든 측정을 같은 루프에서 실행합니다.
+    with tempfile.TemporaryDirectory() as cache_dir:
+        cache = http_fetcher.HttpCache(cache_dir)
+        for label, fresh_seconds in (("cold cache", 3600), ("warm cache", 3600), ("revalidate", 0)):
+            StubHandler.hits = StubHandler.not_modified = 0
+            fetcher = http_fetcher.AsyncFetcher(cache=cache, fresh_seconds=fresh_seconds, per_host_concurrency=8,
+                                                backoff_seconds=0.05, allow_private_hosts=True)
+            started = time.perf_counter()
+            origins = await fetch_all(fetcher, urls)
+            elapsed = time.perf_counter() - started
+            counts = {origin: origins.count(origin) for origin in sorted(set(origins))}
+            print(f"AsyncFetcher {label:>11}: {elapsed:6.2f}s, stub hits={StubHandler.hits}, "
+                  f"304={StubHandler.not_modified}, {counts}, {fetcher.stats()}")
+
+
+def main():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_port}"
+    urls = [f"{base}/article/{n}" for n in range(PAGES)] + [f"{base}/flaky/{n}" for n in range(4)]
+
+    started = time.perf_counter()
+    for url in urls:
+        try:
+            with urllib.request.urlopen(url, timeout=10) as response:
+                trafilatura.extract(response.read())
+        except urllib.error.HTTPError:
+            pass
+    print(f"blocking urllib (sequential)   : {time.perf_counter() - started:6.2f}s, stub hits={StubHandler.hits}")
+
+    StubHandler.failed_once.clear()
+    asyncio.run(run_fetcher_passes(urls))
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
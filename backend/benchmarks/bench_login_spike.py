@@ -0,0 +1,118 @@
+# backend/benchmarks/bench_login_spike.py
+"""
+수업 시작처럼 로그인이 한꺼번에 몰릴 때, 다른 엔드포인트의 지연 시간이 얼마나 늘어나는지 비교합니다.
+- inline: 변경 전 /token 방식 (async 핸들러 안에서 bcrypt 검증을 직접 실행하여 이벤트 루프를 막음)
+- pool: 현재 /token (executor_handler.password_executor에서 검증)
+로그인을 동시에 보내는 동안 GET /api/executors를 계속 호출하여 그 지연 시간(p50/p99)을 측정하고,
+로그인 처리량과 password 실행기의 대기 시간을 출력합니다. 임시 SQLite 파일을 사용합니다.
+
+실행: python -m backend.benchmarks.bench_login_spike --logins 64 --concurrency 32 (저장소 루트에서)
+해시 계수는 BCRYPT_ROUNDS, 작업자 수는 PASSWORD_EXECUTOR_WORKERS 환경 변수로 바꿉니다.
+"""
+
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+_directory = tempfile.TemporaryDirectory()
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_directory.name, 'bench.db')}"
+os.environ.setdefault("SECRET_KEY", "bench-secret")
+
+import httpx
+from fastapi import Depends, HTTPException
+from fastapi.security import OAuth2PasswordRequestForm
+from sqlalchemy.orm import Session
+
+from backend import auth, crud, main, models
+from backend.database import SessionLocal
+from backend.executor_handler import password_executor
+
+PASSWORD = "bench-password"
+
+
+@main.app.post("/bench/token-inline")
+async def legacy_login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(main.get_db)):
+    """변경 전 login_for_access_token과 같이 이벤트 루프에서 bcrypt를 실행합니다."""
+    user = crud.get_user_by_username(db, username=form_data.username)
+    if not user or not auth.verify_password(form_data.password, user.hashed_password):
+        raise HTTPException(status_code=401)
+    return {"access_token": auth.create_access_token({"sub": user.username, "uid": user.id}), "token_type": "bearer"}
+
+LOGIN_PATHS = {"inline": "/bench/token-inline", "pool": "/token"}
+
+
+def seed_users(count: int):
+    hashed_password = auth.pwd_context.hash(PASSWORD)
+    with SessionLocal() as db:
+        if crud.get_user_by_username(db, "bench0") is None:
+            db.add_all(models.User(username=f"bench{i}", hashed_password=hashed_password) for i in range(count))
+            db.commit()
+
+def percentile(values: list[float], ratio: float) -> float:
+    values = sorted(values)
+    return values[max(0, int(len(values) * ratio) - 1)] if values else 0.0
+
+async def run(mode: str, logins: int, concurrency: int, users: int) -> dict:
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        login_latencies, other_latencies = [], []
+        semaphore = asyncio.Semaphore(concurrency)
+        spike_done = asyncio.Event()
+
+        async def login(i: int):
+            async with semaphore:
+                started = time.perf_counter()
+                response = await client.post(LOGIN_PATHS[mode], data={"username": f"bench{i % users}", "password": PASSWORD})
+                response.raise_for_status()
+                login_latencies.append((time.perf_counter() - started) * 1000)
+
+        # 상태 엔드포인트도 인증이 필요하므로 미리 발급한 토큰을 사용합니다 (사용자 캐시에 적중).
+        headers = {"Authorization": f"Bearer {auth.create_access_token({'sub': 'bench0'})}"}
+
+        async def other():
+            while not spike_done.is_set():
+                started = time.perf_counter()
+                (await client.get("/api/executors", headers=headers)).raise_for_status()
+                other_latencies.append((time.perf_counter() - started) * 1000)
+                await asyncio.sleep(0.005)
+
+        other_task = asyncio.create_task(other())
+        started = time.perf_counter()
+        await asyncio.gather(*(login(i) for i in range(logins)))
+        elapsed = time.perf_counter() - started
+        spike_done.set()
+        await other_task
+
+    return {
+        "logins_per_second": logins / elapsed,
+        "login_p50_ms": percentile(login_latencies, 0.5),
+        "other_requests": len(other_latencies),
+        "other_p50_ms": percentile(other_latencies, 0.5),
+        "other_p99_ms": percentile(other_latencies, 0.99),
+    }
+
+def main_():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--logins", type=int, default=64)
+    parser.add_argument("--concurrency", type=int, default=32, help="동시에 보내는 로그인 요청 수")
+    parser.add_argument("--users", type=int, default=16)
+    args = parser.parse_args()
+
+    seed_users(args.users)
+    print(f"bcrypt rounds={auth.BCRYPT_ROUNDS}, password workers={password_executor.max_workers}")
+    print(f"{'mode':<8}{'login/s':>9}{'login p50':>11}{'other n':>9}{'other p50':>11}{'other p99':>11}")
+    for mode in LOGIN_PATHS:
+        result = asyncio.run(run(mode, args.logins, args.concurrency, args.users))
+        print(f"{mode:<8}{result['logins_per_second']:>9.1f}{result['login_p50_ms']:>11.0f}{result['other_requests']:>9}"
+              f"{result['other_p50_ms']:>11.1f}{result['other_p99_ms']:>11.1f}")
+    stats = password_executor.stats()
+    print(f"password executor: completed={stats['completed']} rejected={stats['rejected']} "
+          f"avg_wait={stats['avg_wait_ms']}ms max_wait={stats['max_wait_ms']}ms")
+    password_executor.shutdown()
+    _directory.cleanup()
+
+
+if __name__ == "__main__":
+    main_()
@@ -0,0 +1,74 @@
+# backend/benchmarks/bench_map_reduce.py
+"""
+단일 프롬프트 생성과 map-reduce 생성의 소요 시간을 비교합니다.
+네트워크 없이 프롬프트 길이에 비례해 지연되는 가짜 LLM을 사용합니다.
+
+실행: python -m backend.benchmarks.bench_map_reduce (저장소 루트에서)
+"""
+
+import asyncio
+import json
+import time
+from types import SimpleNamespace
+
+from backend import material_handler
+from backend.executor_handler import shutdown_executors
+
+FAKE_MATERIAL = {
+    "summary": "요약",
+    "key_topics": ["주제"],
+    "quiz": [{"question": "질문", "options": ["A", "B", "C", "D"], "answer": "A"}],
+    "flashcards": [{"term": "용어", "definition": "설명"}],
+    "mindmap": {"name": "중심 주제", "children": [{"name": "하위 주제"}]},
+}
+
+
+class FakeLLM:
+    """호출당 고정 지연 + 1천 토큰당 지연을 흉내 내는 가짜 Gemini 모델입니다."""
+
+    def __init__(self, base_latency: float = 0.3, seconds_per_1k_tokens: float = 0.04):
+        self.base_latency = base_latency
+        self.seconds_per_1k_tokens = seconds_per_1k_tokens
+        self.calls = 0
+
+    async def generate_content_async(self, prompt: str):
+        self.calls += 1
+        tokens = material_handler.estimate_tokens(prompt)
+        await asyncio.sleep(self.base_latency + tokens / 1000 * self.seconds_per_1k_tokens)
+        return SimpleNamespace(text=json.dumps(FAKE_MATERIAL, ensure_ascii=False))
+
+
+def make_text(chars: int) -> str:
+    paragraph = "마이크로러닝은 긴 학습 자료를 짧은 단위로 나누어 학습하는 방법입니다. " * 8 + "\n\n"
+    return (paragraph * (chars // len(paragraph) + 1))[:chars]
+
+
+async def run_single_shot(text: str, model: FakeLLM):
+    response = await model.generate_content_async(material_handler.build_material_prompt(text))
+    return material_handler.parse_material_response(response.text)
+
+
+async def main():
+    print(f"{'chars':>10} {'tokens':>8} {'single(s)':>10} {'map-reduce(s)':>14} {'calls':>6} {'speedup':>8}")
+    for chars in (100_000, 400_000, 1_600_000):
+        text = make_text(chars)
+
+        single_model = FakeLLM()
+        started = time.perf_counter()
+        await run_single_shot(text, single_model)
+        single_elapsed = time.perf_counter() - started
+
+        map_reduce_model = FakeLLM()
+        started = time.perf_counter()
+        await material_handler.generate_material_map_reduce(text, map_reduce_model)
+        map_reduce_elapsed = time.perf_counter() - started
+
+        print(f"{chars:>10} {material_handler.estimate_tokens(text):>8} {single_elapsed:>10.2f} "
+              f"{map_reduce_elapsed:>14.2f} {map_reduce_model.calls:>6} {single_elapsed / map_reduce_elapsed:>7.1f}x")
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(main())
+    finally:
+        shutdown_executors()
@@ -0,0 +1,96 @@
+# backend/benchmarks/bench_material_insert.py
+"""
+학습 자료 저장 방식을 비교합니다.
+- legacy: 변경 전 방식 (자료 커밋 + refresh, 항목마다 db.add, 다시 커밋 + refresh)
+- bulk: crud.create_learning_material (종류별 다중 행 INSERT ... RETURNING, 커밋 한 번, 다시 조회하지 않음)
+퀴즈/용어 카드가 많은 자료를 저장하며 초당 자료 수, 초당 행 수, 자료 하나당 SQL 문 수를 출력합니다.
+저장 후 응답 모델로 직렬화하는 비용(다시 조회)까지 포함합니다. 임시 SQLite 파일을 사용합니다.
+
+실행: python -m backend.benchmarks.bench_material_insert --materials 50 --items 10 200 (저장소 루트에서)
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+from sqlalchemy import event
+from sqlalchemy.orm import sessionmaker
+
+from backend import crud, models, schemas
+from backend.database import Base, create_db_engine
+
+
+def build_material(items: int) -> schemas.LearningMaterialCreate:
+    return schemas.LearningMaterialCreate(
+        summary="요약 " * 200,
+        key_topics=[f"주제 {i}" for i in range(max(1, items // 10))],
+        quiz=[schemas.QuizItemBase(question=f"질문 {i}", options=["A", "B", "C", "D"], answer="A") for i in range(items)],
+        flashcards=[schemas.FlashcardItemBase(term=f"용어 {i}", definition="설명 " * 10) for i in range(items)],
+        mindmap={"name": "중심", "children": [{"name": f"하위 {i}"} for i in range(10)]},
+    )
+
+def legacy_create_learning_material(db, material: schemas.LearningMaterialCreate, note_id: int):
+    """변경 전 crud.create_learning_material과 같은 순서로 저장합니다."""
+    db_material = models.LearningMaterial(summary=material.summary, note_id=note_id, mindmap=material.mindmap,
+                                          audio_url=material.audio_url)
+    db.add(db_material)
+    db.commit()
+    db.refresh(db_material)
+    for topic in material.key_topics:
+        db.add(models.KeyTopic(topic=topic, material_id=db_material.id))
+    for item in material.quiz:
+        db.add(models.QuizItem(question=item.question, options=item.options, answer=item.answer, material_id=db_material.id))
+    for item in material.flashcards:
+        db.add(models.Flashcard(term=item.term, definition=item.definition, material_id=db_material.id))
+    db.commit()
+    db.refresh(db_material)
+    return db_material
+
+WRITERS = {"legacy": legacy_create_learning_material, "bulk": crud.create_learning_material}
+
+def run(mode: str, materials: int, items: int) -> dict:
+    material = build_material(items)
+    rows_per_material = 1 + len(material.key_topics) + len(material.quiz) + len(material.flashcards)
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_db_engine(f"sqlite:///{os.path.join(directory, 'bench.db')}")
+        Base.metadata.create_all(bind=engine)
+        Session = sessionmaker(bind=engine, autoflush=False)
+        with Session() as db:
+            db_note = models.LearningNote(title="bench")
+            db.add(db_note)
+            db.commit()
+            note_id = db_note.id
+
+        statements = [0]
+        event.listen(engine, "before_cursor_execute", lambda *args: statements.__setitem__(0, statements[0] + 1))
+        started = time.perf_counter()
+        for _ in range(materials):
+            with Session() as db:
+                db_material = WRITERS[mode](db, material, note_id)
+                schemas.LearningMaterial.model_validate(db_material, from_attributes=True)
+        elapsed = time.perf_counter() - started
+        engine.dispose()
+
+    return {
+        "materials_per_second": materials / elapsed,
+        "rows_per_second": materials * rows_per_material / elapsed,
+        "statements_per_material": statements[0] / materials,
+    }
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--materials", type=int, default=50)
+    parser.add_argument("--items", type=int, nargs="+", default=[10, 200], help="자료 하나의 퀴즈/용어 카드 수")
+    args = parser.parse_args()
+
+    print(f"{'items':>6} {'mode':<8}{'materials/s':>13}{'rows/s':>10}{'stmts/material':>16}")
+    for items in args.items:
+        for mode in WRITERS:
+            result = run(mode, args.materials, items)
+            print(f"{items:>6} {mode:<8}{result['materials_per_second']:>13.1f}{result['rows_per_second']:>10.0f}"
+                  f"{result['statements_per_material']:>16.1f}")
+
+
+if __name__ == "__main__":
+    main()
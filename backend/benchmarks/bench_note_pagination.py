@@ -0,0 +1,103 @@
+# backend/benchmarks/bench_note_pagination.py
+"""
+노트가 많은 사용자의 노트 목록에서 N번째 페이지를 읽는 지연 시간을 비교합니다.
+- offset: 변경 전 방식 (OFFSET/LIMIT, 소스 요약까지 읽어 schemas.LearningNoteSummary로 직렬화)
+- keyset: crud.get_notes_by_user (id > 커서, (owner_id, id) 인덱스, 소스 수/자료 유무만 계산)
+다른 사용자의 노트를 섞어 넣어 owner_id 조건이 실제로 걸러내도록 합니다. 임시 SQLite 파일을 사용합니다.
+
+실행: python -m backend.benchmarks.bench_note_pagination --notes 100000 --pages 1 100 1000 1999 (저장소 루트에서)
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+from sqlalchemy import insert, text
+from sqlalchemy.orm import sessionmaker
+
+from backend import crud, models, pagination, schemas
+from backend.database import Base, create_db_engine
+
+
+def legacy_get_notes_by_user(db, user_id: int, skip: int, limit: int):
+    """변경 전 crud.get_notes_by_user와 같은 쿼리입니다."""
+    return db.query(models.LearningNote).options(crud._source_summaries()).filter(
+        models.LearningNote.owner_id == user_id
+    ).order_by(models.LearningNote.id).offset(skip).limit(limit).all()
+
+def seed(db, notes: int, users: int, sources_per_note: int):
+    db.execute(insert(models.User), [{"username": f"user{i}", "hashed_password": "x"} for i in range(users)])
+    # 사용자들의 노트가 번갈아 생성된 것처럼 id를 섞습니다.
+    note_rows = [{"title": f"note {i}", "owner_id": 1 + i % users} for i in range(notes * users)]
+    db.execute(insert(models.LearningNote), note_rows)
+    db.execute(insert(models.Source), [
+        {"type": "text", "path": f"source {i}", "content": "미리보기 " * 50, "note_id": note_id}
+        for note_id in range(1, notes * users + 1, 1) for i in range(sources_per_note)
+    ])
+    db.execute(insert(models.LearningMaterial), [
+        {"summary": "요약", "note_id": note_id} for note_id in range(1, notes * users + 1, 10)
+    ])
+    db.commit()
+
+def timed(func, repeat: int) -> float:
+    durations = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        durations.append((time.perf_counter() - started) * 1000)
+    return sorted(durations)[len(durations) // 2]
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--notes", type=int, default=100_000, help="측정할 사용자의 노트 수")
+    parser.add_argument("--users", type=int, default=2, help="노트를 가진 사용자 수 (모두 --notes개씩)")
+    parser.add_argument("--sources-per-note", type=int, default=1)
+    parser.add_argument("--page-size", type=int, default=50)
+    parser.add_argument("--pages", type=int, nargs="+", default=[1, 100, 1000, 1999])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_db_engine(f"sqlite:///{os.path.join(directory, 'bench.db')}")
+        Base.metadata.create_all(bind=engine)
+        Session = sessionmaker(bind=engine, autoflush=False)
+        with Session() as db:
+            seed(db, args.notes, args.users, args.sources_per_note)
+            db.execute(text("ANALYZE"))
+
+        user_id, limit = 1, args.page_size
+        print(f"{args.notes} notes/user, {args.users} users, page size {limit}")
+        print(f"{'page':>6}{'offset ms':>11}{'keyset ms':>11}{'offset KB':>11}{'keyset KB':>11}")
+        for page in args.pages:
+            skip = (page - 1) * limit
+            with Session() as db:
+                # 페이지 N의 커서 = 페이지 N-1의 마지막 노트 id (측정에서 제외)
+                after_id = db.query(models.LearningNote.id).filter(models.LearningNote.owner_id == user_id).order_by(
+                    models.LearningNote.id).offset(skip - 1).limit(1).scalar() if skip else None
+            cursor = pagination.encode_cursor(after_id) if after_id is not None else None
+
+            def offset_page():
+                with Session() as db:
+                    notes = legacy_get_notes_by_user(db, user_id, skip, limit)
+                    return "[" + ",".join(schemas.LearningNoteSummary.model_validate(note, from_attributes=True)
+                                          .model_dump_json() for note in notes) + "]"
+
+            def keyset_page():
+                with Session() as db:
+                    rows = crud.get_notes_by_user(db, user_id, after_id=pagination.decode_cursor(cursor), limit=limit + 1)
+                    return schemas.NotePage.model_validate(pagination.make_page(rows, limit), from_attributes=True).model_dump_json()
+
+            offset_ms, keyset_ms = timed(offset_page, args.repeat), timed(keyset_page, args.repeat)
+            print(f"{page:>6}{offset_ms:>11.2f}{keyset_ms:>11.2f}{len(offset_page()) / 1024:>11.1f}{len(keyset_page()) / 1024:>11.1f}")
+
+        with Session() as db:
+            plan = db.execute(text(
+                "EXPLAIN QUERY PLAN SELECT id FROM learning_notes WHERE owner_id = :owner AND id > :after ORDER BY id LIMIT 51"
+            ), {"owner": user_id, "after": 0}).all()
+        print("keyset plan:", "; ".join(row[-1] for row in plan))
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
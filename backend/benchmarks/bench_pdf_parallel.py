@@ -0,0 +1,73 @@
+# backend/benchmarks/bench_pdf_parallel.py
+"""
+PDF 페이지 병렬 추출(extract_pdf_to_file)의 처리량이 프로세스 수에 따라 어떻게 늘어나는지 측정합니다.
+
+실행: python -m backend.benchmarks.bench_pdf_parallel (저장소 루트에서)
+"""
+
+import asyncio
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from backend import material_handler
+from backend.benchmarks.fixtures import write_text_pdf
+from backend.executor_handler import BoundedExecutor
+
+
+def sequential_extract(path: str) -> int:
+    """이전 방식: 이벤트 루프 스레드에서 페이지를 차례로 추출합니다."""
+    return len(material_handler.extract_pdf_page_range(path, 0, material_handler.count_pdf_pages(path)))
+
+
+async def parallel_extract(path: str, workers: int, documents: int = 1) -> int:
+    """같은 PDF documents개를 동시에 추출합니다. 대기열은 cpu_executor의 기본값과 같은 크기입니다."""
+    # 추출한 텍스트는 PDF 옆 파일에 쓰므로 업로드처럼 문서마다 다른 파일을 사용합니다.
+    paths = [path] + [shutil.copy(path, f"{path}.{i}.pdf") for i in range(1, documents)]
+    executor = BoundedExecutor("bench", ProcessPoolExecutor, max_workers=workers, max_queue=16)
+    try:
+        results = await asyncio.gather(*(material_handler.extract_pdf_to_file(path, executor=executor)
+                                         for path in paths))
+        for extracted in results:
+            os.remove(extracted.path)
+        assert executor.rejected == 0
+        return sum(len(extracted.page_offsets) for extracted in results)
+    finally:
+        executor.shutdown()
+
+
+def main():
+    cores = os.cpu_count() or 1
+    worker_counts = sorted({1, 2, 4, cores})
+    print(f"cpu cores: {cores}")
+    print(f"{'pages':>6} {'mode':>12} {'time(s)':>8} {'pages/s':>8} {'speedup':>8}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for pages in (300, 900):
+            path = os.path.join(tmp, f"doc_{pages}.pdf")
+            write_text_pdf(path, pages=pages)
+
+            started = time.perf_counter()
+            sequential_extract(path)
+            baseline = time.perf_counter() - started
+            print(f"{pages:>6} {'sequential':>12} {baseline:>8.2f} {pages / baseline:>8.1f} {1.0:>7.1f}x")
+
+            for workers in worker_counts:
+                started = time.perf_counter()
+                extracted_pages = asyncio.run(parallel_extract(path, workers))
+                elapsed = time.perf_counter() - started
+                assert extracted_pages == pages
+                print(f"{pages:>6} {f'{workers} procs':>12} {elapsed:>8.2f} {pages / elapsed:>8.1f} {baseline / elapsed:>7.1f}x")
+
+            # 작업 워커들이 PDF 여러 개를 동시에 처리하는 경우 (대기열이 넘치면 assert에서 실패합니다)
+            workers = max(worker_counts)
+            started = time.perf_counter()
+            extracted_pages = asyncio.run(parallel_extract(path, workers, documents=4))
+            elapsed = time.perf_counter() - started
+            assert extracted_pages == pages * 4
+            print(f"{pages * 4:>6} {f'{workers} procs x4':>12} {elapsed:>8.2f} {pages * 4 / elapsed:>8.1f} {baseline * 4 / elapsed:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
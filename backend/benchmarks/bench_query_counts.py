@@ -0,0 +1,108 @@
+# backend/benchmarks/bench_query_counts.py
+"""
+crud의 조회 경로가 응답 모델로 직렬화될 때까지 실행하는 SQL 쿼리 수를 셉니다.
+노트/소스/학습 자료 수를 바꿔 두 번 측정하여 쿼리 수가 데이터 양에 따라 늘어나는지(N+1) 보여 줍니다.
+노트 목록, 노트 상세, 채팅 요청의 상한은 backend/tests/test_query_counts.py에서 검사합니다.
+임시 SQLite 파일을 사용하므로 서버 DB에 영향이 없습니다.
+
+실행: python -m backend.benchmarks.bench_query_counts --notes 5 50 (저장소 루트에서)
+"""
+
+import argparse
+import os
+import tempfile
+from contextlib import contextmanager
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from backend import crud, models, schemas
+from backend.database import Base
+
+# 조회 경로별 (crud 호출, 응답 모델, 기대하는 쿼리 수)
+READ_PATHS = {
+    "get_user": (lambda db, ids: crud.get_user(db, ids["user"]), schemas.User, 3),
+    "get_users": (lambda db, ids: crud.get_users(db), schemas.UserListItem, 1),
+    "get_notes_by_user": (lambda db, ids: crud.get_notes_by_user(db, ids["user"]), schemas.LearningNoteListItem, 1),
+    "get_note(with_sources)": (lambda db, ids: crud.get_note(db, ids["note"], ids["user"], with_sources=True), schemas.LearningNote, 2),
+    "get_materials_by_note": (lambda db, ids: crud.get_materials_by_note(db, ids["note"]), schemas.LearningMaterial, 4),
+    "get_material": (lambda db, ids: crud.get_material(db, ids["material"], ids["user"]), schemas.LearningMaterial, 4),
+}
+
+
+class QueryCounter:
+    def __init__(self, engine):
+        self.count = 0
+        event.listen(engine, "before_cursor_execute", self._on_execute)
+
+    def _on_execute(self, *args):
+        self.count += 1
+
+    @contextmanager
+    def measure(self):
+        start = self.count
+        result = {}
+        yield result
+        result["queries"] = self.count - start
+
+
+def seed(db, users: int, notes: int, sources_per_note: int, items_per_material: int) -> dict:
+    ids = {}
+    for user_index in range(users):
+        db_user = models.User(username=f"user{user_index}", hashed_password="x")
+        db.add(db_user)
+        db.flush()
+        for note_index in range(notes):
+            db_note = models.LearningNote(title=f"note {note_index}", owner_id=db_user.id)
+            db.add(db_note)
+            db.flush()
+            db.add_all(models.Source(type="text", path=f"source {i}", content="미리보기 " * 50, note_id=db_note.id)
+                       for i in range(sources_per_note))
+            db_material = models.LearningMaterial(summary="요약", mindmap={"name": "m"}, note_id=db_note.id)
+            db_material.key_topics = [models.KeyTopic(topic=f"topic {i}") for i in range(items_per_material)]
+            db_material.quiz_items = [models.QuizItem(question=f"q {i}", options=["A", "B", "C", "D"], answer="A")
+                                      for i in range(items_per_material)]
+            db_material.flashcards = [models.Flashcard(term=f"t {i}", definition="d") for i in range(items_per_material)]
+            db.add(db_material)
+            db.flush()
+            ids.update(user=db_user.id, note=db_note.id, material=db_material.id)
+    db.commit()
+    return ids
+
+def measure(notes: int, users: int, sources_per_note: int, items_per_material: int) -> dict:
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_engine(f"sqlite:///{os.path.join(directory, 'bench.db')}")
+        Base.metadata.create_all(bind=engine)
+        Session = sessionmaker(bind=engine, autoflush=False)
+        with Session() as db:
+            ids = seed(db, users, notes, sources_per_note, items_per_material)
+
+        counter = QueryCounter(engine)
+        counts = {}
+        for name, (read, response_model, _) in READ_PATHS.items():
+            # 경로마다 새 세션을 사용하여 이전 경로에서 읽은 객체가 재사용되지 않게 합니다.
+            with Session() as db, counter.measure() as result:
+                rows = read(db, ids)
+                rows = rows if isinstance(rows, list) else [rows]
+                for row in rows:
+                    response_model.model_validate(row, from_attributes=True).model_dump()
+            counts[name] = result["queries"]
+        engine.dispose()
+        return counts
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--notes", type=int, nargs=2, default=[5, 50], help="사용자당 노트 수 (작은 값, 큰 값)")
+    parser.add_argument("--users", type=int, default=3)
+    parser.add_argument("--sources-per-note", type=int, default=4)
+    parser.add_argument("--items-per-material", type=int, default=3)
+    args = parser.parse_args()
+
+    small, large = (measure(notes, args.users, args.sources_per_note, args.items_per_material) for notes in args.notes)
+    print(f"{'path':<26}{f'{args.notes[0]} notes':>12}{f'{args.notes[1]} notes':>12}{'expected':>10}")
+    for name, (_, _, expected) in READ_PATHS.items():
+        growth = "  N+1" if large[name] != small[name] else ""
+        print(f"{name:<26}{small[name]:>12}{large[name]:>12}{expected:>10}{growth}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+# backend/benchmarks/bench_sse_stream.py
+"""
+채팅 스트리밍에서 토큰마다 한 번씩 쓰던 기존 방식과 sse.stream_events(토큰 묶음, 출처 먼저 전송)를 비교합니다.
+가짜 LLM 스트림을 사용하므로 API 키 없이 실행되며, 클라이언트가 중간에 끊었을 때 LLM 스트림이 닫히는지도 확인합니다.
+
+실행: python -m backend.benchmarks.bench_sse_stream [--tokens 400] [--token-interval-ms 5] (저장소 루트에서)
+"""
+
+import argparse
+import asyncio
+import json
+import time
+
+from backend import sse
+
+SOURCES = [{"page_content": f"출처 조각 {n} " * 40, "metadata": {"source": "a.pdf", "page": n}} for n in range(1, 6)]
+
+
+class FakeLLM:
+    """token_interval마다 짧은 토큰을 내보내는 가짜 LLM 스트림입니다. 닫힌 뒤에는 토큰을 더 만들지 않습니다."""
+
+    def __init__(self, tokens: int, token_interval: float):
+        self.tokens = tokens
+        self.token_interval = token_interval
+        self.generated = 0
+        self.closed = False
+
+    async def astream(self):
+        try:
+            for n in range(self.tokens):
+                await asyncio.sleep(self.token_interval)
+                self.generated += 1
+                yield f"토큰{n} "
+        finally:
+            self.closed = True
+
+
+async def legacy_stream(llm: FakeLLM, retrieval_seconds: float):
+    """기존 방식: 토큰마다 JSON 문자열 하나, 출처는 생성이 끝난 뒤에 보냅니다."""
+    await asyncio.sleep(retrieval_seconds)
+    async for chunk in llm.astream():
+        yield json.dumps({"type": "token", "data": chunk})
+    for source in SOURCES:
+        yield json.dumps({"type": "source", "data": source})
+
+async def new_events(llm: FakeLLM, retrieval_seconds: float):
+    await asyncio.sleep(retrieval_seconds)
+    for source in SOURCES:
+        yield {"type": "source", "data": source}
+    async for chunk in llm.astream():
+        yield {"type": "token", "data": chunk}
+
+async def consume(body, close_after: int | None = None):
+    started = time.perf_counter()
+    writes, size, first_token, first_source = 0, 0, None, None
+    async for frame in body:
+        writes += 1
+        size += len(frame.encode("utf-8"))
+        elapsed = (time.perf_counter() - started) * 1000
+        if first_token is None and '"token"' in frame:
+            first_token = elapsed
+        if first_source is None and '"source"' in frame:
+            first_source = elapsed
+        if close_after is not None and writes >= close_after:
+            await body.aclose()
+            break
+    return writes, size, first_token, first_source, (time.perf_counter() - started) * 1000
+
+async def run(args):
+    interval, retrieval = args.token_interval_ms / 1000, args.retrieval_ms / 1000
+    print(f"tokens={args.tokens}, token interval={args.token_interval_ms}ms, retrieval={args.retrieval_ms}ms, "
+          f"coalesce={sse.SSE_COALESCE_MS}ms")
+    print(f"{'':>8} {'writes':>7} {'bytes':>8} {'1st token':>10} {'1st source':>11} {'total':>9}")
+    for name, body in (("legacy", lambda llm: legacy_stream(llm, retrieval)),
+                       ("sse", lambda llm: sse.stream_events(new_events(llm, retrieval)))):
+        writes, size, first_token, first_source, total = await consume(body(FakeLLM(args.tokens, interval)))
+        print(f"{name:>8} {writes:>7} {size:>8} {first_token:>8.1f}ms {first_source:>9.1f}ms {total:>7.0f}ms")
+
+    llm = FakeLLM(args.tokens, interval)
+    await consume(sse.stream_events(new_events(llm, retrieval)), close_after=3)
+    generated = llm.generated
+    await asyncio.sleep(interval * 20)
+    print(f"클라이언트가 3번째 쓰기 후 연결 종료: LLM 스트림 closed={llm.closed}, 생성된 토큰 {generated}/{args.tokens}, "
+          f"종료 후 추가 생성 {llm.generated - generated}개")
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tokens", type=int, default=400)
+    parser.add_argument("--token-interval-ms", type=float, default=5)
+    parser.add_argument("--retrieval-ms", type=float, default=50)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+# backend/benchmarks/bench_upload_memory.py
+"""
+업로드 파일을 통째로 메모리에 올려 문자열을 이어 붙이던 방식과
+스트리밍 추출(extract_text_to_file → 지문 → RAG 조각 분할)의 최대 메모리 사용량을 비교합니다.
+
+실행: python -m backend.benchmarks.bench_upload_memory (저장소 루트에서)
+"""
+
+import io
+import os
+import tempfile
+import time
+import tracemalloc
+
+from pypdf import PdfReader
+
+from backend import material_handler, rag_handler
+from backend.benchmarks.fixtures import write_text_pdf, write_text_file
+
+
+def buffered_extract(file_path: str, filename: str) -> int:
+    """이전 방식: 파일 전체를 bytes로 읽고 페이지 텍스트를 += 로 이어 붙입니다."""
+    with open(file_path, "rb") as f:
+        contents = f.read()
+    extracted_text = ""
+    if filename.endswith(".txt"):
+        extracted_text = contents.decode("utf-8")
+    else:
+        with io.BytesIO(contents) as f:
+            for page in PdfReader(f).pages: extracted_text += page.extract_text() or ""
+    material_handler.fingerprint_text(extracted_text)
+    return len(rag_handler.get_text_splitter().split_text(extracted_text))
+
+
+def streaming_extract(file_path: str, filename: str) -> int:
+    extracted = material_handler.extract_text_to_file(file_path, filename)
+    try:
+        material_handler.fingerprint_extracted(extracted)
+        return sum(1 for _ in rag_handler.iter_chunks(extracted.iter_pieces()))
+    finally:
+        os.remove(extracted.path)
+
+
+def measure(func, *args):
+    tracemalloc.start()
+    started = time.perf_counter()
+    chunks = func(*args)
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return chunks, elapsed, peak / (1024 * 1024)
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        fixtures = []
+        for pages in (200, 800):
+            path = os.path.join(tmp, f"doc_{pages}.pdf")
+            write_text_pdf(path, pages=pages)
+            fixtures.append((path, f"doc_{pages}.pdf"))
+        for megabytes in (20, 80):
+            path = os.path.join(tmp, f"doc_{megabytes}mb.txt")
+            write_text_file(path, megabytes=megabytes)
+            fixtures.append((path, f"doc_{megabytes}mb.txt"))
+
+        print(f"{'file':>16} {'size(MB)':>9} {'mode':>10} {'chunks':>7} {'time(s)':>8} {'peak(MB)':>9}")
+        for path, filename in fixtures:
+            size = os.path.getsize(path) / (1024 * 1024)
+            for mode, func in (("buffered", buffered_extract), ("streaming", streaming_extract)):
+                chunks, elapsed, peak = measure(func, path, filename)
+                print(f"{filename:>16} {size:>9.1f} {mode:>10} {chunks:>7} {elapsed:>8.2f} {peak:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+# backend/benchmarks/bench_vector_layout.py
+"""
+노트별 컬렉션(per_note)과 공유 샤드 컬렉션(shared) 방식의 디스크 사용량, 적재 시간, 검색 지연 시간을 비교합니다.
+임의의 벡터를 직접 넣으므로 임베딩 API가 필요 없습니다. 노트 수가 많을수록 per_note 적재가 매우 오래 걸립니다.
+
+실행: python -m backend.benchmarks.bench_vector_layout --notes 1000 10000 100000 (저장소 루트에서)
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+
+import chromadb
+
+from backend import rag_handler
+
+
+def directory_size(path: str) -> int:
+    return sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(path) for name in names)
+
+def random_vectors(count: int, dimensions: int) -> list[list[float]]:
+    return [[random.random() for _ in range(dimensions)] for _ in range(count)]
+
+def build(layout: str, path: str, notes: int, chunks_per_note: int, dimensions: int):
+    client = chromadb.PersistentClient(path=path)
+    pending: dict[str, dict] = {}
+    for note_id in range(notes):
+        name = rag_handler.note_collection_name(note_id, layout=layout)
+        batch = pending.setdefault(name, {"ids": [], "embeddings": [], "documents": [], "metadatas": []})
+        for chunk in range(chunks_per_note):
+            batch["ids"].append(f"{note_id}-{chunk}")
+            batch["documents"].append(f"note {note_id} chunk {chunk}")
+            batch["metadatas"].append({"source": "bench", "note_id": note_id})
+        batch["embeddings"].extend(random_vectors(chunks_per_note, dimensions))
+        # 공유 컬렉션은 모아서 한 번에, 노트별 컬렉션은 노트마다 저장합니다 (실제 적재 방식과 같음).
+        if layout == "per_note" or len(batch["ids"]) >= 5000:
+            client.get_or_create_collection(name, embedding_function=None).add(**pending.pop(name))
+    for name, batch in pending.items():
+        client.get_or_create_collection(name, embedding_function=None).add(**batch)
+
+def query(layout: str, path: str, notes: int, dimensions: int, queries: int):
+    # 서버 재시작 직후처럼 새 클라이언트로 열어 컬렉션 열기 비용까지 포함합니다.
+    client = chromadb.PersistentClient(path=path)
+    latencies = []
+    for _ in range(queries):
+        note_id = random.randrange(notes)
+        started = time.perf_counter()
+        collection = client.get_collection(rag_handler.note_collection_name(note_id, layout=layout), embedding_function=None)
+        collection.query(query_embeddings=random_vectors(1, dimensions), n_results=5,
+                         where=rag_handler.note_filter(note_id, layout=layout))
+        latencies.append((time.perf_counter() - started) * 1000)
+    latencies.sort()
+    return latencies[len(latencies) // 2], latencies[int(len(latencies) * 0.95) - 1]
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--notes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--chunks-per-note", type=int, default=4)
+    parser.add_argument("--dimensions", type=int, default=768)
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+
+    print(f"shards={rag_handler.VECTOR_STORE_SHARDS}, chunks/note={args.chunks_per_note}, dimensions={args.dimensions}")
+    print(f"{'notes':>7} {'layout':>9} {'build(s)':>9} {'disk(MB)':>9} {'p50(ms)':>8} {'p95(ms)':>8}")
+    for notes in args.notes:
+        for layout in ("per_note", "shared"):
+            with tempfile.TemporaryDirectory() as path:
+                started = time.perf_counter()
+                build(layout, path, notes, args.chunks_per_note, args.dimensions)
+                build_seconds = time.perf_counter() - started
+                p50, p95 = query(layout, path, notes, args.dimensions, args.queries)
+                print(f"{notes:>7} {layout:>9} {build_seconds:>9.1f} {directory_size(path) / 1e6:>9.1f} {p50:>8.2f} {p95:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
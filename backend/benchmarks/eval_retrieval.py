@@ -0,0 +1,133 @@
+# backend/benchmarks/eval_retrieval.py
+"""
+고정된 말뭉치에서 벡터 검색, BM25 검색, 하이브리드(RRF) 검색의 recall@k, MRR, 검색 지연 시간을 비교합니다.
+GEMINI_API_KEY가 없으면 문자 n-gram 해싱 임베딩을 대신 사용하므로 오프라인에서도 실행됩니다
+(이때 벡터 검색 수치는 실제 임베딩 모델보다 낮게 나옵니다).
+
+실행: python -m backend.benchmarks.eval_retrieval (저장소 루트에서)
+"""
+
+import hashlib
+import math
+import statistics
+import tempfile
+import time
+
+import chromadb
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_community.vectorstores.chroma import Chroma
+
+from backend import client_registry, rag_handler
+from backend.lexical_index import LexicalIndex
+
+NOTE_ID = 1
+K_VALUES = (1, 3, 5)
+
+CORPUS = {
+    "seoul": "서울은 대한민국의 수도이며 한강을 중심으로 발전한 도시입니다. 조선 시대에는 한양이라고 불렸습니다.",
+    "busan": "부산은 대한민국 제2의 도시로 해운대 해수욕장과 자갈치 시장이 유명합니다.",
+    "sejong": "세종대왕은 1443년 훈민정음을 창제하여 백성들이 쉽게 글을 읽고 쓸 수 있도록 했습니다.",
+    "yi_sun_sin": "이순신 장군은 임진왜란 때 거북선을 이용하여 한산도 대첩에서 일본 수군을 크게 물리쳤습니다.",
+    "photosynthesis": "광합성은 식물이 빛 에너지를 이용해 이산화탄소와 물로 포도당과 산소를 만드는 과정입니다.",
+    "mitochondria": "미토콘드리아는 세포 호흡을 통해 ATP를 생성하는 세포 소기관으로, 세포의 발전소라고 불립니다.",
+    "dna": "DNA는 이중 나선 구조를 가진 유전 물질이며 아데닌, 티민, 구아닌, 사이토신 네 가지 염기로 이루어집니다.",
+    "newton": "뉴턴의 운동 제2법칙에 따르면 물체의 가속도는 작용한 힘에 비례하고 질량에 반비례합니다 (F = ma).",
+    "entropy": "열역학 제2법칙은 고립계의 엔트로피가 시간이 지남에 따라 감소하지 않는다는 법칙입니다.",
+    "retriever_code": "get_retriever_for_note 함수는 note_id에 해당하는 Chroma 컬렉션을 열어 검색기를 반환합니다.",
+    "splitter_code": "RecursiveCharacterTextSplitter는 chunk_size와 chunk_overlap 설정에 따라 텍스트를 조각으로 나눕니다.",
+    "fastapi": "FastAPI의 Depends는 요청마다 get_db 같은 의존성을 주입하며, 응답 후에 세션을 닫습니다.",
+    "sqlite_wal": "SQLite의 WAL 모드는 쓰기 작업 중에도 읽기를 허용하여 동시성을 높입니다. PRAGMA journal_mode=WAL로 켭니다.",
+    "bm25": "BM25는 단어 빈도와 역문서 빈도, 문서 길이 정규화를 이용해 문서의 관련도를 계산하는 순위 함수입니다.",
+    "rrf": "Reciprocal Rank Fusion은 여러 검색 결과에서 각 문서 순위의 역수를 더해 하나의 순위로 합칩니다.",
+    "transformer": "트랜스포머는 셀프 어텐션으로 문장 안 단어들의 관계를 계산하는 신경망 구조로, 2017년에 발표되었습니다.",
+    "gradient": "경사 하강법은 손실 함수의 기울기 반대 방향으로 파라미터를 조금씩 이동시켜 최솟값을 찾는 최적화 방법입니다.",
+    "overfitting": "과적합은 모델이 학습 데이터에만 지나치게 맞춰져 새로운 데이터에서 성능이 떨어지는 현상입니다.",
+    "kimchi": "김치는 배추와 무에 고춧가루, 마늘, 젓갈 등을 넣어 발효시킨 한국의 전통 음식입니다.",
+    "hanbok": "한복은 저고리와 치마 또는 바지로 이루어진 한국의 전통 의상으로, 명절에 많이 입습니다.",
+}
+
+QUERIES = [
+    ("한양은 지금 어느 도시야?", {"seoul"}),
+    ("해운대가 있는 도시", {"busan"}),
+    ("훈민정음은 누가 만들었나요", {"sejong"}),
+    ("거북선으로 싸운 전투", {"yi_sun_sin"}),
+    ("식물이 포도당을 만드는 과정", {"photosynthesis"}),
+    ("ATP를 만드는 세포 소기관", {"mitochondria"}),
+    ("유전 물질의 이중 나선", {"dna"}),
+    ("F = ma 법칙 설명", {"newton"}),
+    ("엔트로피 법칙", {"entropy"}),
+    ("get_retriever_for_note는 무엇을 반환하나요?", {"retriever_code"}),
+    ("chunk_overlap 설정", {"splitter_code"}),
+    ("Depends로 get_db 주입", {"fastapi"}),
+    ("journal_mode=WAL", {"sqlite_wal"}),
+    ("BM25 순위 함수", {"bm25"}),
+    ("여러 검색 결과 순위를 합치는 방법", {"rrf", "bm25"}),
+    ("셀프 어텐션 구조", {"transformer"}),
+    ("손실 함수의 기울기로 최솟값 찾기", {"gradient"}),
+    ("학습 데이터에만 맞춰지는 문제", {"overfitting"}),
+    ("배추로 만든 발효 음식", {"kimchi"}),
+    ("명절에 입는 전통 의상", {"hanbok"}),
+]
+
+
+class HashingEmbeddings(Embeddings):
+    """API 없이 평가를 돌리기 위한 문자 3-gram 해싱 임베딩입니다."""
+
+    def __init__(self, dimensions: int = 512):
+        self.dimensions = dimensions
+
+    def _embed(self, text: str) -> list[float]:
+        vector = [0.0] * self.dimensions
+        text = f"  {text.lower()}  "
+        for i in range(len(text) - 2):
+            digest = hashlib.md5(text[i:i + 3].encode("utf-8")).digest()
+            vector[int.from_bytes(digest[:4], "little") % self.dimensions] += 1.0
+        norm = math.sqrt(sum(value * value for value in vector)) or 1.0
+        return [value / norm for value in vector]
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text: str) -> list[float]:
+        return self._embed(text)
+
+
+def evaluate(name: str, retriever, k: int):
+    recalls = {k_value: [] for k_value in K_VALUES}
+    reciprocal_ranks, latencies = [], []
+    for question, relevant in QUERIES:
+        started = time.perf_counter()
+        docs = retriever.invoke(question)
+        latencies.append((time.perf_counter() - started) * 1000)
+        ranked = [doc.metadata["doc_id"] for doc in docs[:k]]
+        for k_value in K_VALUES:
+            recalls[k_value].append(len(relevant & set(ranked[:k_value])) / len(relevant))
+        first_hit = next((rank for rank, doc_id in enumerate(ranked, start=1) if doc_id in relevant), None)
+        reciprocal_ranks.append(1 / first_hit if first_hit else 0.0)
+
+    latencies.sort()
+    recall_text = "  ".join(f"recall@{k_value}={statistics.mean(values):.2f}" for k_value, values in recalls.items())
+    print(f"{name:>8}: {recall_text}  MRR={statistics.mean(reciprocal_ranks):.2f}  "
+          f"latency p50={latencies[len(latencies) // 2]:.1f}ms p95={latencies[int(len(latencies) * 0.95) - 1]:.1f}ms")
+
+
+def main():
+    embeddings = client_registry.get_embeddings() or HashingEmbeddings()
+    print(f"embeddings: {type(embeddings).__name__}, queries: {len(QUERIES)}, documents: {len(CORPUS)}")
+    documents = [Document(page_content=text, metadata={"source": "fixture", "doc_id": doc_id}) for doc_id, text in CORPUS.items()]
+    k = max(K_VALUES)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        vector_store = Chroma(collection_name="eval", client=chromadb.PersistentClient(path=tmp), embedding_function=embeddings)
+        vector_store.add_documents(documents)
+        index = LexicalIndex(path=f"{tmp}/lexical.db")
+        index.add(NOTE_ID, documents)
+
+        evaluate("vector", vector_store.as_retriever(search_kwargs={"k": k}), k)
+        evaluate("bm25", rag_handler.LexicalRetriever(note_id=NOTE_ID, index=index, k=k), k)
+        evaluate("hybrid", rag_handler.build_hybrid_retriever(vector_store, NOTE_ID, index=index, k=k), k)
+
+
+if __name__ == "__main__":
+    main()
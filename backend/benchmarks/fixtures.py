@@ -0,0 +1,109 @@
+# backend/benchmarks/fixtures.py
+"""벤치마크용 합성 입력 파일과 가짜 임베딩 백엔드를 만듭니다."""
+
+import hashlib
+import threading
+import time
+from collections import deque
+
+from langchain_core.embeddings import Embeddings
+
+SAMPLE_LINE = "Micro learning splits long material into short lessons page {page} line {line}"
+
+
+def write_text_pdf(path: str, pages: int, lines_per_page: int = 40):
+    """
+    외부 라이브러리 없이 텍스트가 들어 있는 PDF를 만듭니다 (Helvetica, 페이지당 lines_per_page줄).
+    pypdf의 extract_text로 다시 읽을 수 있는 최소한의 구조만 씁니다.
+    """
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        None,  # 페이지 목록은 페이지 객체 번호가 정해진 뒤 채웁니다.
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    page_ids = []
+    for page in range(1, pages + 1):
+        lines = [f"({SAMPLE_LINE.format(page=page, line=line)}) Tj T*" for line in range(1, lines_per_page + 1)]
+        stream = ("BT /F1 10 Tf 14 TL 40 780 Td " + " ".join(lines) + " ET").encode("latin-1")
+        objects.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+        content_id = len(objects)
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % content_id
+        )
+        page_ids.append(len(objects))
+    kids = " ".join(f"{page_id} 0 R" for page_id in page_ids).encode("latin-1")
+    objects[1] = b"<< /Type /Pages /Kids [" + kids + b"] /Count %d >>" % pages
+
+    with open(path, "wb") as f:
+        f.write(b"%PDF-1.4\n")
+        offsets = []
+        for number, body in enumerate(objects, start=1):
+            offsets.append(f.tell())
+            f.write(b"%d 0 obj\n" % number + body + b"\nendobj\n")
+        xref_offset = f.tell()
+        f.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1))
+        for offset in offsets:
+            f.write(b"%010d 00000 n \n" % offset)
+        f.write(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref_offset))
+
+
+def write_text_file(path: str, megabytes: int):
+    line = "마이크로러닝은 긴 학습 자료를 짧은 단위로 나누어 학습하는 방법입니다.\n"
+    block = line * (1024 * 1024 // len(line.encode("utf-8")))
+    with open(path, "w", encoding="utf-8") as f:
+        for _ in range(megabytes):
+            f.write(block)
+
+
+class FakeQuotaError(Exception):
+    """google.api_core의 ResourceExhausted처럼 code=429를 가진 할당량 초과 오류입니다."""
+    code = 429
+
+
+class FakeEmbeddings(Embeddings):
+    """
+    네트워크 없이 임베딩 API를 흉내 냅니다. 호출마다 latency_seconds(+ 텍스트당 per_text_seconds)만큼 지연되고,
+    최근 window_seconds 동안 max_requests번을 넘게 호출되면 FakeQuotaError(429)를 발생시킵니다.
+    """
+
+    def __init__(self, dimensions: int = 64, latency_seconds: float = 0.05, per_text_seconds: float = 0.0005,
+                 max_requests: int | None = None, window_seconds: float = 1.0, max_batch_size: int = 100):
+        self.dimensions = dimensions
+        self.latency_seconds = latency_seconds
+        self.per_text_seconds = per_text_seconds
+        self.max_requests = max_requests
+        self.window_seconds = window_seconds
+        self.max_batch_size = max_batch_size
+        self.calls = 0
+        self.rejected = 0
+        self._recent = deque()
+        self._lock = threading.Lock()
+
+    def _admit(self):
+        with self._lock:
+            self.calls += 1
+            now = time.monotonic()
+            while self._recent and self._recent[0] <= now - self.window_seconds:
+                self._recent.popleft()
+            if self.max_requests is not None and len(self._recent) >= self.max_requests:
+                self.rejected += 1
+                raise FakeQuotaError("429 Resource has been exhausted (e.g. check quota).")
+            self._recent.append(now)
+
+    def _vector(self, text: str) -> list[float]:
+        digest = hashlib.sha256(text.encode("utf-8")).digest()
+        return [digest[i % len(digest)] / 255 for i in range(self.dimensions)]
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        # 실제 클라이언트처럼 max_batch_size개씩 나누어 순서대로 호출합니다.
+        vectors = []
+        for start in range(0, len(texts), self.max_batch_size):
+            batch = texts[start:start + self.max_batch_size]
+            self._admit()
+            time.sleep(self.latency_seconds + self.per_text_seconds * len(batch))
+            vectors.extend(self._vector(text) for text in batch)
+        return vectors
+
+    def embed_query(self, text: str) -> list[float]:
+        return self.embed_documents([text])[0]
@@ -0,0 +1,209 @@
+# backend/chat_memory.py
+
+import asyncio
+import os
+import threading
+from collections import OrderedDict
+
+from langchain_core.output_parsers import StrOutputParser
+from langchain_core.prompts import ChatPromptTemplate
+
+from . import client_registry, crud
+from .database import SessionLocal
+from .embedding_dispatcher import estimate_tokens
+from .executor_handler import io_executor
+
+# 프롬프트에 그대로 넣는 최근 대화의 최대 추정 토큰 수. 넘으면 오래된 대화부터 요약으로 압축합니다.
+CHAT_HISTORY_MAX_TOKENS = int(os.getenv("CHAT_HISTORY_MAX_TOKENS", "2000"))
+# 압축 후 그대로 남겨 둘 최근 대화의 토큰 수 (매 턴마다 요약하지 않도록 상한보다 작게 둡니다)
+CHAT_HISTORY_KEEP_TOKENS = int(os.getenv("CHAT_HISTORY_KEEP_TOKENS", str(CHAT_HISTORY_MAX_TOKENS // 2)))
+# 누적 요약의 최대 글자 수
+CHAT_SUMMARY_MAX_CHARS = int(os.getenv("CHAT_SUMMARY_MAX_CHARS", "1500"))
+# 메모리에 보관하는 활성 세션 수 (LRU)
+CHAT_SESSION_CACHE_SIZE = int(os.getenv("CHAT_SESSION_CACHE_SIZE", "256"))
+
+REWRITE_TEMPLATE = """        다음은 학습 자료에 대한 사용자와 AI 어시스턴트의 대화입니다.
+        마지막 후속 질문을 이전 대화 없이도 이해할 수 있는 하나의 독립적인 검색 질문으로 바꿔주세요.
+        '그것', '더 자세히' 같은 표현은 대화에 나온 구체적인 대상으로 바꾸고, 질문만 한국어로 출력하세요.
+
+        {history}
+
+        후속 질문:
+        {question}        """
+
+SUMMARY_TEMPLATE = """        다음은 학습 자료에 대한 대화의 기존 요약과 그 이후의 대화입니다.
+        이후 대화에서 다룬 주제, 사용자가 궁금해한 점, 답변의 핵심 내용을 기존 요약에 합쳐
+        {max_chars}자 이내의 한국어 요약 하나로 다시 작성해주세요.
+
+        기존 요약:
+        {summary}
+
+        이후 대화:
+        {history}        """
+
+ROLE_LABELS = {"user": "사용자", "assistant": "AI"}
+
+
+class ChatSessionState:
+    """세션의 누적 요약과, 아직 요약되지 않은 최근 메시지(id, role, content)를 메모리에 보관합니다."""
+
+    def __init__(self, session_id: str, note_id: int, owner_id: int, summary: str | None,
+                 summarized_until: int, messages: list[tuple[int, str, str]]):
+        self.session_id = session_id
+        self.note_id = note_id
+        self.owner_id = owner_id
+        self.summary = summary or ""
+        self.summarized_until = summarized_until
+        self.messages = messages
+        self.lock = threading.Lock()
+        self.summarizing = False
+
+    @property
+    def has_history(self) -> bool:
+        return bool(self.summary or self.messages)
+
+    def recent_messages(self, max_tokens: int = CHAT_HISTORY_MAX_TOKENS) -> list[tuple[int, str, str]]:
+        """최근 메시지를 토큰 예산 안에서 반환합니다. 요약이 늦어져도 프롬프트 크기는 이 예산을 넘지 않습니다."""
+        with self.lock:
+            messages = list(self.messages)
+        window, tokens = [], 0
+        for message in reversed(messages):
+            tokens += estimate_tokens(message[2])
+            if window and tokens > max_tokens:
+                break
+            window.append(message)
+        return window[::-1]
+
+    def unsummarized_tokens(self) -> int:
+        with self.lock:
+            return sum(estimate_tokens(content) for _, _, content in self.messages)
+
+
+def format_history(messages: list[tuple[int, str, str]]) -> str:
+    return "\n".join(f"{ROLE_LABELS.get(role, role)}: {content}" for _, role, content in messages)
+
+
+_sessions: OrderedDict[str, ChatSessionState] = OrderedDict()
+_sessions_lock = threading.Lock()
+# 실행 중인 요약 작업 (이벤트 루프가 작업을 약하게 참조하므로 끝날 때까지 보관합니다)
+_summary_tasks: set = set()
+
+
+def _remember(state: ChatSessionState):
+    with _sessions_lock:
+        _sessions[state.session_id] = state
+        _sessions.move_to_end(state.session_id)
+        while len(_sessions) > CHAT_SESSION_CACHE_SIZE:
+            _sessions.popitem(last=False)
+
+def open_session(db, note_id: int, user_id: int, session_id: str | None = None) -> ChatSessionState | None:
+    """
+    세션을 엽니다. session_id가 없으면 새 세션을 만들고, 있으면 메모리(LRU)나 DB에서 불러옵니다.
+    다른 사용자/노트의 세션이거나 존재하지 않으면 None을 반환합니다.
+    """
+    if session_id is None:
+        db_session = crud.create_chat_session(db, note_id=note_id, user_id=user_id)
+        state = ChatSessionState(db_session.id, note_id, user_id, None, 0, [])
+        _remember(state)
+        return state
+
+    with _sessions_lock:
+        state = _sessions.get(session_id)
+        if state is not None:
+            _sessions.move_to_end(session_id)
+    if state is not None:
+        return state if state.note_id == note_id and state.owner_id == user_id else None
+
+    db_session = crud.get_chat_session(db, session_id, note_id=note_id, user_id=user_id)
+    if db_session is None:
+        return None
+    messages = [(message.id, message.role, message.content)
+                for message in crud.get_unsummarized_messages(db, session_id, db_session.summarized_until)]
+    state = ChatSessionState(session_id, note_id, user_id, db_session.summary, db_session.summarized_until, messages)
+    _remember(state)
+    return state
+
+def forget_note(note_id: int):
+    """삭제된 노트의 세션을 메모리에서 제거합니다."""
+    with _sessions_lock:
+        for session_id in [session_id for session_id, state in _sessions.items() if state.note_id == note_id]:
+            del _sessions[session_id]
+
+def append_turn(state: ChatSessionState, question: str, answer: str):
+    """질문과 답변을 DB에 추가하고 메모리의 세션에도 반영합니다. 이벤트 루프에서는 io_executor로 실행합니다."""
+    db = SessionLocal()
+    try:
+        db_messages = crud.add_chat_messages(db, state.session_id, [("user", question), ("assistant", answer)])
+        messages = [(message.id, message.role, message.content) for message in db_messages]
+    finally:
+        db.close()
+    with state.lock:
+        state.messages.extend(messages)
+
+def _save_summary(session_id: str, summary: str, summarized_until: int):
+    db = SessionLocal()
+    try:
+        crud.update_chat_summary(db, session_id, summary, summarized_until)
+    finally:
+        db.close()
+
+
+async def rewrite_question(state: ChatSessionState, question: str) -> str:
+    """이전 대화를 반영한 독립적인 검색 질문을 만듭니다. 대화가 없거나 실패하면 원래 질문을 사용합니다."""
+    if not state.has_history:
+        return question
+    model = client_registry.get_chat_model(temperature=0)
+    if model is None:
+        return question
+    history = format_history(state.recent_messages())
+    if state.summary:
+        history = f"이전 대화 요약: {state.summary}\n\n{history}"
+    chain = ChatPromptTemplate.from_template(REWRITE_TEMPLATE) | model | StrOutputParser()
+    try:
+        rewritten = (await chain.ainvoke({"history": history, "question": question})).strip()
+    except Exception as e:
+        print(f"[Chat] 세션 {state.session_id}: 검색 질문 재작성 실패, 원래 질문을 사용합니다: {e}")
+        return question
+    return rewritten or question
+
+async def summarize(state: ChatSessionState):
+    """
+    요약되지 않은 대화가 CHAT_HISTORY_MAX_TOKENS를 넘으면, 최근 CHAT_HISTORY_KEEP_TOKENS만 남기고
+    오래된 메시지를 누적 요약에 합칩니다. 메시지 행은 그대로 두고 세션의 요약 위치만 옮깁니다.
+    """
+    if state.summarizing or state.unsummarized_tokens() <= CHAT_HISTORY_MAX_TOKENS:
+        return
+    model = client_registry.get_chat_model(temperature=0)
+    if model is None:
+        return
+    state.summarizing = True
+    try:
+        keep_ids = {message[0] for message in state.recent_messages(CHAT_HISTORY_KEEP_TOKENS)}
+        with state.lock:
+            folded = [message for message in state.messages if message[0] not in keep_ids]
+        if not folded:
+            return
+        chain = ChatPromptTemplate.from_template(SUMMARY_TEMPLATE) | model | StrOutputParser()
+        summary = await chain.ainvoke({"summary": state.summary or "(없음)", "history": format_history(folded),
+                                       "max_chars": CHAT_SUMMARY_MAX_CHARS})
+        summary = summary.strip()[:CHAT_SUMMARY_MAX_CHARS]
+        summarized_until = folded[-1][0]
+
+        await io_executor.run(_save_summary, state.session_id, summary, summarized_until)
+        with state.lock:
+            state.summary = summary
+            state.summarized_until = summarized_until
+            state.messages = [message for message in state.messages if message[0] > summarized_until]
+    except Exception as e:
+        # 요약에 실패해도 recent_messages가 프롬프트 크기를 제한하므로 다음 턴에 다시 시도합니다.
+        print(f"[Chat] 세션 {state.session_id}: 대화 요약 중 오류 발생: {e}")
+    finally:
+        state.summarizing = False
+
+def schedule_summary(state: ChatSessionState):
+    """답변 스트림을 기다리게 하지 않도록 요약을 백그라운드 작업으로 실행합니다."""
+    if state.summarizing or state.unsummarized_tokens() <= CHAT_HISTORY_MAX_TOKENS:
+        return
+    task = asyncio.get_running_loop().create_task(summarize(state))
+    _summary_tasks.add(task)
+    task.add_done_callback(_summary_tasks.discard)
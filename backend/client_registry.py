@@ -0,0 +1,156 @@
+# backend/client_registry.py
+
+import os
+import threading
+from collections import OrderedDict
+
+import chromadb
+import google.generativeai as genai
+from langchain_google_genai import GoogleGenerativeAIEmbeddings, ChatGoogleGenerativeAI
+from langchain_community.vectorstores.chroma import Chroma
+from langchain_core.embeddings import Embeddings
+from youtube_transcript_api import YouTubeTranscriptApi
+
+from .http_fetcher import build_requests_session
+from .embedding_cache import CachedEmbeddings, get_embedding_cache
+from .embedding_dispatcher import EmbeddingDispatcher
+from .local_embeddings import create_local_embeddings, local_backend_name
+
+# 프로세스에 열어둘 Chroma 컬렉션 핸들의 최대 개수 (초과 시 가장 오래 사용하지 않은 핸들부터 닫음)
+CHROMA_HANDLE_CACHE_SIZE = int(os.getenv("CHROMA_HANDLE_CACHE_SIZE", "128"))
+
+EMBEDDING_MODEL_NAME = "models/text-embedding-004"
+# 임베딩 백엔드: 'gemini'(기본, API 호출), 'hashing'(로컬 해싱 벡터화, 의존성 없음),
+# 'sentence-transformers'(로컬 CPU 모델, 패키지 설치 필요). 로컬 백엔드는 API 키 없이 RAG를 사용할 수 있습니다.
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "gemini")
+CHAT_MODEL_NAME = "gemini-1.5-flash"
+
+# 스레드 풀(executor_handler)에서 동시에 접근하므로 모든 생성/조회는 잠금 안에서 수행합니다.
+_lock = threading.RLock()
+_embeddings: dict[tuple, Embeddings | None] = {}
+_chat_models: dict[tuple, ChatGoogleGenerativeAI] = {}
+_generative_models: dict[str, genai.GenerativeModel] = {}
+_configured_genai_key: str | None = None
+_chroma_clients: dict[str, "chromadb.ClientAPI"] = {}
+_vector_stores: "OrderedDict[tuple, Chroma]" = OrderedDict()
+_transcript_api: YouTubeTranscriptApi | None = None
+
+
+def get_api_key() -> str | None:
+    api_key = os.getenv("GEMINI_API_KEY")
+    if not api_key or api_key == "YOUR_API_KEY_HERE":
+        return None
+    return api_key
+
+def embedding_backend_name() -> str:
+    return "gemini" if EMBEDDING_BACKEND == "gemini" else local_backend_name(EMBEDDING_BACKEND)
+
+def get_embeddings(model: str = EMBEDDING_MODEL_NAME) -> Embeddings | None:
+    """
+    임베딩 모델을 프로세스당 한 번만 만들고 재사용합니다. 사용할 수 없으면(API 키 없음 등) None을 반환합니다.
+    Gemini 모델은 영구 임베딩 캐시로 감싸져 있어 같은 텍스트는 다시 API를 호출하지 않고,
+    캐시에 없는 텍스트는 EmbeddingDispatcher가 배치로 모아 분당 한도 안에서 호출합니다.
+    """
+    if EMBEDDING_BACKEND != "gemini":
+        return get_local_embeddings()
+    api_key = get_api_key()
+    if api_key is None:
+        return None
+    key = (model, api_key)
+    with _lock:
+        if key not in _embeddings:
+            dispatcher = EmbeddingDispatcher(GoogleGenerativeAIEmbeddings(model=model, google_api_key=api_key), name=model)
+            _embeddings[key] = CachedEmbeddings(dispatcher, model, get_embedding_cache())
+        return _embeddings[key]
+
+def get_local_embeddings() -> Embeddings | None:
+    """
+    로컬 임베딩 백엔드를 재사용합니다. hashing은 캐시 조회보다 계산이 빠르므로 그대로 쓰고,
+    sentence-transformers 모델은 영구 임베딩 캐시로 감쌉니다.
+    """
+    key = ("local", EMBEDDING_BACKEND)
+    with _lock:
+        if key not in _embeddings:
+            embeddings = create_local_embeddings(EMBEDDING_BACKEND)
+            if embeddings is not None and EMBEDDING_BACKEND == "sentence-transformers":
+                embeddings = CachedEmbeddings(embeddings, embeddings.model_name, get_embedding_cache())
+            _embeddings[key] = embeddings
+        return _embeddings[key]
+
+def embedding_dispatcher_stats() -> list[dict]:
+    with _lock:
+        return [embeddings.embeddings.stats() for embeddings in _embeddings.values()
+                if isinstance(getattr(embeddings, "embeddings", None), EmbeddingDispatcher)]
+
+def get_chat_model(model: str = CHAT_MODEL_NAME, temperature: float = 0) -> ChatGoogleGenerativeAI | None:
+    """RAG 채팅용 LangChain 채팅 모델을 재사용합니다."""
+    api_key = get_api_key()
+    if api_key is None:
+        return None
+    key = (model, temperature, api_key)
+    with _lock:
+        if key not in _chat_models:
+            _chat_models[key] = ChatGoogleGenerativeAI(model=model, google_api_key=api_key, temperature=temperature)
+        return _chat_models[key]
+
+def get_generative_model(model: str = CHAT_MODEL_NAME) -> genai.GenerativeModel | None:
+    """학습 자료 생성용 Gemini 모델을 재사용합니다. genai.configure는 키가 바뀔 때만 호출합니다."""
+    global _configured_genai_key
+    api_key = get_api_key()
+    if api_key is None:
+        return None
+    with _lock:
+        if _configured_genai_key != api_key:
+            genai.configure(api_key=api_key)
+            _configured_genai_key = api_key
+            _generative_models.clear()
+        if model not in _generative_models:
+            _generative_models[model] = genai.GenerativeModel(model)
+        return _generative_models[model]
+
+def get_chroma_client(persist_directory: str):
+    """디렉토리당 하나의 Chroma PersistentClient를 공유합니다."""
+    with _lock:
+        if persist_directory not in _chroma_clients:
+            _chroma_clients[persist_directory] = chromadb.PersistentClient(path=persist_directory)
+        return _chroma_clients[persist_directory]
+
+def get_vector_store(collection_name: str, persist_directory: str, embedding_function) -> Chroma:
+    """컬렉션 핸들을 LRU 캐시에 보관하여 매 요청마다 Chroma를 새로 열지 않도록 합니다."""
+    key = (persist_directory, collection_name, id(embedding_function))
+    with _lock:
+        vector_store = _vector_stores.get(key)
+        if vector_store is not None:
+            _vector_stores.move_to_end(key)
+            return vector_store
+
+        vector_store = Chroma(
+            collection_name=collection_name,
+            client=get_chroma_client(persist_directory),
+            embedding_function=embedding_function
+        )
+        _vector_stores[key] = vector_store
+        while len(_vector_stores) > CHROMA_HANDLE_CACHE_SIZE:
+            _vector_stores.popitem(last=False)
+        return vector_store
+
+def evict_vector_store(collection_name: str):
+    """컬렉션이 삭제되거나 다시 만들어질 때 캐시된 핸들을 제거합니다."""
+    with _lock:
+        for key in [key for key in _vector_stores if key[1] == collection_name]:
+            del _vector_stores[key]
+
+def get_transcript_api() -> YouTubeTranscriptApi:
+    """연결 풀과 시간 초과가 설정된 세션을 사용하는 YouTube 자막 클라이언트를 재사용합니다."""
+    global _transcript_api
+    with _lock:
+        if _transcript_api is None:
+            _transcript_api = YouTubeTranscriptApi(http_client=build_requests_session())
+        return _transcript_api
+
+def warm_up(persist_directory: str):
+    """앱 시작 시 클라이언트들을 미리 만들어 첫 요청의 초기화 지연을 없앱니다."""
+    get_embeddings()
+    get_chat_model()
+    get_generative_model()
+    get_chroma_client(persist_directory)
@@ -1,30 +1,85 @@
-from sqlalchemy.orm import Session
-import json
+from sqlalchemy import and_, delete, exists, func, insert, select, update
+from sqlalchemy.orm import Session, selectinload
+from sqlalchemy.orm.attributes import set_committed_value
+from datetime import datetime, timedelta, timezone
+import uuid
 
-from . import models, schemas, auth
+from . import models, schemas
+
+# --- Loader Options ---
+# 응답 모델이 관계를 하나씩 지연 로딩하지 않도록(N+1) 관계마다 한 번의 IN 쿼리로 미리 읽습니다.
+
+def _source_summaries(parent=None):
+    """목록 응답(schemas.SourceSummary)에 필요한 소스 열만 읽고, 미리보기(content)와 지문은 읽지 않습니다."""
+    load = parent.selectinload if parent is not None else selectinload
+    return load(models.LearningNote.sources).load_only(
+        models.Source.id, models.Source.type, models.Source.path, models.Source.note_id
+    )
+
+def _material_items(parent=None):
+    """학습 자료의 주제, 퀴즈, 용어 카드를 관계마다 한 번의 쿼리로 읽습니다."""
+    load = parent.selectinload if parent is not None else selectinload
+    return (
+        load(models.LearningMaterial.key_topics),
+        load(models.LearningMaterial.quiz_items),
+        load(models.LearningMaterial.flashcards),
+    )
+
+def _commit_keep_loaded(db: Session):
+    """방금 쓴 객체를 응답에 그대로 쓸 수 있도록 만료시키지 않고 커밋합니다 (커밋 후 다시 조회하지 않음)."""
+    expire_on_commit = db.expire_on_commit
+    db.expire_on_commit = False
+    try:
+        db.commit()
+    finally:
+        db.expire_on_commit = expire_on_commit
 
 # --- User CRUD ---
 
 def get_user(db: Session, user_id: int):
-    return db.query(models.User).filter(models.User.id == user_id).first()
+    """노트 목록(schemas.User)을 함께 응답하는 경로용입니다."""
+    return db.query(models.User).options(
+        _source_summaries(selectinload(models.User.notes))
+    ).filter(models.User.id == user_id).first()
 
 
 def get_user_by_username(db: Session, username: str):
     return db.query(models.User).filter(models.User.username == username).first()
 
 
-def get_users(db: Session, skip: int = 0, limit: int = 100):
-    return db.query(models.User).offset(skip).limit(limit).all()
+def get_user_with_note(db: Session, username: str, note_id: int):
+    """사용자와 그 사용자의 노트를 한 번의 쿼리로 읽습니다. 노트가 없거나 다른 사용자의 것이면 노트는 None입니다."""
+    row = db.query(models.User, models.LearningNote).outerjoin(
+        models.LearningNote,
+        and_(models.LearningNote.owner_id == models.User.id, models.LearningNote.id == note_id),
+    ).filter(models.User.username == username).first()
+    return (row[0], row[1]) if row is not None else (None, None)
+
 
+def get_users(db: Session, after_id: int | None = None, limit: int = 100):
+    """사용자 목록(schemas.UserListItem)용입니다. 노트는 읽지 않고 노트 수만 셉니다 (키셋 페이지네이션)."""
+    note_count = select(func.count(models.LearningNote.id)).where(
+        models.LearningNote.owner_id == models.User.id
+    ).correlate(models.User).scalar_subquery()
+    query = db.query(models.User.id, models.User.username, note_count.label("note_count"))
+    if after_id is not None:
+        query = query.filter(models.User.id > after_id)
+    return query.order_by(models.User.id).limit(limit).all()
 
-def create_user(db: Session, user: schemas.UserCreate):
-    hashed_password = auth.pwd_context.hash(user.password)
+
+def create_user(db: Session, user: schemas.UserCreate, hashed_password: str):
+    """비밀번호는 호출자가 auth.hash_password로 미리 해싱합니다 (이벤트 루프를 막지 않도록)."""
     db_user = models.User(username=user.username, hashed_password=hashed_password)
     db.add(db_user)
     db.commit()
     db.refresh(db_user)
     return db_user
 
+
+def update_user_password(db: Session, db_user: models.User, hashed_password: str):
+    db_user.hashed_password = hashed_password
+    db.commit()
+
 # --- LearningNote CRUD ---
 
 def create_learning_note(db: Session, note: schemas.LearningNoteCreate, user_id: int):
@@ -34,46 +89,175 @@ def create_learning_note(db: Session, note: schemas.LearningNoteCreate, user_id:
     db.refresh(db_note)
     return db_note
 
-def get_notes_by_user(db: Session, user_id: int, skip: int = 0, limit: int = 100):
-    return db.query(models.LearningNote).filter(models.LearningNote.owner_id == user_id).offset(skip).limit(limit).all()
+def get_notes_by_user(db: Session, user_id: int, after_id: int | None = None, limit: int = 100):
+    """
+    노트 목록(schemas.LearningNoteListItem)용입니다. 소스와 학습 자료는 읽지 않고 소스 수와 자료 유무만 계산합니다.
+    OFFSET 대신 after_id 다음부터 (owner_id, id) 인덱스 순서로 읽으므로 뒤쪽 페이지도 앞쪽만큼 빠릅니다.
+    """
+    source_count = select(func.count(models.Source.id)).where(
+        models.Source.note_id == models.LearningNote.id
+    ).correlate(models.LearningNote).scalar_subquery()
+    has_material = exists().where(models.LearningMaterial.note_id == models.LearningNote.id)
+    query = db.query(
+        models.LearningNote.id, models.LearningNote.title, models.LearningNote.owner_id,
+        source_count.label("source_count"), has_material.label("has_material"),
+    ).filter(models.LearningNote.owner_id == user_id)
+    if after_id is not None:
+        query = query.filter(models.LearningNote.id > after_id)
+    return query.order_by(models.LearningNote.id).limit(limit).all()
 
-def get_note(db: Session, note_id: int, user_id: int):
-    return db.query(models.LearningNote).filter(models.LearningNote.id == note_id, models.LearningNote.owner_id == user_id).first()
+def get_note(db: Session, note_id: int, user_id: int, with_sources: bool = False):
+    """권한 확인용으로는 노트 행만 읽고, 노트 상세 응답(with_sources)에서는 소스를 함께 읽습니다."""
+    query = db.query(models.LearningNote)
+    if with_sources:
+        query = query.options(selectinload(models.LearningNote.sources))
+    return query.filter(models.LearningNote.id == note_id, models.LearningNote.owner_id == user_id).first()
 
 def delete_note(db: Session, note_id: int, user_id: int):
-    db_note = get_note(db, note_id, user_id)
+    # 연쇄 삭제할 하위 행을 관계마다 한 번의 쿼리로 읽어 둡니다.
+    db_note = db.query(models.LearningNote).options(
+        selectinload(models.LearningNote.sources),
+        *_material_items(selectinload(models.LearningNote.material)),
+        selectinload(models.LearningNote.chat_sessions).selectinload(models.ChatSession.messages),
+    ).filter(models.LearningNote.id == note_id, models.LearningNote.owner_id == user_id).first()
     if db_note:
+        # 작업은 기록으로 남기되 삭제될 노트와 자료를 가리키지 않게 합니다 (외래 키를 검사하는 DB에서도 삭제되도록).
+        # 진행 중인 작업은 다음 단계에서 노트가 없음을 확인하고 실패합니다 (job_handler).
+        db.query(models.Job).filter(models.Job.note_id == note_id).update(
+            {"note_id": None, "material_id": None}, synchronize_session=False
+        )
         db.delete(db_note)
         db.commit()
         return True
     return False
 
+def note_exists(db: Session, note_id: int | None) -> bool:
+    if note_id is None:
+        return False
+    return db.query(models.LearningNote.id).filter(models.LearningNote.id == note_id).first() is not None
+
+def get_note_ids(db: Session) -> set[int]:
+    """모든 노트 ID를 반환합니다 (벡터 저장소 고아 정리용)."""
+    return {note_id for note_id, in db.query(models.LearningNote.id).all()}
+
 # --- Source CRUD ---
 
 def create_note_source(db: Session, source: schemas.SourceCreate, note_id: int):
     db_source = models.Source(**source.dict(), note_id=note_id)
     db.add(db_source)
-    db.commit()
-    db.refresh(db_source)
+    _commit_keep_loaded(db)
     return db_source
 
+def create_note_sources(db: Session, sources: list[schemas.SourceCreate], note_id: int, status: str = "merged"):
+    """여러 소스를 한 번의 다중 행 INSERT와 한 번의 커밋으로 저장합니다."""
+    if not sources:
+        return []
+    db_sources = list(db.scalars(insert(models.Source).returning(models.Source),
+                                 [dict(source.dict(), note_id=note_id, status=status) for source in sources]))
+    _commit_keep_loaded(db)
+    return db_sources
+
+def delete_source(db: Session, source_id: int, note_id: int):
+    """노트의 소스를 삭제하고 삭제한 소스를 반환합니다. 없으면 None을 반환합니다."""
+    db_source = db.query(models.Source).filter(models.Source.id == source_id, models.Source.note_id == note_id).first()
+    if db_source:
+        db.delete(db_source)
+        db.commit()
+    return db_source
+
+def source_path_in_use(db: Session, note_id: int, path: str) -> bool:
+    return db.query(models.Source.id).filter(models.Source.note_id == note_id, models.Source.path == path).first() is not None
+
+def get_note_sources_by_fingerprint(db: Session, note_id: int, fingerprints: list[str]) -> dict[str, models.Source]:
+    """fingerprints 중 노트의 소스에 이미 있는 지문별 소스를 반환합니다. 같은 지문이 여럿이면 자료에 반영된 소스를 고릅니다."""
+    db_sources = {}
+    for db_source in db.query(models.Source).filter(
+        models.Source.note_id == note_id, models.Source.fingerprint.in_(set(fingerprints))
+    ).order_by(models.Source.id).all():
+        current = db_sources.get(db_source.fingerprint)
+        if current is None or (current.status != "merged" and db_source.status == "merged"):
+            db_sources[db_source.fingerprint] = db_source
+    return db_sources
+
+def set_sources_status(db: Session, source_ids: list[int], status: str, commit: bool = True):
+    if source_ids:
+        db.execute(update(models.Source).where(models.Source.id.in_(source_ids)).values(status=status),
+                   execution_options={"synchronize_session": False})
+    if commit:
+        db.commit()
+
+def get_source_texts(db: Session, note_id: int) -> dict[str, list[tuple[str, str | None]]]:
+    """노트 소스의 경로별 (저장된 내용, 지문) 목록입니다. 재색인에서 복원한 원문을 확인하는 데 사용합니다."""
+    source_texts = {}
+    for path, content, fingerprint in db.query(models.Source.path, models.Source.content, models.Source.fingerprint).filter(
+        models.Source.note_id == note_id
+    ).all():
+        source_texts.setdefault(path, []).append((content or "", fingerprint))
+    return source_texts
+
 
 # --- LearningMaterial CRUD ---
 
 def get_materials_by_note(db: Session, note_id: int, skip: int = 0, limit: int = 100):
-    return db.query(models.LearningMaterial).filter(models.LearningMaterial.note_id == note_id).offset(skip).limit(limit).all()
+    return db.query(models.LearningMaterial).options(*_material_items()).filter(models.LearningMaterial.note_id == note_id).offset(skip).limit(limit).all()
 
 def get_material(db: Session, material_id: int, user_id: int):
     # 이제 material은 note에 속하므로, note를 통해 권한을 확인해야 합니다.
     # 이 함수는 로직 변경이 필요합니다. 우선은 note기반으로 변경합니다.
-    return db.query(models.LearningMaterial).join(models.LearningNote).filter(
+    return db.query(models.LearningMaterial).options(*_material_items()).join(models.LearningNote).filter(
         models.LearningMaterial.id == material_id,
         models.LearningNote.owner_id == user_id
     ).first()
 
 
-def create_learning_material(db: Session, material: schemas.LearningMaterialCreate, note_id: int):
-    # Create the main material entry
+def get_note_material(db: Session, note_id: int):
+    """노트의 통합 학습 자료를 반환합니다. 이전 버전에서 소스마다 만든 자료가 여러 개이면 가장 최근 것을 사용합니다."""
+    return db.query(models.LearningMaterial).options(*_material_items()).filter(
+        models.LearningMaterial.note_id == note_id
+    ).order_by(models.LearningMaterial.id.desc()).first()
+
+def replace_learning_material(db: Session, db_material: models.LearningMaterial, material: schemas.LearningMaterialCreate,
+                              merged_source_ids: list[int] = ()):
+    """
+    기존 학습 자료 행을 새 내용으로 갱신합니다. 주제/퀴즈/카드는 교체되고 이전 항목은 삭제됩니다.
+    merged_source_ids의 소스는 같은 커밋에서 'merged'로 표시합니다.
+    """
+    db_material.summary = material.summary
+    db_material.mindmap = material.mindmap
+    db_material.audio_url = material.audio_url
+    for model in (models.KeyTopic, models.QuizItem, models.Flashcard):
+        db.execute(delete(model).where(model.material_id == db_material.id), execution_options={"synchronize_session": False})
+    # 이전 항목 객체는 세션에서 떼어내고, 새 항목으로 관계를 채웁니다.
+    for db_item in [*db_material.key_topics, *db_material.quiz_items, *db_material.flashcards]:
+        db.expunge(db_item)
+    db.flush()
+    _insert_material_items(db, db_material, material)
+    set_sources_status(db, list(merged_source_ids), "merged", commit=False)
+    _commit_keep_loaded(db)
+    return db_material
+
+def _insert_material_items(db: Session, db_material: models.LearningMaterial, material: schemas.LearningMaterialCreate):
+    """
+    주제, 퀴즈, 용어 카드를 종류별로 한 번의 다중 행 INSERT ... RETURNING으로 저장하고,
+    반환된 객체를 학습 자료의 관계에 채워 넣어 응답을 만들 때 다시 조회하지 않게 합니다.
+    """
+    items = {
+        "key_topics": (models.KeyTopic, [{"topic": topic, "material_id": db_material.id} for topic in material.key_topics]),
+        "quiz_items": (models.QuizItem, [
+            {"question": item.question, "options": item.options, "answer": item.answer, "material_id": db_material.id}
+            for item in material.quiz
+        ]),
+        "flashcards": (models.Flashcard, [
+            {"term": item.term, "definition": item.definition, "material_id": db_material.id} for item in material.flashcards
+        ]),
+    }
+    for key, (model, rows) in items.items():
+        db_items = list(db.scalars(insert(model).returning(model), rows)) if rows else []
+        set_committed_value(db_material, key, db_items)
+
+def create_learning_material(db: Session, material: schemas.LearningMaterialCreate, note_id: int,
+                             merged_source_ids: list[int] = ()):
+    """학습 자료와 주제/퀴즈/카드를 한 트랜잭션(커밋 한 번)으로 저장합니다. merged_source_ids의 소스도 같은 커밋에서 'merged'로 표시합니다."""
     db_material = models.LearningMaterial(
         summary=material.summary, 
         note_id=note_id,
@@ -81,31 +265,143 @@ def create_learning_material(db: Session, material: schemas.LearningMaterialCrea
         audio_url=material.audio_url # 오디오 URL 데이터 추가
     )
     db.add(db_material)
+    db.flush()  # 하위 항목에 쓸 id만 할당하고 커밋은 마지막에 한 번 합니다.
+    _insert_material_items(db, db_material, material)
+    set_sources_status(db, list(merged_source_ids), "merged", commit=False)
+    _commit_keep_loaded(db)
+    return db_material
+
+
+# --- Generation Cache CRUD ---
+
+def get_cached_generation(db: Session, fingerprint: str, prompt_version: str, ttl_hours: float):
+    query = db.query(models.GenerationCache).filter(
+        models.GenerationCache.fingerprint == fingerprint,
+        models.GenerationCache.prompt_version == prompt_version
+    )
+    if ttl_hours > 0:
+        # SQLite는 시간대 정보를 저장하지 않으므로 naive UTC로 비교합니다.
+        cutoff = datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(hours=ttl_hours)
+        query = query.filter(models.GenerationCache.created_at >= cutoff)
+    return query.order_by(models.GenerationCache.created_at.desc()).first()
+
+def save_generation_cache(db: Session, fingerprint: str, prompt_version: str, material: schemas.LearningMaterialCreate | dict):
+    """
+    생성 결과를 저장합니다. 같은 키의 항목이 있으면(오디오만 다시 만든 경우 등) 내용만 갱신합니다.
+    소스별 부분 결과는 dict 그대로 저장합니다.
+    """
+    db_entry = db.query(models.GenerationCache).filter(
+        models.GenerationCache.fingerprint == fingerprint,
+        models.GenerationCache.prompt_version == prompt_version
+    ).first()
+    if db_entry is None:
+        db_entry = models.GenerationCache(fingerprint=fingerprint, prompt_version=prompt_version,
+                                          created_at=datetime.now(timezone.utc))
+        db.add(db_entry)
+    db_entry.payload = material if isinstance(material, dict) else material.dict()
     db.commit()
-    db.refresh(db_material)
-
-    # Create related items
-    for topic in material.key_topics:
-        db_topic = models.KeyTopic(topic=topic, material_id=db_material.id)
-        db.add(db_topic)
-    
-    for quiz_item in material.quiz:
-        db_quiz = models.QuizItem(
-            question=quiz_item.question,
-            options=json.dumps(quiz_item.options), # list to JSON string
-            answer=quiz_item.answer,
-            material_id=db_material.id
-        )
-        db.add(db_quiz)
+    return db_entry
 
-    for flashcard_item in material.flashcards:
-        db_flashcard = models.Flashcard(
-            term=flashcard_item.term,
-            definition=flashcard_item.definition,
-            material_id=db_material.id
-        )
-        db.add(db_flashcard)
-    
+
+# --- Job CRUD ---
+
+def create_job(db: Session, job_type: str, payload: dict, stage_names: list, note_id: int, user_id: int):
+    db_job = models.Job(
+        id=uuid.uuid4().hex,
+        type=job_type,
+        status="queued",
+        payload=payload,
+        stages=[{"name": name, "status": "pending"} for name in stage_names],
+        created_at=datetime.now(timezone.utc),
+        note_id=note_id,
+        owner_id=user_id
+    )
+    db.add(db_job)
+    db.commit()
+    db.refresh(db_job)
+    return db_job
+
+def get_job(db: Session, job_id: str, user_id: int):
+    return db.query(models.Job).filter(models.Job.id == job_id, models.Job.owner_id == user_id).first()
+
+def claim_next_job(db: Session):
+    """
+    가장 오래된 'queued' 작업을 'running'으로 바꾸고 반환합니다.
+    상태 조건부 UPDATE로 선점하므로 여러 워커가 같은 작업을 가져가지 않습니다.
+    """
+    job = db.query(models.Job).filter(models.Job.status == "queued").order_by(models.Job.created_at).first()
+    if job is None:
+        return None
+    claimed = db.query(models.Job).filter(models.Job.id == job.id, models.Job.status == "queued").update(
+        {"status": "running", "started_at": datetime.now(timezone.utc), "attempts": models.Job.attempts + 1},
+        synchronize_session=False
+    )
+    db.commit()
+    if not claimed:
+        return None
+    db.refresh(job)
+    return job
+
+def update_job_stage(db: Session, db_job: models.Job, stage_name: str, **fields):
+    # JSON 컬럼은 변경 감지를 위해 새 리스트로 교체해야 합니다.
+    db_job.stages = [dict(stage, **fields) if stage["name"] == stage_name else stage for stage in db_job.stages]
+    db.commit()
+
+def finish_job(db: Session, db_job: models.Job, status: str, material_id: int = None, result=None, error: str = None):
+    db_job.status = status
+    db_job.material_id = material_id
+    db_job.result = result
+    db_job.error = error
+    db_job.finished_at = datetime.now(timezone.utc)
+    db.commit()
+
+def requeue_interrupted_jobs(db: Session):
+    """서버 재시작 등으로 중단된 'running' 작업을 처음 단계부터 다시 대기열에 넣습니다."""
+    interrupted = db.query(models.Job).filter(models.Job.status == "running").all()
+    for db_job in interrupted:
+        db_job.status = "queued"
+        db_job.stages = [{"name": stage["name"], "status": "pending"} for stage in db_job.stages]
+    db.commit()
+    return len(interrupted)
+
+# --- Chat Session CRUD ---
+# 메시지는 추가만 하고, 요약이 갱신될 때 세션 행의 summary/summarized_until만 바꿉니다.
+
+def create_chat_session(db: Session, note_id: int, user_id: int):
+    now = datetime.now(timezone.utc)
+    db_session = models.ChatSession(id=uuid.uuid4().hex, summarized_until=0, created_at=now, updated_at=now,
+                                    note_id=note_id, owner_id=user_id)
+    db.add(db_session)
+    _commit_keep_loaded(db)
+    return db_session
+
+def get_chat_session(db: Session, session_id: str, note_id: int, user_id: int):
+    return db.query(models.ChatSession).filter(
+        models.ChatSession.id == session_id,
+        models.ChatSession.note_id == note_id,
+        models.ChatSession.owner_id == user_id
+    ).first()
+
+def get_unsummarized_messages(db: Session, session_id: str, after_id: int):
+    """요약에 아직 포함되지 않은 메시지를 오래된 순서로 반환합니다."""
+    return db.query(models.ChatMessage).filter(
+        models.ChatMessage.session_id == session_id, models.ChatMessage.id > after_id
+    ).order_by(models.ChatMessage.id).all()
+
+def add_chat_messages(db: Session, session_id: str, messages: list[tuple[str, str]]):
+    """(role, content) 목록을 추가하고 생성된 메시지를 반환합니다."""
+    now = datetime.now(timezone.utc)
+    db_messages = [models.ChatMessage(session_id=session_id, role=role, content=content, created_at=now)
+                   for role, content in messages]
+    db.add_all(db_messages)
+    db.query(models.ChatSession).filter(models.ChatSession.id == session_id).update(
+        {"updated_at": now}, synchronize_session=False
+    )
+    db.commit()
+    return db_messages
+
+def update_chat_summary(db: Session, session_id: str, summary: str, summarized_until: int):
+    db.query(models.ChatSession).filter(models.ChatSession.id == session_id).update(
+        {"summary": summary, "summarized_until": summarized_until}, synchronize_session=False
+    )
     db.commit()
-    db.refresh(db_material) # Refresh to load all related items
-    return db_material
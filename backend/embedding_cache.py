@@ -0,0 +1,147 @@
+# backend/embedding_cache.py
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from array import array
+
+from langchain_core.embeddings import Embeddings
+
+# 임베딩 캐시 파일 (앱 DB와 분리하여 벡터 BLOB이 sql_app.db를 키우지 않도록 합니다)
+EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", "embedding_cache.db")
+# 캐시에 보관할 최대 임베딩 수. 초과하면 가장 오래 사용하지 않은 항목부터 삭제합니다.
+EMBEDDING_CACHE_MAX_ENTRIES = int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", "200000"))
+
+
+def make_cache_key(model: str, text: str) -> str:
+    return hashlib.sha256(f"{model}\0{text}".encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """(모델 이름, 텍스트) 해시를 키로 임베딩 벡터를 SQLite에 저장하는 영구 캐시입니다."""
+
+    def __init__(self, path: str = EMBEDDING_CACHE_PATH, max_entries: int = EMBEDDING_CACHE_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            " key TEXT PRIMARY KEY, vector BLOB NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS ix_embeddings_last_used ON embeddings (last_used)")
+        self._conn.commit()
+
+    def get_many(self, keys: list[str]) -> dict[str, list[float]]:
+        found = {}
+        with self._lock:
+            # SQLite 변수 개수 제한을 피하기 위해 나누어 조회합니다.
+            for start in range(0, len(keys), 500):
+                batch = keys[start:start + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", batch
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = array("f", blob).tolist()
+            if found:
+                now = time.time()
+                self._conn.executemany("UPDATE embeddings SET last_used = ? WHERE key = ?", [(now, key) for key in found])
+                self._conn.commit()
+            self.hits += len(found)
+            self.misses += len(set(keys)) - len(found)
+        return found
+
+    def put_many(self, items: dict[str, list[float]]):
+        if not items:
+            return
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector, last_used) VALUES (?, ?, ?)",
+                [(key, array("f", vector).tobytes(), now) for key, vector in items.items()]
+            )
+            self._conn.commit()
+            self._evict_if_needed()
+
+    def _evict_if_needed(self):
+        count = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        if count <= self.max_entries:
+            return
+        # 매번 삭제하지 않도록 상한의 90%까지 줄입니다.
+        overflow = count - int(self.max_entries * 0.9)
+        self._conn.execute(
+            "DELETE FROM embeddings WHERE key IN (SELECT key FROM embeddings ORDER BY last_used LIMIT ?)",
+            (overflow,)
+        )
+        self._conn.commit()
+        self.evictions += overflow
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        lookups = self.hits + self.misses
+        return {
+            "entries": entries,
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+        }
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    임베딩 모델 앞에 EmbeddingCache를 두어, 이미 임베딩한 텍스트는 API를 다시 호출하지 않습니다.
+    캐시에 없는 텍스트만 한 번의 embed_documents 호출로 임베딩합니다.
+    """
+
+    def __init__(self, embeddings: Embeddings, model: str, cache: "EmbeddingCache"):
+        self.embeddings = embeddings
+        self.model = model
+        self.cache = cache
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        keys = [make_cache_key(self.model, text) for text in texts]
+        vectors = self.cache.get_many(keys)
+
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in vectors:
+                missing.setdefault(key, text)
+        if missing:
+            new_vectors = self.embeddings.embed_documents(list(missing.values()))
+            computed = dict(zip(missing.keys(), new_vectors))
+            self.cache.put_many(computed)
+            vectors.update(computed)
+
+        return [vectors[key] for key in keys]
+
+    def embed_query(self, text: str) -> list[float]:
+        key = make_cache_key(f"{self.model}:query", text)
+        cached = self.cache.get_many([key])
+        if key in cached:
+            return cached[key]
+        vector = self.embeddings.embed_query(text)
+        self.cache.put_many({key: vector})
+        return vector
+
+
+_cache: EmbeddingCache | None = None
+_cache_lock = threading.Lock()
+
+
+def get_embedding_cache() -> EmbeddingCache:
+    """프로세스에서 공유하는 임베딩 캐시를 반환합니다."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = EmbeddingCache()
+        return _cache
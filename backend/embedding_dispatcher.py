@@ -0,0 +1,275 @@
+# backend/embedding_dispatcher.py
+
+import os
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+from langchain_core.embeddings import Embeddings
+
+# 한 번의 API 호출로 임베딩할 최대 텍스트 수 (Gemini batchEmbedContents 상한 100)
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "100"))
+# 한 번의 API 호출에 넣을 최대 추정 토큰 수 (langchain_google_genai의 배치 상한과 같게)
+EMBEDDING_BATCH_MAX_TOKENS = int(os.getenv("EMBEDDING_BATCH_MAX_TOKENS", "20000"))
+# 배치를 채우기 위해 첫 요청 이후 다른 요청을 기다리는 시간
+EMBEDDING_BATCH_WAIT_MS = float(os.getenv("EMBEDDING_BATCH_WAIT_MS", "20"))
+# 동시에 진행할 임베딩 API 호출 수
+EMBEDDING_CONCURRENCY = int(os.getenv("EMBEDDING_CONCURRENCY", "4"))
+# 분당 요청 수 / 분당 토큰 수 한도 (API 키의 할당량보다 약간 낮게 설정합니다)
+EMBEDDING_REQUESTS_PER_MINUTE = float(os.getenv("EMBEDDING_REQUESTS_PER_MINUTE", "1400"))
+EMBEDDING_TOKENS_PER_MINUTE = float(os.getenv("EMBEDDING_TOKENS_PER_MINUTE", "1000000"))
+# 할당량 초과/일시적 오류 시 재시도 횟수와 백오프 기본 시간 (지수 백오프 + 무작위 지터)
+EMBEDDING_MAX_RETRIES = int(os.getenv("EMBEDDING_MAX_RETRIES", "5"))
+EMBEDDING_BACKOFF_SECONDS = float(os.getenv("EMBEDDING_BACKOFF_SECONDS", "1"))
+# 토큰 수 추정에 쓰는 글자 수 (한국어는 영어보다 토큰당 글자 수가 적어 보수적으로 잡습니다)
+CHARS_PER_TOKEN = 3
+
+# 재시도할 HTTP 상태 코드 (google.api_core 예외의 code 속성)
+RETRYABLE_STATUS_CODES = (429, 500, 503, 504)
+
+
+class EmbeddingRateLimitError(Exception):
+    """재시도 후에도 임베딩 API 할당량 초과나 일시적 오류가 계속될 때 발생합니다."""
+
+    def __init__(self, cause: Exception):
+        super().__init__(str(cause))
+        self.cause = cause
+        self.detail = "임베딩 API 사용량이 많습니다. 잠시 후 다시 시도해주세요."
+
+
+def estimate_tokens(text: str) -> int:
+    return max(1, len(text) // CHARS_PER_TOKEN)
+
+def is_retryable(error: Exception) -> bool:
+    """예외 또는 그 원인(langchain이 감싼 google.api_core 예외)이 할당량 초과나 일시적 서버 오류인지 확인합니다."""
+    while error is not None:
+        code = getattr(error, "code", None)
+        if isinstance(code, int) and code in RETRYABLE_STATUS_CODES:
+            return True
+        if "429" in str(error) or "quota" in str(error).lower():
+            return True
+        error = error.__cause__
+    return False
+
+
+class RateLimiter:
+    """
+    분당 요청 수와 분당 토큰 수를 함께 제한하는 토큰 버킷입니다. 스레드 안전합니다.
+    버킷은 burst_seconds 동안 쓸 수 있는 양만큼 채워 두므로, 한도가 분 단위인 API는 60초(기본)로 둡니다.
+    """
+
+    def __init__(self, requests_per_minute: float, tokens_per_minute: float, burst_seconds: float = 60):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.max_requests = max(1.0, requests_per_minute * burst_seconds / 60)
+        self.max_tokens = tokens_per_minute * burst_seconds / 60
+        self._requests = self.max_requests
+        self._tokens = self.max_tokens
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        elapsed = now - self._updated
+        self._updated = now
+        self._requests = min(self.max_requests, self._requests + elapsed * self.requests_per_minute / 60)
+        self._tokens = min(self.max_tokens, self._tokens + elapsed * self.tokens_per_minute / 60)
+
+    def acquire(self, tokens: int) -> float:
+        """요청 1개와 토큰 tokens개를 쓸 수 있을 때까지 기다리고, 기다린 시간(초)을 반환합니다."""
+        # 한 번에 버킷보다 큰 요청은 버킷이 가득 찰 때까지만 기다립니다.
+        tokens = min(tokens, self.max_tokens)
+        waited = 0.0
+        while True:
+            with self._lock:
+                self._refill(time.monotonic())
+                if self._requests >= 1 and self._tokens >= tokens:
+                    self._requests -= 1
+                    self._tokens -= tokens
+                    return waited
+                delay = max(
+                    (1 - self._requests) * 60 / self.requests_per_minute,
+                    (tokens - self._tokens) * 60 / self.tokens_per_minute,
+                )
+            time.sleep(delay)
+            waited += delay
+
+
+class _Request:
+    """embed_documents 호출 하나. 여러 배치에 나뉘어 들어간 텍스트의 결과를 모아 Future를 완료합니다."""
+
+    def __init__(self, count: int):
+        self.vectors: list = [None] * count
+        self.remaining = count
+        self.future: Future = Future()
+        self.lock = threading.Lock()
+
+
+class EmbeddingDispatcher(Embeddings):
+    """
+    여러 스레드(동시 수집 작업)의 embed_documents 요청을 한 대기열에 모아 배치로 임베딩합니다.
+    배치는 EMBEDDING_BATCH_SIZE개/EMBEDDING_BATCH_MAX_TOKENS 이하로 만들고, 분당 요청/토큰 한도 안에서
+    최대 EMBEDDING_CONCURRENCY개를 동시에 호출하며, 할당량 초과 시 지터를 넣은 지수 백오프로 재시도합니다.
+    """
+
+    def __init__(self, embeddings: Embeddings, name: str = "embeddings", batch_size: int = EMBEDDING_BATCH_SIZE,
+                 batch_max_tokens: int = EMBEDDING_BATCH_MAX_TOKENS, batch_wait_ms: float = EMBEDDING_BATCH_WAIT_MS,
+                 concurrency: int = EMBEDDING_CONCURRENCY, requests_per_minute: float = EMBEDDING_REQUESTS_PER_MINUTE,
+                 tokens_per_minute: float = EMBEDDING_TOKENS_PER_MINUTE, max_retries: int = EMBEDDING_MAX_RETRIES,
+                 backoff_seconds: float = EMBEDDING_BACKOFF_SECONDS, burst_seconds: float = 60):
+        self.embeddings = embeddings
+        self.name = name
+        self.batch_size = batch_size
+        self.batch_max_tokens = batch_max_tokens
+        self.batch_wait_seconds = batch_wait_ms / 1000
+        self.concurrency = concurrency
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+        self.limiter = RateLimiter(requests_per_minute, tokens_per_minute, burst_seconds)
+
+        self._queue: deque = deque()
+        self._condition = threading.Condition()
+        self._slots = threading.Semaphore(concurrency)
+        self._dispatcher: threading.Thread | None = None
+
+        self._stats_lock = threading.Lock()
+        self._started = time.monotonic()
+        self.requests = 0
+        self.texts = 0
+        self.tokens = 0
+        self.api_calls = 0
+        self.succeeded_calls = 0
+        self.retries = 0
+        self.failures = 0
+        self.throttled_seconds = 0.0
+        self.api_seconds = 0.0
+        self.in_flight = 0
+
+    # --- Embeddings 인터페이스 ---
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        if not texts:
+            return []
+        request = _Request(len(texts))
+        with self._condition:
+            self._ensure_dispatcher()
+            self._queue.extend((request, index, text) for index, text in enumerate(texts))
+            self._condition.notify()
+        with self._stats_lock:
+            self.requests += 1
+        return request.future.result()
+
+    def embed_query(self, text: str) -> list[float]:
+        # 질문 임베딩은 응답 지연에 바로 드러나므로 배치 대기 없이 한도만 지켜 호출합니다.
+        return self._call(lambda: self.embeddings.embed_query(text), estimate_tokens(text), 1)
+
+    # --- 배치 구성 ---
+
+    def _ensure_dispatcher(self):
+        if self._dispatcher is None or not self._dispatcher.is_alive():
+            self._dispatcher = threading.Thread(target=self._dispatch_loop, name=f"{self.name}-dispatcher", daemon=True)
+            self._dispatcher.start()
+
+    def _next_batch(self) -> list:
+        """대기열에서 다음 배치를 꺼냅니다. 배치가 덜 찼으면 batch_wait 동안 다른 요청을 기다립니다."""
+        with self._condition:
+            while not self._queue:
+                self._condition.wait()
+            deadline = time.monotonic() + self.batch_wait_seconds
+            while len(self._queue) < self.batch_size and (remaining := deadline - time.monotonic()) > 0:
+                self._condition.wait(remaining)
+
+            batch, batch_tokens = [], 0
+            while self._queue and len(batch) < self.batch_size:
+                tokens = estimate_tokens(self._queue[0][2])
+                if batch and batch_tokens + tokens > self.batch_max_tokens:
+                    break
+                batch.append(self._queue.popleft())
+                batch_tokens += tokens
+            return batch
+
+    def _dispatch_loop(self):
+        while True:
+            # 호출 슬롯이 빌 때까지 기다리는 동안 대기열이 쌓여 다음 배치가 커집니다.
+            self._slots.acquire()
+            batch = self._next_batch()
+            threading.Thread(target=self._run_batch, args=(batch,), name=f"{self.name}-batch", daemon=True).start()
+
+    def _run_batch(self, batch: list):
+        try:
+            texts = [text for _, _, text in batch]
+            vectors = self._call(lambda: self.embeddings.embed_documents(texts),
+                                 sum(estimate_tokens(text) for text in texts), len(texts))
+        except Exception as e:
+            for request in {id(request): request for request, _, _ in batch}.values():
+                if not request.future.done():
+                    request.future.set_exception(e)
+            return
+        finally:
+            self._slots.release()
+
+        for (request, index, _), vector in zip(batch, vectors):
+            with request.lock:
+                request.vectors[index] = vector
+                request.remaining -= 1
+                if request.remaining == 0 and not request.future.done():
+                    request.future.set_result(request.vectors)
+
+    # --- 한도 / 재시도 ---
+
+    def _call(self, func, tokens: int, text_count: int):
+        for attempt in range(self.max_retries + 1):
+            waited = self.limiter.acquire(tokens)
+            started = time.monotonic()
+            with self._stats_lock:
+                self.throttled_seconds += waited
+                self.api_calls += 1
+                self.in_flight += 1
+            try:
+                result = func()
+            except Exception as e:
+                if not is_retryable(e):
+                    with self._stats_lock:
+                        self.failures += 1
+                    raise
+                if attempt == self.max_retries:
+                    with self._stats_lock:
+                        self.failures += 1
+                    raise EmbeddingRateLimitError(e) from e
+                delay = random.uniform(0, self.backoff_seconds * 2 ** attempt)
+                print(f"[Embedding] {self.name}: 할당량 초과/일시적 오류, {delay:.1f}초 후 재시도 ({attempt + 1}/{self.max_retries}): {e}")
+                with self._stats_lock:
+                    self.retries += 1
+                time.sleep(delay)
+            else:
+                with self._stats_lock:
+                    self.succeeded_calls += 1
+                    self.texts += text_count
+                    self.tokens += tokens
+                return result
+            finally:
+                with self._stats_lock:
+                    self.in_flight -= 1
+                    self.api_seconds += time.monotonic() - started
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            elapsed = time.monotonic() - self._started
+            return {
+                "name": self.name,
+                "requests": self.requests,
+                "api_calls": self.api_calls,
+                "texts": self.texts,
+                "tokens": self.tokens,
+                "avg_batch_size": round(self.texts / self.succeeded_calls, 1) if self.succeeded_calls else 0.0,
+                "texts_per_second": round(self.texts / elapsed, 2) if elapsed else 0.0,
+                "retries": self.retries,
+                "failures": self.failures,
+                "throttled_seconds": round(self.throttled_seconds, 2),
+                "api_seconds": round(self.api_seconds, 2),
+                "in_flight": self.in_flight,
+                "queued_texts": len(self._queue),
+                "requests_per_minute": self.limiter.requests_per_minute,
+                "tokens_per_minute": self.limiter.tokens_per_minute,
+            }
@@ -0,0 +1,133 @@
+# backend/executor_handler.py
+
+import asyncio
+import functools
+import os
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+
+
+class ExecutorBusyError(Exception):
+    """실행기의 대기열이 가득 찼을 때 발생합니다."""
+
+    def __init__(self, name: str):
+        super().__init__(name)
+        self.name = name
+        self.detail = "서버가 혼잡합니다. 잠시 후 다시 시도해주세요."
+
+
+class BoundedExecutor:
+    """
+    크기가 정해진 실행기(프로세스/스레드 풀)를 감싸 이벤트 루프 밖에서 블로킹 작업을 실행합니다.
+    동시에 실행되는 작업 수는 max_workers, 실행을 기다리는 작업 수는 max_queue로 제한되며
+    대기열이 가득 차면 ExecutorBusyError를 발생시킵니다. 대기열에서 기다린 시간도 함께 기록합니다.
+    """
+
+    def __init__(self, name: str, executor_class: type[Executor], max_workers: int, max_queue: int):
+        self.name = name
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._executor_class = executor_class
+        self._executor: Executor | None = None
+        self._semaphore = asyncio.Semaphore(max_workers)
+        # 한 요청을 여러 작업으로 나누어 제출하는 호출자(PDF 페이지 범위 등)가 모두 함께 쓰는 동시 제출 한도.
+        # 대기열의 절반까지만 쓰므로, 나눠진 작업이 여러 요청에서 몰려도 대기열이 넘치지 않습니다.
+        self.fan_out_limit = max(1, min(max_workers * 2, max_queue // 2))
+        self._fan_out_semaphore = asyncio.Semaphore(self.fan_out_limit)
+        self.active = 0
+        self.queued = 0
+        self.completed = 0
+        self.rejected = 0
+        self.wait_seconds_total = 0.0
+        self.max_wait_seconds = 0.0
+
+    @property
+    def executor(self) -> Executor:
+        # 프로세스 풀은 실제로 사용할 때 생성하여 import 시점의 비용을 없앱니다.
+        if self._executor is None:
+            self._executor = self._executor_class(max_workers=self.max_workers)
+        return self._executor
+
+    async def run(self, func, *args, **kwargs):
+        if self.queued >= self.max_queue:
+            self.rejected += 1
+            raise ExecutorBusyError(self.name)
+
+        self.queued += 1
+        started = time.perf_counter()
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.queued -= 1
+        waited = time.perf_counter() - started
+        self.wait_seconds_total += waited
+        self.max_wait_seconds = max(self.max_wait_seconds, waited)
+
+        self.active += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.executor, functools.partial(func, *args, **kwargs))
+        finally:
+            self.active -= 1
+            self.completed += 1
+            self._semaphore.release()
+
+    async def run_fan_out(self, func, *args, **kwargs):
+        """나눠진 작업 하나를 실행합니다. 공유 한도(fan_out_limit)가 차 있으면 거부하지 않고 빈자리를 기다립니다."""
+        async with self._fan_out_semaphore:
+            return await self.run(func, *args, **kwargs)
+
+    def stats(self) -> dict:
+        return {
+            "name": self.name,
+            "max_workers": self.max_workers,
+            "max_queue": self.max_queue,
+            "active": self.active,
+            "queued": self.queued,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "avg_wait_ms": round(self.wait_seconds_total / self.completed * 1000, 1) if self.completed else 0.0,
+            "max_wait_ms": round(self.max_wait_seconds * 1000, 1),
+        }
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+# PDF/DOCX 파싱 등 CPU 작업용 프로세스 풀
+cpu_executor = BoundedExecutor(
+    "cpu", ProcessPoolExecutor,
+    max_workers=int(os.getenv("CPU_EXECUTOR_WORKERS", str(max(1, (os.cpu_count() or 2) // 2)))),
+    max_queue=int(os.getenv("CPU_EXECUTOR_MAX_QUEUE", "16")),
+)
+# URL/YouTube 다운로드, TTS 등 외부 네트워크 I/O용 스레드 풀
+io_executor = BoundedExecutor(
+    "io", ThreadPoolExecutor,
+    max_workers=int(os.getenv("IO_EXECUTOR_WORKERS", "8")),
+    max_queue=int(os.getenv("IO_EXECUTOR_MAX_QUEUE", "64")),
+)
+# Chroma 저장/검색 및 임베딩 호출용 스레드 풀
+vector_executor = BoundedExecutor(
+    "vector", ThreadPoolExecutor,
+    max_workers=int(os.getenv("VECTOR_EXECUTOR_WORKERS", "4")),
+    max_queue=int(os.getenv("VECTOR_EXECUTOR_MAX_QUEUE", "64")),
+)
+# 비밀번호 해싱/검증(bcrypt)용 스레드 풀. bcrypt는 해싱 중 GIL을 놓으므로 스레드로도 병렬 실행되며,
+# 로그인이 몰려도 동시에 사용하는 CPU 코어 수가 max_workers로 제한됩니다.
+password_executor = BoundedExecutor(
+    "password", ThreadPoolExecutor,
+    max_workers=int(os.getenv("PASSWORD_EXECUTOR_WORKERS", str(max(1, (os.cpu_count() or 2) // 2)))),
+    max_queue=int(os.getenv("PASSWORD_EXECUTOR_MAX_QUEUE", "64")),
+)
+
+EXECUTORS = [cpu_executor, io_executor, vector_executor, password_executor]
+
+
+def get_executor_stats() -> list[dict]:
+    return [executor.stats() for executor in EXECUTORS]
+
+def shutdown_executors():
+    for executor in EXECUTORS:
+        executor.shutdown()
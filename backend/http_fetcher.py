@@ -0,0 +1,291 @@
+# backend/http_fetcher.py
+
+import asyncio
+import hashlib
+import ipaddress
+import json
+import os
+import random
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from urllib.parse import urlsplit
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+
+from .executor_handler import io_executor
+
+# 내려받은 웹 페이지를 보관하는 디스크 캐시 디렉토리
+HTTP_CACHE_DIRECTORY = os.getenv("HTTP_CACHE_DIRECTORY", "http_cache")
+# 이 시간 안에 받은 페이지는 네트워크 요청 없이 캐시에서 바로 사용합니다. 이후에는 조건부 GET으로 재검증합니다.
+HTTP_CACHE_FRESH_SECONDS = float(os.getenv("HTTP_CACHE_FRESH_SECONDS", "3600"))
+HTTP_TIMEOUT_SECONDS = float(os.getenv("HTTP_TIMEOUT_SECONDS", "15"))
+# 공유 연결 풀의 전체 연결 수와 호스트별 동시 요청 수
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "32"))
+HTTP_PER_HOST_CONCURRENCY = int(os.getenv("HTTP_PER_HOST_CONCURRENCY", "4"))
+# 연결 오류, 시간 초과, 429/5xx 응답에 대한 재시도 횟수와 첫 대기 시간 (시도할 때마다 두 배)
+HTTP_MAX_RETRIES = int(os.getenv("HTTP_MAX_RETRIES", "3"))
+HTTP_RETRY_BACKOFF_SECONDS = float(os.getenv("HTTP_RETRY_BACKOFF_SECONDS", "0.5"))
+# 페이지 하나의 최대 크기
+HTTP_MAX_RESPONSE_BYTES = int(os.getenv("HTTP_MAX_RESPONSE_BYTES", str(20 * 1024 * 1024)))
+
+# 사용자가 입력한 URL로 내부망 주소에 접근하지 못하도록(SSRF) 공인 주소만 허용합니다. 로컬 스텁 서버 테스트에서만 끕니다.
+HTTP_ALLOW_PRIVATE_HOSTS = os.getenv("HTTP_ALLOW_PRIVATE_HOSTS", "false").lower() == "true"
+
+USER_AGENT = "Mozilla/5.0 (compatible; MicroLearnAI/1.0)"
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+
+
+class FetchError(Exception):
+    """URL을 가져오지 못했을 때 발생합니다."""
+
+    def __init__(self, url: str, status_code: int | None = None):
+        super().__init__(f"{url} ({status_code or 'network error'})")
+        self.url = url
+        self.status_code = status_code
+        self.detail = "URL에서 콘텐츠를 가져올 수 없습니다."
+
+
+class BlockedHostError(Exception):
+    """공인 주소가 아닌 호스트로 요청하려 할 때 발생합니다."""
+
+
+@dataclass
+class FetchResult:
+    url: str
+    status_code: int
+    content: bytes
+    # 'network'(새로 받음), 'revalidated'(304 응답으로 캐시 재사용), 'cache'(네트워크 요청 없음)
+    origin: str
+
+
+def make_cache_key(url: str) -> str:
+    return hashlib.sha256(url.encode("utf-8")).hexdigest()
+
+
+class HttpCache:
+    """
+    응답 본문(<key>.body)과 메타데이터(<key>.json: ETag, Last-Modified, 받은 시각)를 디스크에 저장하는 캐시입니다.
+    파일은 임시 파일에 쓴 뒤 교체하므로 동시에 읽어도 반쯤 쓰인 파일을 보지 않습니다.
+    """
+
+    def __init__(self, directory: str = HTTP_CACHE_DIRECTORY):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def _paths(self, key: str):
+        return self.directory / f"{key}.json", self.directory / f"{key}.body"
+
+    def get(self, key: str) -> tuple[dict, bytes] | None:
+        meta_path, body_path = self._paths(key)
+        try:
+            meta = json.loads(meta_path.read_text(encoding="utf-8"))
+            return meta, body_path.read_bytes()
+        except (OSError, ValueError):
+            return None
+
+    def put(self, key: str, meta: dict, content: bytes | None = None):
+        meta_path, body_path = self._paths(key)
+        if content is not None:
+            self._write_atomic(body_path, content)
+        self._write_atomic(meta_path, json.dumps(meta).encode("utf-8"))
+
+    def _write_atomic(self, path: Path, data: bytes):
+        tmp_path = path.with_suffix(f"{path.suffix}.{threading.get_ident()}.tmp")
+        tmp_path.write_bytes(data)
+        os.replace(tmp_path, path)
+
+
+class AsyncFetcher:
+    """
+    하나의 httpx.AsyncClient 연결 풀을 공유하는 비동기 HTTP 클라이언트입니다.
+    호스트별 동시 요청 수 제한, 시간 초과, 지수 백오프 재시도, ETag/Last-Modified 조건부 GET과 디스크 캐시를 제공합니다.
+    transport를 넘기면 실제 네트워크 대신 사용합니다 (로컬 스텁 서버 대신 httpx.MockTransport 등).
+    """
+
+    def __init__(self, cache: HttpCache | None = None, fresh_seconds: float = HTTP_CACHE_FRESH_SECONDS,
+                 timeout: float = HTTP_TIMEOUT_SECONDS, max_connections: int = HTTP_MAX_CONNECTIONS,
+                 per_host_concurrency: int = HTTP_PER_HOST_CONCURRENCY, max_retries: int = HTTP_MAX_RETRIES,
+                 backoff_seconds: float = HTTP_RETRY_BACKOFF_SECONDS, allow_private_hosts: bool = HTTP_ALLOW_PRIVATE_HOSTS,
+                 transport: httpx.AsyncBaseTransport | None = None):
+        self.cache = cache
+        self.fresh_seconds = fresh_seconds
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self.per_host_concurrency = per_host_concurrency
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+        self.allow_private_hosts = allow_private_hosts
+        self._transport = transport
+        self._client: httpx.AsyncClient | None = None
+        self._host_slots: dict[str, asyncio.Semaphore] = {}
+        self.requests = 0
+        self.retries = 0
+        self.cache_hits = 0
+        self.revalidated = 0
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                timeout=self.timeout,
+                limits=httpx.Limits(max_connections=self.max_connections, max_keepalive_connections=self.max_connections),
+                headers={"User-Agent": USER_AGENT},
+                follow_redirects=True,
+                transport=self._transport,
+                # 리다이렉트로 이동하는 주소도 매번 검사합니다.
+                event_hooks={"request": [self._check_host]},
+            )
+        return self._client
+
+    async def fetch(self, url: str) -> FetchResult:
+        if urlsplit(url).scheme not in ("http", "https"):
+            raise FetchError(url)
+        key = make_cache_key(url)
+        cached = await io_executor.run(self.cache.get, key) if self.cache else None
+        headers = {}
+        if cached is not None:
+            meta, content = cached
+            if time.time() - meta["fetched_at"] < self.fresh_seconds:
+                self.cache_hits += 1
+                return FetchResult(url, meta["status_code"], content, "cache")
+            if meta.get("etag"):
+                headers["If-None-Match"] = meta["etag"]
+            if meta.get("last_modified"):
+                headers["If-Modified-Since"] = meta["last_modified"]
+
+        status_code, response_headers, content = await self._request(url, headers)
+
+        if status_code == 304 and cached is not None:
+            self.revalidated += 1
+            meta, content = cached
+            meta = dict(meta, fetched_at=time.time())
+            await io_executor.run(self.cache.put, key, meta)
+            return FetchResult(url, meta["status_code"], content, "revalidated")
+        if status_code >= 400:
+            raise FetchError(url, status_code)
+
+        if self.cache is not None:
+            meta = {
+                "url": url,
+                "status_code": status_code,
+                "etag": response_headers.get("etag"),
+                "last_modified": response_headers.get("last-modified"),
+                "fetched_at": time.time(),
+            }
+            await io_executor.run(self.cache.put, key, meta, content)
+        return FetchResult(url, status_code, content, "network")
+
+    async def _check_host(self, request: httpx.Request):
+        if self.allow_private_hosts:
+            return
+        host = request.url.host
+        try:
+            addresses = {ipaddress.ip_address(host)}
+        except ValueError:
+            try:
+                infos = await asyncio.get_running_loop().getaddrinfo(host, request.url.port or 80)
+            except OSError as e:
+                raise httpx.ConnectError(f"cannot resolve {host}", request=request) from e
+            addresses = {ipaddress.ip_address(info[4][0]) for info in infos}
+        if not all(address.is_global for address in addresses):
+            raise BlockedHostError(str(request.url))
+
+    async def _request(self, url: str, headers: dict):
+        """재시도를 포함하여 GET 요청을 보내고 (상태 코드, 헤더, 본문)을 반환합니다."""
+        host = urlsplit(url).netloc
+        slots = self._host_slots.setdefault(host, asyncio.Semaphore(self.per_host_concurrency))
+        for attempt in range(self.max_retries + 1):
+            delay = self.backoff_seconds * (2 ** attempt) * (1 + random.random() * 0.1)
+            try:
+                async with slots:
+                    self.requests += 1
+                    async with self.client.stream("GET", url, headers=headers) as response:
+                        if response.status_code in RETRY_STATUS_CODES and attempt < self.max_retries:
+                            delay = max(delay, _retry_after_seconds(response))
+                        else:
+                            return response.status_code, response.headers, await _read_limited(response, url)
+            except (httpx.InvalidURL, BlockedHostError) as e:
+                raise FetchError(url) from e
+            except httpx.HTTPError as e:
+                if attempt == self.max_retries:
+                    raise FetchError(url) from e
+            self.retries += 1
+            await asyncio.sleep(delay)
+
+    def stats(self) -> dict:
+        return {
+            "requests": self.requests,
+            "retries": self.retries,
+            "cache_hits": self.cache_hits,
+            "revalidated": self.revalidated,
+        }
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+def _retry_after_seconds(response: httpx.Response) -> float:
+    try:
+        return min(float(response.headers.get("retry-after", 0)), 30.0)
+    except ValueError:
+        return 0.0
+
+async def _read_limited(response: httpx.Response, url: str) -> bytes:
+    chunks, size = [], 0
+    async for chunk in response.aiter_bytes():
+        size += len(chunk)
+        if size > HTTP_MAX_RESPONSE_BYTES:
+            raise FetchError(url, response.status_code)
+        chunks.append(chunk)
+    return b"".join(chunks)
+
+
+class _TimeoutHTTPAdapter(HTTPAdapter):
+    """시간 초과를 지정하지 않는 라이브러리(YouTube 자막 등)의 요청에도 기본 시간 초과를 적용합니다."""
+
+    def send(self, request, **kwargs):
+        if kwargs.get("timeout") is None:
+            kwargs["timeout"] = HTTP_TIMEOUT_SECONDS
+        return super().send(request, **kwargs)
+
+def build_requests_session() -> requests.Session:
+    """블로킹 HTTP 클라이언트가 필요한 라이브러리에 넘겨줄, 연결 풀과 시간 초과가 설정된 세션을 만듭니다."""
+    session = requests.Session()
+    adapter = _TimeoutHTTPAdapter(pool_connections=HTTP_PER_HOST_CONCURRENCY, pool_maxsize=HTTP_MAX_CONNECTIONS,
+                                  max_retries=HTTP_MAX_RETRIES)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.headers["User-Agent"] = USER_AGENT
+    return session
+
+
+_fetcher: AsyncFetcher | None = None
+_http_cache: HttpCache | None = None
+_lock = threading.Lock()
+
+
+def get_http_cache() -> HttpCache:
+    global _http_cache
+    with _lock:
+        if _http_cache is None:
+            _http_cache = HttpCache()
+        return _http_cache
+
+def get_fetcher() -> AsyncFetcher:
+    """프로세스에서 공유하는 비동기 HTTP 클라이언트를 반환합니다."""
+    global _fetcher
+    if _fetcher is None:
+        _fetcher = AsyncFetcher(cache=get_http_cache())
+    return _fetcher
+
+async def close_fetcher():
+    global _fetcher
+    if _fetcher is not None:
+        await _fetcher.aclose()
+        _fetcher = None
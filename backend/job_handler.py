@@ -0,0 +1,494 @@
+# backend/job_handler.py
+
+import asyncio
+import inspect
+import json
+import os
+import time
+import uuid
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+
+from fastapi import UploadFile
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from . import crud, models, schemas, material_handler, rag_handler, tts_handler
+from .executor_handler import cpu_executor, io_executor, vector_executor
+from .database import SessionLocal, get_async_session_factory
+
+# 동시에 실행할 수 있는 생성 작업 수 (워커 수)
+JOB_WORKER_COUNT = int(os.getenv("JOB_WORKER_COUNT", "2"))
+# 새 작업 알림이 없을 때 대기열을 다시 확인하는 주기
+JOB_POLL_INTERVAL_SECONDS = float(os.getenv("JOB_POLL_INTERVAL_SECONDS", "2"))
+# SSE 진행 상황 스트림에서 작업 상태를 확인하는 주기
+JOB_EVENTS_INTERVAL_SECONDS = float(os.getenv("JOB_EVENTS_INTERVAL_SECONDS", "0.5"))
+
+# 업로드 파일은 작업이 끝날 때까지 디스크에 보관하여 재시작 후에도 처리할 수 있게 합니다.
+UPLOAD_DIRECTORY = Path(__file__).parent / "uploads"
+# 업로드 파일 하나의 최대 크기
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(100 * 1024 * 1024)))
+# 업로드 파일을 디스크로 옮길 때 한 번에 읽는 크기
+UPLOAD_CHUNK_BYTES = 1024 * 1024
+
+# 여러 소스를 한 번에 처리하는 작업에서 동시에 추출할 파일 수 (PDF는 파일 하나도 프로세스 풀 전체를 사용합니다)
+BATCH_FILE_CONCURRENCY = int(os.getenv("BATCH_FILE_CONCURRENCY", "2"))
+# 여러 소스를 한 번에 처리하는 작업에서 동시에 내려받을 URL/YouTube 수
+BATCH_FETCH_CONCURRENCY = int(os.getenv("BATCH_FETCH_CONCURRENCY", "8"))
+# 한 번에 올릴 수 있는 최대 소스 수
+MAX_BATCH_SOURCES = int(os.getenv("MAX_BATCH_SOURCES", "50"))
+# 벡터 저장소 고아 정리와 압축을 실행하는 주기 (0이면 실행하지 않음)
+VECTOR_MAINTENANCE_INTERVAL_HOURS = float(os.getenv("VECTOR_MAINTENANCE_INTERVAL_HOURS", "24"))
+
+JOB_STAGES = ["extract", "fingerprint", "store_source", "vectorize", "generate", "tts", "save"]
+TERMINAL_STATUSES = ("succeeded", "failed")
+
+_wakeup: asyncio.Event | None = None
+_workers: list[asyncio.Task] = []
+# 같은 노트의 작업이 동시에 통합 학습 자료를 갱신하여 한쪽 결과가 사라지지 않도록 노트별로 순서를 맞춥니다.
+# 노트 ID -> (잠금, 잠금을 기다리거나 가진 작업 수). 아무도 쓰지 않는 잠금은 지워 노트 수만큼 쌓이지 않게 합니다.
+_note_locks: dict[int, tuple[asyncio.Lock, int]] = {}
+
+@asynccontextmanager
+async def _note_lock(note_id: int):
+    lock, users = _note_locks.get(note_id, (None, 0))
+    lock = lock or asyncio.Lock()
+    _note_locks[note_id] = (lock, users + 1)
+    try:
+        async with lock:
+            yield
+    finally:
+        lock, users = _note_locks[note_id]
+        if users == 1:
+            del _note_locks[note_id]
+        else:
+            _note_locks[note_id] = (lock, users - 1)
+
+
+class UploadTooLargeError(Exception):
+    def __init__(self):
+        super().__init__(MAX_UPLOAD_BYTES)
+        self.detail = f"파일 크기가 업로드 제한({MAX_UPLOAD_BYTES // (1024 * 1024)}MB)을 초과했습니다."
+
+
+class NoteDeletedError(Exception):
+    """작업이 진행되는 동안 노트가 삭제되었을 때 발생합니다."""
+
+    def __init__(self, note_id: int | None):
+        super().__init__(f"노트 {note_id}가 삭제되었습니다.")
+        self.detail = "노트가 삭제되어 작업을 중단했습니다."
+
+
+# --- Enqueue ---
+
+async def save_upload(file: UploadFile) -> str:
+    """
+    업로드된 파일을 UPLOAD_CHUNK_BYTES 단위로 작업 처리용 디렉토리에 옮기고 경로를 반환합니다.
+    파일 전체를 메모리에 올리지 않으며, MAX_UPLOAD_BYTES를 넘으면 UploadTooLargeError를 발생시킵니다.
+    """
+    if file.size is not None and file.size > MAX_UPLOAD_BYTES:
+        raise UploadTooLargeError()
+
+    UPLOAD_DIRECTORY.mkdir(parents=True, exist_ok=True)
+    upload_path = UPLOAD_DIRECTORY / f"{uuid.uuid4().hex}_{Path(file.filename).name}"
+    written = 0
+    with open(upload_path, "wb") as out:
+        while chunk := await file.read(UPLOAD_CHUNK_BYTES):
+            written += len(chunk)
+            if written > MAX_UPLOAD_BYTES:
+                out.close()
+                upload_path.unlink(missing_ok=True)
+                raise UploadTooLargeError()
+            out.write(chunk)
+    return str(upload_path)
+
+def enqueue_job(db: Session, job_type: str, payload: dict, note_id: int, user_id: int) -> models.Job:
+    """작업을 대기열(SQLite)에 넣고 대기 중인 워커를 깨웁니다."""
+    db_job = crud.create_job(db, job_type=job_type, payload=payload, stage_names=JOB_STAGES, note_id=note_id, user_id=user_id)
+    if _wakeup is not None:
+        _wakeup.set()
+    return db_job
+
+
+# --- Worker Pool ---
+
+async def start_workers():
+    """앱 시작 시 중단된 작업을 복구하고 워커들을 실행합니다."""
+    global _wakeup
+    _wakeup = asyncio.Event()
+
+    db = SessionLocal()
+    try:
+        requeued = crud.requeue_interrupted_jobs(db)
+        if requeued:
+            print(f"[Job] 중단된 작업 {requeued}개를 다시 대기열에 넣었습니다.")
+    finally:
+        db.close()
+
+    for worker_index in range(JOB_WORKER_COUNT):
+        _workers.append(asyncio.create_task(_worker_loop(worker_index)))
+    if VECTOR_MAINTENANCE_INTERVAL_HOURS > 0:
+        _workers.append(asyncio.create_task(_vector_maintenance_loop()))
+
+async def stop_workers():
+    for worker in _workers:
+        worker.cancel()
+    await asyncio.gather(*_workers, return_exceptions=True)
+    _workers.clear()
+
+async def _worker_loop(worker_index: int):
+    while True:
+        db = SessionLocal()
+        try:
+            db_job = crud.claim_next_job(db)
+            if db_job is not None:
+                print(f"[Job] 워커 {worker_index}: 작업 {db_job.id} ({db_job.type}) 시작")
+                await _run_job(db, db_job)
+        except Exception as e:
+            print(f"[Job] 워커 {worker_index}: 대기열 처리 중 오류 발생: {e}")
+            db_job = None
+        finally:
+            db.close()
+
+        if db_job is None:
+            try:
+                await asyncio.wait_for(_wakeup.wait(), timeout=JOB_POLL_INTERVAL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+            _wakeup.clear()
+
+async def _vector_maintenance_loop():
+    """주기적으로 삭제된 노트의 남은 조각을 정리하고, 삭제가 일어난 컬렉션을 압축합니다."""
+    while True:
+        await asyncio.sleep(VECTOR_MAINTENANCE_INTERVAL_HOURS * 3600)
+        try:
+            await run_vector_maintenance()
+        except Exception as e:
+            print(f"[Job] 벡터 저장소 정리 중 오류 발생: {e}")
+
+async def run_vector_maintenance() -> dict:
+    db = SessionLocal()
+    try:
+        note_ids = crud.get_note_ids(db)
+    finally:
+        db.close()
+    before = await io_executor.run(rag_handler.vector_storage_bytes)
+    orphans = await vector_executor.run(rag_handler.sweep_orphans, note_ids, max(note_ids, default=0))
+    compacted = await vector_executor.run(rag_handler.compact_dirty_collections)
+    reclaimed = before - await io_executor.run(rag_handler.vector_storage_bytes)
+    print(f"[Job] 벡터 저장소 정리: 고아 노트 {len(orphans)}개, 압축한 컬렉션 {len(compacted)}개, {reclaimed} bytes 회수")
+    return {"orphans": orphans, "compacted": compacted, "reclaimed_bytes": reclaimed}
+
+# --- Pipeline ---
+
+def _now_iso() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+def _ensure_note(db: Session, db_job: models.Job):
+    """
+    노트가 삭제되었으면 NoteDeletedError를 발생시킵니다. 삭제 요청은 같은 이벤트 루프에서 처리되므로,
+    확인한 뒤 await 없이 이어지는 DB 쓰기는 삭제된 노트에 행을 만들지 않습니다.
+    """
+    if not crud.note_exists(db, db_job.note_id):
+        raise NoteDeletedError(db_job.note_id)
+
+async def _run_stage(db: Session, db_job: models.Job, stage_name: str, func):
+    """
+    단계를 실행하며 시작/종료 시각과 소요 시간을 작업에 기록합니다.
+    단계 전후(await 뒤)에 노트가 아직 있는지 확인합니다.
+    """
+    crud.update_job_stage(db, db_job, stage_name, status="running", started_at=_now_iso())
+    started = time.perf_counter()
+    # 노트가 삭제되면 작업의 note_id가 비워지므로 정리에 쓸 노트 id를 먼저 읽어 둡니다.
+    note_id = db_job.note_id
+    try:
+        _ensure_note(db, db_job)
+        result = func()
+        if inspect.isawaitable(result):
+            result = await result
+            _ensure_note(db, db_job)
+    except Exception:
+        crud.update_job_stage(db, db_job, stage_name, status="failed", finished_at=_now_iso(),
+                              duration_ms=round((time.perf_counter() - started) * 1000, 1))
+        raise
+    crud.update_job_stage(db, db_job, stage_name, status="done", finished_at=_now_iso(),
+                          duration_ms=round((time.perf_counter() - started) * 1000, 1))
+    return result
+
+def _mark_stages(db: Session, db_job: models.Job, status: str, *stage_names: str):
+    """실행하지 않은 단계를 'skipped' 또는 'cached'로 표시합니다."""
+    for stage_name in stage_names:
+        crud.update_job_stage(db, db_job, stage_name, status=status)
+
+def _job_sources(db_job: models.Job) -> list[dict]:
+    """작업의 소스 목록을 반환합니다. 단일 소스 작업은 소스 하나짜리 목록으로 다룹니다."""
+    if db_job.type == "batch":
+        return db_job.payload["sources"]
+    return [dict(db_job.payload, type=db_job.type)]
+
+def _describe_source(source: dict):
+    """소스 유형에 따라 Source에 저장할 (type, path)를 반환합니다."""
+    if source["type"] == "file":
+        return "file", source["filename"]
+    if source["type"] == "text":
+        return "text", "text_input"
+    return source["type"], source["url"]
+
+async def _extract_source(source: dict) -> material_handler.ExtractedText:
+    """
+    파일 파싱은 프로세스 풀에서(PDF는 페이지 범위별로 병렬) 실행합니다.
+    웹 페이지는 공유 비동기 HTTP 클라이언트로, YouTube 자막은 I/O 스레드 풀에서 내려받습니다.
+    """
+    if source["type"] == "file":
+        return await material_handler.extract_upload(source["upload_path"], source["filename"])
+    if source["type"] == "text":
+        return material_handler.ExtractedText(text=source["text"])
+    if source["type"] == "url":
+        return material_handler.ExtractedText(text=await material_handler.extract_text_from_url(source["url"]))
+    if source["type"] == "youtube":
+        return material_handler.ExtractedText(text=await io_executor.run(material_handler.extract_text_from_youtube, source["url"]))
+    raise ValueError(f"알 수 없는 소스 유형입니다: {source['type']}")
+
+async def _extract_sources(sources: list[dict]):
+    """
+    소스들을 동시에 추출하여 ([(type, path, 추출된 텍스트)], [실패한 소스]) 를 반환합니다.
+    일부 소스만 실패하면 나머지로 계속 진행하고, 모두 실패하면 첫 번째 오류를 다시 발생시킵니다.
+    """
+    file_slots = asyncio.Semaphore(BATCH_FILE_CONCURRENCY)
+    fetch_slots = asyncio.Semaphore(BATCH_FETCH_CONCURRENCY)
+
+    async def extract_one(source: dict):
+        async with file_slots if source["type"] == "file" else fetch_slots:
+            return await _extract_source(source)
+
+    results = await asyncio.gather(*(extract_one(source) for source in sources), return_exceptions=True)
+    extracted_sources, failed_sources, errors = [], [], []
+    for source, result in zip(sources, results):
+        source_type, source_path = _describe_source(source)
+        if isinstance(result, BaseException):
+            print(f"[Job] 소스 '{source_path}' 추출 실패: {result}")
+            errors.append(result)
+            failed_sources.append({"path": source_path, "error": getattr(result, "detail", None) or "소스를 처리하지 못했습니다."})
+        else:
+            extracted_sources.append((source_type, source_path, result))
+    if not extracted_sources:
+        raise errors[0]
+    return extracted_sources, failed_sources
+
+async def _generate_or_reuse_material(db: Session, db_job: models.Job, extracted_sources: list, fingerprint: str) -> schemas.LearningMaterialCreate:
+    """
+    같은 내용(지문)과 같은 프롬프트 버전으로 생성한 결과가 있으면 LLM과 TTS를 다시 호출하지 않고 재사용합니다.
+    소스가 여러 개이면 출처 머리말을 붙여 합친 텍스트로 한 번만 생성합니다.
+    """
+    cached = crud.get_cached_generation(db, fingerprint=fingerprint, prompt_version=material_handler.PROMPT_VERSION,
+                                        ttl_hours=material_handler.GENERATION_CACHE_TTL_HOURS)
+    if cached is not None:
+        material = schemas.LearningMaterialCreate(**cached.payload)
+        _mark_stages(db, db_job, "cached", "generate")
+        if tts_handler.audio_file_exists(material.audio_url):
+            _mark_stages(db, db_job, "cached", "tts")
+            return material
+    else:
+        # 전체 텍스트는 LLM 프롬프트에 필요할 때만 읽습니다.
+        text = await io_executor.run(material_handler.combine_source_texts,
+                                     [(source_path, extracted) for _, source_path, extracted in extracted_sources])
+        material = await _run_stage(db, db_job, "generate", lambda: material_handler.generate_material_content(text))
+
+    if material.summary:
+        material.audio_url = await _run_stage(db, db_job, "tts", lambda: io_executor.run(tts_handler.create_audio_briefing, material.summary))
+    else:
+        _mark_stages(db, db_job, "skipped", "tts")
+    crud.save_generation_cache(db, fingerprint=fingerprint, prompt_version=material_handler.PROMPT_VERSION, material=material)
+    return material
+
+async def _source_partial(db: Session, source_path: str, extracted: material_handler.ExtractedText, fingerprint: str) -> dict:
+    """소스 하나의 부분 결과를 만듭니다. 같은 내용(지문)의 부분 결과가 캐시되어 있으면 재사용합니다."""
+    cached = crud.get_cached_generation(db, fingerprint=fingerprint, prompt_version=material_handler.PARTIAL_PROMPT_VERSION,
+                                        ttl_hours=material_handler.GENERATION_CACHE_TTL_HOURS)
+    if cached is not None:
+        partial = cached.payload
+    else:
+        text = await io_executor.run(extracted.read)
+        partial = await material_handler.generate_source_partial(text, source_path)
+        crud.save_generation_cache(db, fingerprint=fingerprint, prompt_version=material_handler.PARTIAL_PROMPT_VERSION, material=partial)
+    return dict(partial, source=source_path)
+
+async def _merge_into_note_material(db: Session, db_job: models.Job, db_material: models.LearningMaterial,
+                                    extracted_sources: list, fingerprints: list[str]) -> schemas.LearningMaterialCreate:
+    """
+    노트에 이미 학습 자료가 있으면 새로 추가된 소스만 부분 결과로 요약하여 기존 자료에 합칩니다.
+    기존 소스는 다시 읽거나 요약하지 않으므로 열 번째 소스를 추가하는 비용도 소스 하나를 처리하는 비용과 같습니다.
+    """
+    async def generate():
+        partials = await asyncio.gather(*(
+            _source_partial(db, source_path, extracted, source_fingerprint)
+            for (_, source_path, extracted), source_fingerprint in zip(extracted_sources, fingerprints)
+        ))
+        return await material_handler.merge_into_material(material_handler.material_from_db(db_material), list(partials))
+
+    material = await _run_stage(db, db_job, "generate", generate)
+    if material.summary:
+        material.audio_url = await _run_stage(db, db_job, "tts", lambda: io_executor.run(tts_handler.create_audio_briefing, material.summary))
+    else:
+        _mark_stages(db, db_job, "skipped", "tts")
+    return material
+
+def _cleanup_upload(db_job: models.Job):
+    """업로드 파일과 그 파일에서 추출한 텍스트 파일을 삭제합니다."""
+    for source in _job_sources(db_job):
+        upload_path = source.get("upload_path")
+        if upload_path:
+            Path(upload_path).unlink(missing_ok=True)
+            Path(upload_path + material_handler.EXTRACTED_TEXT_SUFFIX).unlink(missing_ok=True)
+
+async def _run_job(db: Session, db_job: models.Job):
+    """추출 → 지문 계산 → 소스 저장 → 벡터화 → 생성 → TTS → 저장 순으로 작업을 실행합니다."""
+    # 노트가 삭제되면 작업의 note_id가 비워지므로 정리에 쓸 노트 id를 먼저 읽어 둡니다.
+    note_id = db_job.note_id
+    try:
+        _ensure_note(db, db_job)
+        extracted_sources, failed_sources = await _run_stage(db, db_job, "extract", lambda: _extract_sources(_job_sources(db_job)))
+        fingerprints = await _run_stage(db, db_job, "fingerprint",
+                                        lambda: cpu_executor.run(material_handler.fingerprint_sources,
+                                                                 [extracted for _, _, extracted in extracted_sources]))
+
+        # 학습 자료에 이미 반영된 소스(같은 지문, 'merged')는 다시 저장하거나 색인하지 않습니다.
+        # 이전 시도가 도중에 실패하여 남은 소스('stored'/'indexed')는 새로 저장하지 않고 남은 단계부터 이어서 처리합니다.
+        # 동시에 같은 소스를 올려도 한 번만 저장되도록 확인과 저장을 노트 잠금 안에서 합니다.
+        async with _note_lock(db_job.note_id):
+            # 지문 -> 노트의 Source 행
+            db_sources = crud.get_note_sources_by_fingerprint(db, note_id=db_job.note_id, fingerprints=fingerprints)
+            unique_sources, new_sources, duplicate_paths = [], [], []
+            for source, source_fingerprint in zip(extracted_sources, fingerprints):
+                if any(source_fingerprint == other for _, other in unique_sources):
+                    duplicate_paths.append(source[1])
+                    continue
+                db_source = db_sources.get(source_fingerprint)
+                if db_source is not None:
+                    # 조각과 Source 행의 경로가 같도록 저장된 소스의 경로를 사용합니다.
+                    source = (db_source.type, db_source.path, source[2])
+                unique_sources.append((source, source_fingerprint))
+                if db_source is not None and db_source.status == "merged":
+                    duplicate_paths.append(source[1])
+                else:
+                    new_sources.append((source, source_fingerprint))
+            if duplicate_paths:
+                print(f"[Job] 작업 {db_job.id}: 노트에 이미 있는 소스를 건너뜁니다: {duplicate_paths}")
+
+            to_store = [(source, source_fingerprint) for source, source_fingerprint in new_sources if source_fingerprint not in db_sources]
+            source_creates = [
+                schemas.SourceCreate(type=source_type, path=source_path, content=extracted.preview(500), fingerprint=source_fingerprint) # 미리보기
+                for (source_type, source_path, extracted), source_fingerprint in to_store
+            ]
+            if source_creates:
+                stored = await _run_stage(db, db_job, "store_source",
+                                          lambda: crud.create_note_sources(db=db, sources=source_creates, note_id=db_job.note_id,
+                                                                           status="stored"))
+                db_sources.update((db_source.fingerprint, db_source) for db_source in stored)
+            else:
+                _mark_stages(db, db_job, "skipped", "store_source")
+
+        to_index = [(source, db_sources[source_fingerprint]) for source, source_fingerprint in new_sources
+                    if db_sources[source_fingerprint].status == "stored"]
+        if to_index:
+            await _run_stage(db, db_job, "vectorize",
+                             lambda: vector_executor.run(rag_handler.add_sources_to_vector_store, note_id=db_job.note_id,
+                                                         sources=[(extracted.iter_pieces(), source_path, extracted.page_offsets)
+                                                                  for (_, source_path, extracted), _ in to_index]))
+            crud.set_sources_status(db, [db_source.id for _, db_source in to_index], "indexed")
+        else:
+            _mark_stages(db, db_job, "skipped", "vectorize")
+        result = {}
+        if failed_sources:
+            result["failed_sources"] = failed_sources
+        if duplicate_paths:
+            result["duplicate_sources"] = duplicate_paths
+        result = result or None
+
+        # API 키가 없거나 임시 키일 경우 목업 데이터를 결과로 남기고 DB에는 저장하지 않습니다.
+        if not material_handler.is_gemini_configured():
+            print("Warning: GEMINI_API_KEY is not configured. Returning mock data.")
+            _mark_stages(db, db_job, "skipped", "generate", "tts", "save")
+            mock_material = material_handler.build_mock_material(", ".join(source_path for _, source_path, _ in extracted_sources))
+            crud.finish_job(db, db_job, "succeeded", result=dict(mock_material.dict(), **(result or {})))
+            _cleanup_upload(db_job)
+            return
+
+        # 노트마다 통합 학습 자료는 하나입니다. 처음에는 새로 생성하고, 이후에는 새 소스만 기존 자료에 합칩니다.
+        # 소스는 자료를 저장하는 커밋에서 'merged'로 표시하므로, 그 전에 실패하면 다시 시도할 때 다시 합칩니다.
+        async with _note_lock(db_job.note_id):
+            db_material = crud.get_note_material(db, note_id=db_job.note_id)
+            if db_material is None:
+                # 자료가 아직 없으면(이전 생성 실패 등) 이미 저장된 소스도 포함하여 생성합니다.
+                fingerprint = material_handler.combine_fingerprints([source_fingerprint for _, source_fingerprint in unique_sources])
+                merged_ids = [db_sources[source_fingerprint].id for _, source_fingerprint in unique_sources]
+                material = await _generate_or_reuse_material(db, db_job, [source for source, _ in unique_sources], fingerprint)
+                db_material = await _run_stage(db, db_job, "save",
+                                               lambda: crud.create_learning_material(db=db, material=material, note_id=db_job.note_id,
+                                                                                     merged_source_ids=merged_ids))
+            elif not new_sources:
+                # 모든 소스가 이미 자료에 합쳐져 있으므로 같은 내용을 다시 합치지 않습니다.
+                _mark_stages(db, db_job, "skipped", "generate", "tts", "save")
+            else:
+                merged_ids = [db_sources[source_fingerprint].id for _, source_fingerprint in new_sources]
+                material = await _merge_into_note_material(db, db_job, db_material, [source for source, _ in new_sources],
+                                                           [source_fingerprint for _, source_fingerprint in new_sources])
+                db_material = await _run_stage(db, db_job, "save",
+                                               lambda: crud.replace_learning_material(db, db_material, material,
+                                                                                      merged_source_ids=merged_ids))
+        crud.finish_job(db, db_job, "succeeded", material_id=db_material.id, result=result)
+        _cleanup_upload(db_job)
+
+    except Exception as e:
+        print(f"[Job] 작업 {db_job.id} 실패: {e}")
+        db.rollback()
+        if isinstance(e, NoteDeletedError):
+            # 삭제와 겹쳐 저장된 조각이 남지 않도록 노트의 벡터를 다시 지웁니다.
+            try:
+                await vector_executor.run(rag_handler.delete_note_vectors, note_id)
+            except Exception as cleanup_error:
+                print(f"[Job] 작업 {db_job.id}: 삭제된 노트 {note_id}의 벡터 정리 실패: {cleanup_error}")
+        detail = getattr(e, "detail", None) or "AI 자료 생성 중 오류가 발생했습니다."
+        crud.finish_job(db, db_job, "failed", error=detail)
+        _cleanup_upload(db_job)
+
+
+# --- Progress Stream ---
+
+async def _load_job_event(job_id: str, user_id: int):
+    """작업의 (SSE 데이터, 상태)를 읽습니다. 비동기 엔진이 켜져 있으면 이벤트 루프를 막지 않고 읽습니다."""
+    session_factory = get_async_session_factory()
+    if session_factory is not None:
+        async with session_factory() as db:
+            db_job = (await db.execute(
+                select(models.Job).where(models.Job.id == job_id, models.Job.owner_id == user_id)
+            )).scalar_one_or_none()
+            if db_job is None:
+                return None, None
+            return schemas.Job.model_validate(db_job, from_attributes=True).model_dump_json(), db_job.status
+
+    db = SessionLocal()
+    try:
+        db_job = crud.get_job(db, job_id=job_id, user_id=user_id)
+        if db_job is None:
+            return None, None
+        return schemas.Job.model_validate(db_job, from_attributes=True).model_dump_json(), db_job.status
+    finally:
+        db.close()
+
+async def stream_job_events(job_id: str, user_id: int):
+    """작업 상태가 바뀔 때마다 SSE 이벤트를 내보내고, 작업이 끝나면 스트림을 종료합니다."""
+    last_event = None
+    while True:
+        event, status = await _load_job_event(job_id, user_id)
+        if event is None:
+            yield f"event: error\ndata: {json.dumps({'detail': '작업을 찾을 수 없습니다.'}, ensure_ascii=False)}\n\n"
+            return
+
+        if event != last_event:
+            yield f"data: {event}\n\n"
+            last_event = event
+        if status in TERMINAL_STATUSES:
+            return
+        await asyncio.sleep(JOB_EVENTS_INTERVAL_SECONDS)
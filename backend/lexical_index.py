@@ -0,0 +1,189 @@
+# backend/lexical_index.py
+
+import functools
+import json
+import os
+import re
+import sqlite3
+import threading
+import unicodedata
+
+# 노트별 BM25 어휘 색인 파일 (SQLite FTS5)
+LEXICAL_INDEX_PATH = os.getenv("LEXICAL_INDEX_PATH", "lexical_index.db")
+# 토크나이저: 'korean'(기본, 조사 제거 + 한글 바이그램), 'kiwi'(kiwipiepy 형태소 분석, 설치된 경우), 'simple'(단어 단위)
+LEXICAL_TOKENIZER = os.getenv("LEXICAL_TOKENIZER", "korean")
+
+# 한글과 영문/숫자가 붙어 있으면('note와', 'API를') 나누어 조사가 따로 떨어지도록 합니다.
+TOKEN_PATTERN = re.compile(r"[가-힣]+|[^\W가-힣]+")
+HANGUL_PATTERN = re.compile(r"^[가-힣]+$")
+# 긴 조사부터 비교하여 '에서는'이 '는'보다 먼저 제거되도록 합니다.
+KOREAN_PARTICLES = sorted([
+    "으로부터", "에서부터", "이라고", "으로써", "으로서", "에서는", "에게서", "한테서", "까지", "부터", "에서", "에게",
+    "한테", "으로", "이나", "이라", "라고", "하고", "처럼", "보다", "마다", "조차", "와", "과", "은", "는", "이", "가",
+    "을", "를", "에", "의", "도", "로", "만", "랑",
+], key=len, reverse=True)
+
+
+def _split_identifier(token: str) -> list[str]:
+    """코드 식별자(get_retriever, camelCase)는 전체와 함께 구성 단어도 색인합니다."""
+    parts = [part for part in re.split(r"_|(?<=[a-z0-9])(?=[A-Z])", token) if part]
+    return parts if len(parts) > 1 else []
+
+@functools.lru_cache(maxsize=100_000)
+def _strip_particle(word: str) -> str:
+    for particle in KOREAN_PARTICLES:
+        if word.endswith(particle) and len(word) - len(particle) >= 2:
+            return word[:-len(particle)]
+    return word
+
+def tokenize_simple(text: str) -> list[str]:
+    tokens = []
+    for token in TOKEN_PATTERN.findall(unicodedata.normalize("NFKC", text)):
+        tokens.append(token.lower())
+        tokens.extend(part.lower() for part in _split_identifier(token))
+    return tokens
+
+def tokenize_korean(text: str) -> list[str]:
+    """
+    형태소 분석기 없이 한국어를 색인합니다. 한글 어절은 끝의 조사를 떼어낸 어간과 그 글자 바이그램으로 나누어
+    '인공지능'과 '인공 지능', '서울은'과 '서울'처럼 띄어쓰기나 조사가 달라도 일치하도록 합니다.
+    """
+    tokens = []
+    for token in tokenize_simple(text):
+        if not HANGUL_PATTERN.match(token):
+            tokens.append(token)
+            continue
+        if token in KOREAN_PARTICLES:
+            continue
+        stem = _strip_particle(token)
+        tokens.append(stem)
+        if len(stem) > 2:
+            tokens.extend(stem[i:i + 2] for i in range(len(stem) - 1))
+    return tokens
+
+_kiwi = None
+_kiwi_lock = threading.Lock()
+
+def tokenize_kiwi(text: str) -> list[str]:
+    """kiwipiepy 형태소 분석기로 명사, 동사/형용사 어간, 외국어, 숫자만 색인합니다. 설치되어 있지 않으면 korean 방식을 사용합니다."""
+    global _kiwi
+    with _kiwi_lock:
+        if _kiwi is None:
+            try:
+                from kiwipiepy import Kiwi
+            except ImportError:
+                print("[Lexical] kiwipiepy가 설치되어 있지 않아 기본 한국어 토크나이저를 사용합니다.")
+                _kiwi = False
+            else:
+                _kiwi = Kiwi()
+    if _kiwi is False:
+        return tokenize_korean(text)
+    return [token.form.lower() for token in _kiwi.tokenize(unicodedata.normalize("NFKC", text))
+            if token.tag.startswith(("NN", "VV", "VA", "XR", "SL", "SH", "SN"))]
+
+TOKENIZERS = {"simple": tokenize_simple, "korean": tokenize_korean, "kiwi": tokenize_kiwi}
+
+def tokenize(text: str, tokenizer: str = LEXICAL_TOKENIZER) -> list[str]:
+    return TOKENIZERS[tokenizer](text)
+
+
+class LexicalIndex:
+    """
+    노트별 RAG 조각을 SQLite FTS5에 색인하고 BM25 점수로 검색합니다.
+    토큰화는 파이썬에서 하고(한국어 처리), FTS5에는 공백으로 이어 붙인 토큰만 넣습니다.
+    note 열은 검색 대상 노트로 범위를 좁히는 데만 쓰고 BM25 점수에는 반영하지 않습니다.
+    """
+
+    def __init__(self, path: str = LEXICAL_INDEX_PATH, tokenizer: str = LEXICAL_TOKENIZER):
+        self.path = path
+        self.tokenizer = tokenizer
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS chunks USING fts5("
+            " tokens, note, content UNINDEXED, metadata UNINDEXED, tokenize='unicode61 remove_diacritics 0')"
+        )
+        self._conn.commit()
+
+    def add(self, note_id: int, documents):
+        """LangChain Document 목록을 노트의 색인에 추가합니다."""
+        rows = [
+            (" ".join(tokenize(doc.page_content, self.tokenizer)), f"n{note_id}", doc.page_content, json.dumps(doc.metadata, ensure_ascii=False))
+            for doc in documents
+        ]
+        if not rows:
+            return
+        with self._lock:
+            self._conn.executemany("INSERT INTO chunks (tokens, note, content, metadata) VALUES (?, ?, ?, ?)", rows)
+            self._conn.commit()
+
+    def search(self, note_id: int, query: str, k: int) -> list[tuple[str, dict]]:
+        """BM25 점수가 높은 순서로 (조각 내용, 메타데이터)를 최대 k개 반환합니다."""
+        terms = sorted(set(tokenize(query, self.tokenizer)))
+        if not terms:
+            return []
+        match = f"note : n{note_id} AND tokens : (" + " OR ".join('"' + term.replace('"', '""') + '"' for term in terms) + ")"
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT content, metadata FROM chunks WHERE chunks MATCH ? ORDER BY bm25(chunks, 1.0, 0.0) LIMIT ?",
+                (match, k)
+            ).fetchall()
+        return [(content, json.loads(metadata)) for content, metadata in rows]
+
+    def count(self, note_id: int) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM chunks WHERE chunks MATCH ?", (f"note : n{note_id}",)).fetchone()[0]
+
+    def delete(self, note_id: int, source: str | None = None, min_rowid: int | None = None, max_rowid: int | None = None):
+        """노트의 조각을 삭제합니다. source나 rowid 범위를 주면 그에 해당하는 조각만 삭제합니다."""
+        sql = "DELETE FROM chunks WHERE rowid IN (SELECT rowid FROM chunks WHERE chunks MATCH ?)"
+        params = [f"note : n{note_id}"]
+        if source is not None:
+            sql += " AND json_extract(metadata, '$.source') = ?"
+            params.append(source)
+        if min_rowid is not None:
+            sql += " AND rowid >= ?"
+            params.append(min_rowid)
+        if max_rowid is not None:
+            sql += " AND rowid <= ?"
+            params.append(max_rowid)
+        with self._lock:
+            self._conn.execute(sql, params)
+            self._conn.commit()
+
+    def documents(self, note_id: int) -> dict:
+        """노트의 모든 조각을 Chroma의 get()과 같은 형태({"documents", "metadatas"})로 반환합니다."""
+        with self._lock:
+            rows = self._conn.execute("SELECT content, metadata FROM chunks WHERE chunks MATCH ? ORDER BY rowid",
+                                      (f"note : n{note_id}",)).fetchall()
+        return {"documents": [content for content, _ in rows], "metadatas": [json.loads(metadata) for _, metadata in rows]}
+
+    def max_rowid(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COALESCE(MAX(rowid), 0) FROM chunks").fetchone()[0]
+
+    def note_ids(self) -> list[int]:
+        with self._lock:
+            rows = self._conn.execute("SELECT DISTINCT note FROM chunks").fetchall()
+        return sorted(int(note[1:]) for note, in rows if note[1:].isdigit())
+
+    def optimize(self):
+        """삭제로 생긴 FTS 세그먼트를 병합하고 파일 크기를 줄입니다."""
+        with self._lock:
+            self._conn.execute("INSERT INTO chunks (chunks) VALUES ('optimize')")
+            self._conn.commit()
+            self._conn.execute("VACUUM")
+
+
+_index: LexicalIndex | None = None
+_index_lock = threading.Lock()
+
+
+def get_lexical_index() -> LexicalIndex:
+    """프로세스에서 공유하는 어휘 색인을 반환합니다."""
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = LexicalIndex()
+        return _index
@@ -0,0 +1,125 @@
+# backend/local_embeddings.py
+
+import os
+import re
+import threading
+import zlib
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from .lexical_index import tokenize_korean
+
+# hashing 백엔드의 벡터 차원 수
+HASHING_EMBEDDING_DIMENSIONS = int(os.getenv("HASHING_EMBEDDING_DIMENSIONS", "1024"))
+# sentence-transformers 백엔드 모델 (한국어를 지원하는 작은 다국어 모델)
+LOCAL_EMBEDDING_MODEL = os.getenv("LOCAL_EMBEDDING_MODEL", "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2")
+# sentence-transformers 백엔드가 한 번에 추론하는 텍스트 수
+LOCAL_EMBEDDING_BATCH_SIZE = int(os.getenv("LOCAL_EMBEDDING_BATCH_SIZE", "64"))
+# 문자 n-gram 특징의 가중치 (단어 특징은 1.0)
+CHAR_NGRAM_WEIGHT = 0.5
+# hashing 백엔드가 특징 해시 결과를 보관하는 최대 토큰 수
+FEATURE_CACHE_SIZE = 200_000
+
+
+class HashingEmbeddings(Embeddings):
+    """
+    외부 모델 없이 CPU에서 바로 계산하는 해싱 벡터화 임베딩입니다.
+    BM25 색인과 같은 한국어 토큰(조사 제거 어간 + 바이그램)과 문자 3-gram을 고정 차원으로 해싱하고,
+    배치 전체를 하나의 행렬로 모아 numpy로 log 빈도 가중과 정규화를 한 번에 계산합니다.
+    해시는 crc32를 사용하므로 프로세스가 바뀌어도 같은 텍스트는 같은 벡터가 됩니다.
+    """
+
+    def __init__(self, dimensions: int = HASHING_EMBEDDING_DIMENSIONS):
+        self.dimensions = dimensions
+        self.model_name = f"hashing-{dimensions}"
+        # 토큰별 특징 해시 결과 (어휘 수는 많지 않으므로 상한까지 보관)
+        self._features: dict[str, tuple[list[int], list[float]]] = {}
+
+    def _hash(self, feature: str) -> tuple[int, float]:
+        digest = zlib.crc32(feature.encode("utf-8"))
+        # 해시 충돌이 한쪽으로 쌓이지 않도록 부호도 해시로 정합니다.
+        return digest % self.dimensions, 1.0 if digest & 0x80000000 else -1.0
+
+    def _token_features(self, token: str) -> tuple[list[int], list[float]]:
+        """토큰 하나의 특징(토큰 자체 + 긴 토큰의 문자 3-gram)이 들어갈 열과 가중치입니다."""
+        features = self._features.get(token)
+        if features is None:
+            columns, weights = [], []
+            column, sign = self._hash(token)
+            columns.append(column)
+            weights.append(sign)
+            if len(token) > 3:
+                padded = f"<{token}>"
+                for i in range(len(padded) - 2):
+                    column, sign = self._hash(padded[i:i + 3])
+                    columns.append(column)
+                    weights.append(sign * CHAR_NGRAM_WEIGHT)
+            features = (columns, weights)
+            if len(self._features) < FEATURE_CACHE_SIZE:
+                self._features[token] = features
+        return features
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        indices, weights = [], []
+        for row, text in enumerate(texts):
+            offset = row * self.dimensions
+            for token in tokenize_korean(text):
+                columns, token_weights = self._token_features(token)
+                indices.extend(offset + column for column in columns)
+                weights.extend(token_weights)
+
+        # 배치 전체의 (행, 열) 가중치를 한 번의 bincount로 합산합니다.
+        matrix = np.bincount(np.asarray(indices, dtype=np.intp), weights=np.asarray(weights, dtype=np.float64),
+                             minlength=len(texts) * self.dimensions).astype(np.float32).reshape(len(texts), self.dimensions)
+        matrix = np.sign(matrix) * np.log1p(np.abs(matrix))
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        matrix /= np.where(norms == 0, 1.0, norms)
+        return matrix.tolist()
+
+    def embed_query(self, text: str) -> list[float]:
+        return self.embed_documents([text])[0]
+
+
+class SentenceTransformerEmbeddings(Embeddings):
+    """sentence-transformers 모델로 CPU에서 배치 추론합니다. 모델은 첫 사용 시 한 번만 불러옵니다."""
+
+    def __init__(self, model_name: str = LOCAL_EMBEDDING_MODEL, batch_size: int = LOCAL_EMBEDDING_BATCH_SIZE):
+        from sentence_transformers import SentenceTransformer
+
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self._model = SentenceTransformer(model_name, device="cpu")
+        # 모델 추론은 스레드 안전하지 않을 수 있으므로 한 번에 하나의 배치만 실행합니다.
+        self._lock = threading.Lock()
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        if not texts:
+            return []
+        with self._lock:
+            vectors = self._model.encode(texts, batch_size=self.batch_size, normalize_embeddings=True,
+                                         convert_to_numpy=True, show_progress_bar=False)
+        return vectors.tolist()
+
+    def embed_query(self, text: str) -> list[float]:
+        return self.embed_documents([text])[0]
+
+
+def local_backend_name(backend: str) -> str:
+    """백엔드와 모델을 구분하는 이름 (벡터 차원이 다르므로 벡터 저장소 디렉토리 이름에 사용합니다)."""
+    if backend == "sentence-transformers":
+        return "st_" + re.sub(r"\W+", "_", LOCAL_EMBEDDING_MODEL.split("/")[-1]).lower()
+    return f"hashing{HASHING_EMBEDDING_DIMENSIONS}"
+
+def create_local_embeddings(backend: str) -> Embeddings | None:
+    """
+    로컬 임베딩 백엔드를 만듭니다. sentence-transformers가 설치되어 있지 않으면 None을 반환합니다
+    (다른 차원의 벡터가 같은 저장소에 섞이지 않도록 hashing으로 대신하지 않습니다).
+    """
+    if backend == "sentence-transformers":
+        try:
+            return SentenceTransformerEmbeddings()
+        except ImportError:
+            print("[Embedding] sentence-transformers가 설치되어 있지 않습니다. pip install sentence-transformers")
+            return None
+    return HashingEmbeddings()
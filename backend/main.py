@@ -1,34 +1,24 @@
-from fastapi import Depends, FastAPI, HTTPException, File, UploadFile, status, Form
+from fastapi import Depends, FastAPI, HTTPException, File, Query, Request, UploadFile, status, Form
 from fastapi.responses import StreamingResponse
 from fastapi.security import OAuth2PasswordRequestForm
 from datetime import timedelta
-import os
-import json
 from typing import List, Optional
 from dotenv import load_dotenv
-import google.generativeai as genai
 
 from fastapi.middleware.cors import CORSMiddleware
 from sqlalchemy.orm import Session
 from pydantic import BaseModel
-import io
-
-# PDF 및 DOCX 처리를 위한 라이브러리 임포트
-import docx
-from pypdf import PdfReader # pypdf2 is deprecated, use pypdf
-import trafilatura
-from youtube_transcript_api import YouTubeTranscriptApi, NoTranscriptFound
-import re
 
 from fastapi.staticfiles import StaticFiles
 from pathlib import Path
 
-from . import auth, crud, models, schemas, rag_handler, tts_handler
-from .database import SessionLocal, engine
+from . import auth, chat_memory, client_registry, crud, models, schemas, rag_handler, material_handler, job_handler, executor_handler, embedding_cache, http_fetcher, answer_cache, sse, pagination
+from . import database
+from .database import engine
 
 load_dotenv() # .env 파일에서 환경 변수 로드
 
-models.Base.metadata.create_all(bind=engine)
+database.upgrade_schema(engine)
 
 app = FastAPI()
 
@@ -48,42 +38,64 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Dependency
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+@app.on_event("startup")
+async def start_job_workers():
+    await executor_handler.vector_executor.run(rag_handler.warm_up)
+    await job_handler.start_workers()
+
+@app.on_event("shutdown")
+async def stop_job_workers():
+    await job_handler.stop_workers()
+    await http_fetcher.close_fetcher()
+    await database.dispose_async_engine()
+    executor_handler.shutdown_executors()
+
+# Dependency: auth.get_current_user와 같은 함수를 사용하므로 요청마다 세션이 하나만 열립니다.
+get_db = database.get_db
 
 # --- Auth Endpoints ---
 
 @app.post("/token", response_model=schemas.Token)
 async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
     user = crud.get_user_by_username(db, username=form_data.username)
-    if not user or not auth.verify_password(form_data.password, user.hashed_password):
+    verified, new_hash = False, None
+    if user:
+        try:
+            verified, new_hash = await auth.verify_and_update_password(form_data.password, user.hashed_password)
+        except executor_handler.ExecutorBusyError as e:
+            raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=e.detail)
+    if not verified:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="사용자 이름 또는 비밀번호가 잘못되었습니다.",
             headers={"WWW-Authenticate": "Bearer"},
         )
+    if new_hash:
+        # 해시 설정이 바뀌었으면 로그인에 성공한 김에 새 설정으로 다시 저장합니다.
+        crud.update_user_password(db, user, new_hash)
+        auth.forget_user(user.username)
     access_token_expires = timedelta(minutes=auth.ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = auth.create_access_token(
-        data={"sub": user.username}, expires_delta=access_token_expires
+        data={"sub": user.username, "uid": user.id}, expires_delta=access_token_expires
     )
     return {"access_token": access_token, "token_type": "bearer"}
 
 
 @app.post("/users/", response_model=schemas.User)
-def create_user(user: schemas.UserCreate, db: Session = Depends(get_db)):
+async def create_user(user: schemas.UserCreate, db: Session = Depends(get_db)):
     db_user = crud.get_user_by_username(db, username=user.username)
     if db_user:
         raise HTTPException(status_code=400, detail="이미 등록된 사용자 이름입니다.")
-    return crud.create_user(db=db, user=user)
+    try:
+        hashed_password = await auth.hash_password(user.password)
+    except executor_handler.ExecutorBusyError as e:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=e.detail)
+    return crud.create_user(db=db, user=user, hashed_password=hashed_password)
 
 @app.get("/users/me", response_model=schemas.User)
-async def read_users_me(current_user: schemas.User = Depends(auth.get_current_user)):
-    return current_user
+def read_users_me(db: Session = Depends(get_db), current_user: schemas.User = Depends(auth.get_current_user)):
+    # 인증에서 읽은 사용자는 노트를 읽지 않았으므로, 노트와 소스를 미리 읽어 지연 로딩을 피합니다.
+    return crud.get_user(db, user_id=current_user.id)
 
 # --- Learning Note Endpoints (New) ---
 
@@ -98,17 +110,22 @@ def create_learning_note(
     """
     return crud.create_learning_note(db=db, note=note, user_id=current_user.id)
 
-@app.get("/api/notes", response_model=List[schemas.LearningNote])
+@app.get("/api/notes", response_model=schemas.NotePage)
 def read_user_notes(
-    skip: int = 0, limit: int = 100,
+    cursor: Optional[str] = None,
+    limit: int = Query(pagination.PAGE_SIZE_DEFAULT, ge=1, le=pagination.PAGE_SIZE_MAX),
     db: Session = Depends(get_db),
     current_user: schemas.User = Depends(auth.get_current_user)
 ):
     """
-    현재 사용자의 모든 학습 노트를 조회합니다.
+    현재 사용자의 학습 노트를 한 페이지씩 조회합니다. 다음 페이지는 응답의 next_cursor를 cursor로 넘겨 요청합니다.
     """
-    notes = crud.get_notes_by_user(db, user_id=current_user.id, skip=skip, limit=limit)
-    return notes
+    try:
+        after_id = pagination.decode_cursor(cursor)
+    except pagination.InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=e.detail)
+    notes = crud.get_notes_by_user(db, user_id=current_user.id, after_id=after_id, limit=limit + 1)
+    return pagination.make_page(notes, limit)
 
 @app.get("/api/notes/{note_id}", response_model=schemas.LearningNote)
 def read_note(
@@ -119,25 +136,45 @@ def read_note(
     """
     특정 학습 노트를 조회합니다.
     """
-    db_note = crud.get_note(db, note_id=note_id, user_id=current_user.id)
+    db_note = crud.get_note(db, note_id=note_id, user_id=current_user.id, with_sources=True)
     if db_note is None:
         raise HTTPException(status_code=404, detail="노트를 찾을 수 없습니다.")
     return db_note
 
 @app.delete("/api/notes/{note_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_note(
+async def delete_note(
     note_id: int,
     db: Session = Depends(get_db),
     current_user: schemas.User = Depends(auth.get_current_user)
 ):
     """
-    특정 학습 노트를 삭제합니다.
+    특정 학습 노트를 삭제합니다. 노트의 벡터 저장소 조각과 대화 세션도 함께 삭제합니다.
     """
     success = crud.delete_note(db, note_id=note_id, user_id=current_user.id)
     if not success:
         raise HTTPException(status_code=404, detail="노트를 찾을 수 없습니다.")
+    chat_memory.forget_note(note_id)
+    try:
+        await executor_handler.vector_executor.run(rag_handler.delete_note_vectors, note_id)
+    except Exception as e:
+        # 남은 조각은 주기적인 고아 정리(job_handler)에서 삭제됩니다.
+        print(f"[RAG] Note ID {note_id}: 벡터 저장소 삭제 중 오류 발생: {e}")
     return
 
+@app.post("/api/notes/{note_id}/reindex")
+async def reindex_note(
+    note_id: int,
+    db: Session = Depends(get_db),
+    db_note: models.LearningNote = Depends(auth.get_current_note)
+):
+    """
+    노트의 조각을 현재 분할 설정으로 다시 나누고 임베딩합니다.
+    """
+    chunks = await executor_handler.vector_executor.run(rag_handler.reindex_note, note_id, crud.get_source_texts(db, note_id))
+    if chunks is None:
+        raise HTTPException(status_code=503, detail="임베딩 모델을 사용할 수 없습니다.")
+    return {"chunks": chunks}
+
 
 # --- Source Endpoints (New) ---
 
@@ -147,15 +184,11 @@ async def add_source_to_note(
     file: Optional[UploadFile] = File(None),
     url: Optional[str] = Form(None),
     db: Session = Depends(get_db),
-    current_user: schemas.User = Depends(auth.get_current_user)
+    db_note: models.LearningNote = Depends(auth.get_current_note)
 ):
     """
     학습 노트에 새로운 소스(파일 또는 URL)를 추가합니다.
     """
-    db_note = crud.get_note(db, note_id=note_id, user_id=current_user.id)
-    if db_note is None:
-        raise HTTPException(status_code=404, detail="노트를 찾을 수 없습니다.")
-
     if file:
         # 파일 처리 로직 (Phase 3에서 구체화)
         # 우선 파일명과 타입만 저장
@@ -168,6 +201,23 @@ async def add_source_to_note(
     else:
         raise HTTPException(status_code=400, detail="파일이나 URL이 제공되지 않았습니다.")
 
+@app.delete("/api/notes/{note_id}/sources/{source_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_source_from_note(
+    note_id: int,
+    source_id: int,
+    db: Session = Depends(get_db),
+    db_note: models.LearningNote = Depends(auth.get_current_note)
+):
+    """
+    노트에서 소스를 삭제하고, 같은 경로의 다른 소스가 없으면 그 소스의 조각도 벡터 저장소에서 삭제합니다.
+    """
+    db_source = crud.delete_source(db, source_id=source_id, note_id=note_id)
+    if db_source is None:
+        raise HTTPException(status_code=404, detail="소스를 찾을 수 없습니다.")
+    if not crud.source_path_in_use(db, note_id=note_id, path=db_source.path):
+        await executor_handler.vector_executor.run(rag_handler.delete_source_vectors, note_id, db_source.path)
+    return
+
 
 # --- Deprecated Material Endpoints ---
 
@@ -188,195 +238,64 @@ async def add_source_to_note(
 
 class ChatQuery(BaseModel):
     question: str
+    # 이전 응답의 session 이벤트로 받은 ID. 없으면 새 대화 세션을 시작합니다.
+    session_id: Optional[str] = None
 
 @app.post("/api/notes/{note_id}/chat")
 async def chat_with_note(
     note_id: int,
     query: ChatQuery,
+    request: Request,
     db: Session = Depends(get_db),
-    current_user: schemas.User = Depends(auth.get_current_user)
+    db_note: models.LearningNote = Depends(auth.get_current_note)
 ):
     """
     특정 학습 노트에 대한 채팅 질문을 스트리밍으로 처리합니다.
     """
-    db_note = crud.get_note(db, note_id=note_id, user_id=current_user.id)
-    if db_note is None:
-        raise HTTPException(status_code=404, detail="노트를 찾을 수 없거나 접근 권한이 없습니다.")
+    session = chat_memory.open_session(db, note_id=note_id, user_id=db_note.owner_id, session_id=query.session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="대화 세션을 찾을 수 없습니다.")
 
     # RAG 핸들러는 이제 note_id를 기반으로 작동해야 합니다.
+    # sse.stream_events가 이벤트를 SSE 프레임으로 묶어 보내고, 연결이 끊기면 LLM 스트림을 닫습니다.
     return StreamingResponse(
-        rag_handler.stream_rag_response_from_note(note_id=note_id, question=query.question),
-        media_type="text/event-stream"
+        sse.stream_events(rag_handler.stream_rag_response_from_note(note_id=note_id, question=query.question, session=session), request=request),
+        media_type="text/event-stream",
+        headers=sse.SSE_HEADERS
     )
 
 
-# --- AI Material Generation (Refactored for Notes) ---
-
-async def _generate_ai_materials(text: str, db: Session, note_id: int, source_path: str):
-    """Helper function to generate learning materials and add text to the note's vector store."""
-    api_key = os.getenv("GEMINI_API_KEY")
-
-    # Vectorize and store the source text for RAG
-    rag_handler.add_source_to_vector_store(note_id=note_id, source_text=text, source_path=source_path)
-
-    # API 키가 없거나 임시 키일 경우 목업 데이터 반환
-    if not api_key or api_key == "YOUR_API_KEY_HERE":
-        print("Warning: GEMINI_API_KEY is not configured. Returning mock data.")
-        mock_data = schemas.LearningMaterialCreate(
-            summary=f"[목업 데이터] '{source_path}'의 내용을 요약한 결과입니다.",
-            key_topics=["핵심 주제 1", "핵심 주제 2"],
-            quiz=[schemas.QuizItemBase(question="첫 번째 질문입니다.", options=["A", "B", "C", "D"], answer="A")],
-            flashcards=[schemas.FlashcardItemBase(term="용어 1", definition="설명 1")],
-            mindmap={"name": "[목업] 중심 주제", "children": [{"name": "하위 주제 1"}]},
-            audio_url=None
-        )
-        # For mock data, we don't create a full material, just return the structure
-        # This part of the logic might need adjustment based on desired behavior for mock generation.
-        # For now, we'll skip creating a material entry in the DB for mock data to avoid confusion.
-        # A better approach would be to create a consolidated material for the note.
-        # This is a placeholder for the real implementation of multi-source analysis.
-        return mock_data # Returning the structure, not a DB object
-
-    try:
-        genai.configure(api_key=api_key)
-        model = genai.GenerativeModel('gemini-1.5-flash')
-
-        prompt = f"""다음 텍스트를 분석하여 마이크로러닝 학습 자료를 생성해줘. 반드시 아래의 JSON 형식과 동일한 구조로 응답해야 해. 각 필드에 대한 설명은 다음과 같아.
-
-- summary: 텍스트의 핵심 내용을 요약한 문단.
-- key_topics: 텍스트의 핵심 주제나 키워드를 담은 문자열 배열.
-- quiz: 텍스트의 내용을 바탕으로 한 객관식 퀴즈 2개. options는 4개의 선택지를 포함해야 하고, answer는 그 중 정답 텍스트여야 해.
-- flashcards: 텍스트에 등장하는 중요 용어와 그 설명을 담은 용어 카드 2개.
-- mindmap: 텍스트의 핵심 개념들을 계층적으로 구조화한 마인드맵 데이터. 'name'과 'children' 키를 사용하는 중첩된(nested) JSON 객체 형식이어야 해. 최상위 객체는 하나여야 해.
-
-**분석할 텍스트:**
-{text}
-
-**JSON 출력 형식:**
-{{
-  "summary": "<요약 내용>",
-  "key_topics": ["<주제1>", "<주제2>", ...],
-  "quiz": [
-    {{
-      "question": "<질문1>",
-      "options": ["<선택지1>", "<선택지2>", "<선택지3>", "<선택지4>"],
-      "answer": "<정답>"
-    }},
-    {{
-      "question": "<질문2>",
-      "options": ["<선택지1>", "<선택지2>", "<선택지3>", "<선택지4>"],
-      "answer": "<정답>"
-    }}
-  ],
-  "flashcards": [
-    {{
-      "term": "<용어1>",
-      "definition": "<설명1>"
-    }},
-    {{
-      "term": "<용어2>",
-      "definition": "<설명2>"
-    }}
-  ],
-  "mindmap": {{
-    "name": "<중심 주제>",
-    "children": [
-      {{
-        "name": "<하위 주제 1>",
-        "children": [
-          {{ "name": "<세부 주제 1-1>" }},
-          {{ "name": "<세부 주제 1-2>" }}
-        ]
-      }},
-      {{ "name": "<하위 주제 2>" }}
-    ]
-  }}
-}}
-"""
-
-        response = await model.generate_content_async(prompt)
-        cleaned_response_text = response.text.strip().replace('```json', '').replace('```', '')
-        response_json = json.loads(cleaned_response_text)
-
-        if isinstance(response_json.get("mindmap"), str):
-            try:
-                response_json["mindmap"] = json.loads(response_json["mindmap"])
-            except json.JSONDecodeError:
-                response_json["mindmap"] = None
-        
-        validated_material = schemas.LearningMaterialCreate(**response_json)
-
-        audio_url = None
-        if validated_material.summary:
-            audio_url = tts_handler.create_audio_briefing(validated_material.summary)
-        validated_material.audio_url = audio_url
-        
-        # This part needs to be re-evaluated. Instead of creating a new material for each source,
-        # we should have one consolidated material per note. 
-        # For now, we will continue to create one to maintain some functionality.
-        db_material = crud.create_learning_material(db=db, material=validated_material, note_id=note_id)
-
-        return db_material
-
-    except Exception as e:
-        print(f"An error occurred: {e}")
-        raise HTTPException(status_code=500, detail="AI 자료 생성 중 오류가 발생했습니다.")
+# --- AI Material Generation Jobs ---
+# 생성 요청은 작업(Job)으로 대기열에 넣고 즉시 작업 ID를 반환합니다.
+# 실제 추출/벡터화/생성/TTS는 job_handler의 워커들이 처리합니다.
 
-@app.post("/api/notes/{note_id}/generate-from-file", response_model=schemas.LearningMaterial)
+@app.post("/api/notes/{note_id}/generate-from-file", response_model=schemas.Job, status_code=status.HTTP_202_ACCEPTED)
 async def generate_materials_from_file(
     note_id: int,
     file: UploadFile = File(...),
     db: Session = Depends(get_db),
-    current_user: schemas.User = Depends(auth.get_current_user)
+    db_note: models.LearningNote = Depends(auth.get_current_note)
 ):
-    db_note = crud.get_note(db, note_id=note_id, user_id=current_user.id)
-    if db_note is None:
-        raise HTTPException(status_code=404, detail="노트를 찾을 수 없습니다.")
-
     filename = file.filename
-    if not (filename.endswith(".txt") or filename.endswith(".pdf") or filename.endswith(".docx")):
+    if not filename.endswith(material_handler.SUPPORTED_FILE_EXTENSIONS):
         raise HTTPException(status_code=400, detail="지원하지 않는 파일 형식입니다.")
 
-    extracted_text = ""
     try:
-        contents = await file.read()
-        if filename.endswith(".txt"): extracted_text = contents.decode("utf-8")
-        elif filename.endswith(".pdf"): 
-            with io.BytesIO(contents) as f:
-                reader = PdfReader(f)
-                for page in reader.pages: extracted_text += page.extract_text() or ""
-        elif filename.endswith(".docx"): 
-            with io.BytesIO(contents) as f:
-                doc = docx.Document(f)
-                for para in doc.paragraphs: extracted_text += para.text + "\n"
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"파일 처리 실패: {str(e)}")
-
-    if not extracted_text.strip():
-        raise HTTPException(status_code=400, detail="파일에서 텍스트를 추출할 수 없습니다.")
+        upload_path = await job_handler.save_upload(file)
+    except job_handler.UploadTooLargeError as e:
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=e.detail)
+    return job_handler.enqueue_job(db, job_type="file", payload={"upload_path": upload_path, "filename": filename},
+                                   note_id=note_id, user_id=db_note.owner_id)
 
-    # 소스 정보도 DB에 저장
-    source_create = schemas.SourceCreate(type='file', path=filename, content=extracted_text[:500]) # 미리보기
-    crud.create_note_source(db=db, source=source_create, note_id=note_id)
-
-    return await _generate_ai_materials(text=extracted_text, db=db, note_id=note_id, source_path=filename)
-
-@app.post("/api/notes/{note_id}/generate-from-text", response_model=schemas.LearningMaterial)
+@app.post("/api/notes/{note_id}/generate-from-text", response_model=schemas.Job, status_code=status.HTTP_202_ACCEPTED)
 async def generate_materials_from_text(
     note_id: int,
     source_text: schemas.SourceText,
     db: Session = Depends(get_db),
-    current_user: schemas.User = Depends(auth.get_current_user)
+    db_note: models.LearningNote = Depends(auth.get_current_note)
 ):
-    db_note = crud.get_note(db, note_id=note_id, user_id=current_user.id)
-    if db_note is None:
-        raise HTTPException(status_code=404, detail="노트를 찾을 수 없습니다.")
-
-    # 소스 정보도 DB에 저장
-    source_create = schemas.SourceCreate(type='text', path='text_input', content=source_text.text[:500])
-    crud.create_note_source(db=db, source=source_create, note_id=note_id)
-
-    return await _generate_ai_materials(text=source_text.text, db=db, note_id=note_id, source_path='text_input')
+    return job_handler.enqueue_job(db, job_type="text", payload={"text": source_text.text},
+                                   note_id=note_id, user_id=db_note.owner_id)
 
 
 # --- New Endpoints for URL & YouTube (Refactored for Notes) ---
@@ -384,69 +303,155 @@ async def generate_materials_from_text(
 class UrlSource(BaseModel):
     url: str
 
-def get_youtube_video_id(url: str):
-    regex = r"(?:https?:\/\/)?(?:www\.)?(?:youtube\.com\/(?:[^\/\n\s]+\/\S+\/|(?:v|e(?:mbed)?)\/|\S*?[?&]v=)|youtu\.be\/)([a-zA-Z0-9_-]{11})"
-    match = re.search(regex, url)
-    return match.group(1) if match else None
-
-@app.post("/api/notes/{note_id}/generate-from-url", response_model=schemas.LearningMaterial)
+@app.post("/api/notes/{note_id}/generate-from-url", response_model=schemas.Job, status_code=status.HTTP_202_ACCEPTED)
 async def generate_materials_from_url(
     note_id: int,
     source: UrlSource,
     db: Session = Depends(get_db),
-    current_user: schemas.User = Depends(auth.get_current_user)
+    db_note: models.LearningNote = Depends(auth.get_current_note)
 ):
-    db_note = crud.get_note(db, note_id=note_id, user_id=current_user.id)
-    if db_note is None: raise HTTPException(status_code=404, detail="노트를 찾을 수 없습니다.")
-    
-    try:
-        downloaded = trafilatura.fetch_url(source.url)
-        if downloaded is None: raise HTTPException(status_code=400, detail="URL에서 콘텐츠를 가져올 수 없습니다.")
-        extracted_text = trafilatura.extract(downloaded)
-        if not extracted_text or not extracted_text.strip(): raise HTTPException(status_code=400, detail="URL에서 텍스트를 추출할 수 없습니다.")
+    return job_handler.enqueue_job(db, job_type="url", payload={"url": source.url},
+                                   note_id=note_id, user_id=db_note.owner_id)
 
-        source_create = schemas.SourceCreate(type='url', path=source.url, content=extracted_text[:500])
-        crud.create_note_source(db=db, source=source_create, note_id=note_id)
+@app.post("/api/notes/{note_id}/generate-from-youtube", response_model=schemas.Job, status_code=status.HTTP_202_ACCEPTED)
+async def generate_materials_from_youtube(
+    note_id: int,
+    source: UrlSource,
+    db: Session = Depends(get_db),
+    db_note: models.LearningNote = Depends(auth.get_current_note)
+):
+    if not material_handler.get_youtube_video_id(source.url):
+        raise HTTPException(status_code=400, detail="유효하지 않은 YouTube URL입니다.")
 
-        return await _generate_ai_materials(text=extracted_text, db=db, note_id=note_id, source_path=source.url)
+    return job_handler.enqueue_job(db, job_type="youtube", payload={"url": source.url},
+                                   note_id=note_id, user_id=db_note.owner_id)
 
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"URL 처리 중 오류 발생: {str(e)}")
 
-@app.post("/api/notes/{note_id}/generate-from-youtube", response_model=schemas.LearningMaterial)
-async def generate_materials_from_youtube(
+@app.post("/api/notes/{note_id}/generate-from-sources", response_model=schemas.Job, status_code=status.HTTP_202_ACCEPTED)
+async def generate_materials_from_sources(
     note_id: int,
-    source: UrlSource,
+    files: List[UploadFile] = File([]),
+    urls: List[str] = Form([]),
+    youtube_urls: List[str] = Form([]),
+    db: Session = Depends(get_db),
+    db_note: models.LearningNote = Depends(auth.get_current_note)
+):
+    """
+    여러 파일, URL, YouTube 링크를 하나의 작업으로 노트에 추가합니다.
+    소스들은 동시에 추출되고 한 번에 벡터화되며, 학습 자료는 모든 소스를 합쳐 한 번만 생성됩니다.
+    """
+    source_count = len(files) + len(urls) + len(youtube_urls)
+    if source_count == 0:
+        raise HTTPException(status_code=400, detail="파일이나 URL이 제공되지 않았습니다.")
+    if source_count > job_handler.MAX_BATCH_SOURCES:
+        raise HTTPException(status_code=400, detail=f"한 번에 최대 {job_handler.MAX_BATCH_SOURCES}개의 소스만 추가할 수 있습니다.")
+    for file in files:
+        if not file.filename.endswith(material_handler.SUPPORTED_FILE_EXTENSIONS):
+            raise HTTPException(status_code=400, detail=f"지원하지 않는 파일 형식입니다: {file.filename}")
+    for url in youtube_urls:
+        if not material_handler.get_youtube_video_id(url):
+            raise HTTPException(status_code=400, detail=f"유효하지 않은 YouTube URL입니다: {url}")
+
+    sources = []
+    try:
+        for file in files:
+            upload_path = await job_handler.save_upload(file)
+            sources.append({"type": "file", "upload_path": upload_path, "filename": file.filename})
+    except job_handler.UploadTooLargeError as e:
+        for source in sources:
+            Path(source["upload_path"]).unlink(missing_ok=True)
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=e.detail)
+    sources += [{"type": "url", "url": url} for url in urls]
+    sources += [{"type": "youtube", "url": url} for url in youtube_urls]
+
+    return job_handler.enqueue_job(db, job_type="batch", payload={"sources": sources},
+                                   note_id=note_id, user_id=db_note.owner_id)
+
+
+# --- Job Endpoints ---
+
+@app.get("/api/jobs/{job_id}", response_model=schemas.Job)
+def read_job(
+    job_id: str,
+    db: Session = Depends(get_db),
+    current_user: schemas.User = Depends(auth.get_current_user)
+):
+    """
+    생성 작업의 상태와 단계별 진행 상황(소요 시간 포함)을 조회합니다.
+    """
+    db_job = crud.get_job(db, job_id=job_id, user_id=current_user.id)
+    if db_job is None:
+        raise HTTPException(status_code=404, detail="작업을 찾을 수 없습니다.")
+    return db_job
+
+@app.get("/api/jobs/{job_id}/events")
+def stream_job_events(
+    job_id: str,
     db: Session = Depends(get_db),
     current_user: schemas.User = Depends(auth.get_current_user)
 ):
-    db_note = crud.get_note(db, note_id=note_id, user_id=current_user.id)
-    if db_note is None: raise HTTPException(status_code=404, detail="노트를 찾을 수 없습니다.")
+    """
+    생성 작업의 진행 상황을 SSE로 스트리밍합니다. 작업이 끝나면 스트림이 종료됩니다.
+    """
+    db_job = crud.get_job(db, job_id=job_id, user_id=current_user.id)
+    if db_job is None:
+        raise HTTPException(status_code=404, detail="작업을 찾을 수 없습니다.")
+    return StreamingResponse(
+        job_handler.stream_job_events(job_id=job_id, user_id=current_user.id),
+        media_type="text/event-stream"
+    )
 
-    try:
-        video_id = get_youtube_video_id(source.url)
-        if not video_id: raise HTTPException(status_code=400, detail="유효하지 않은 YouTube URL입니다.")
 
-        transcript_list = YouTubeTranscriptApi.get_transcript(video_id, languages=['ko', 'en'])
-        extracted_text = " ".join([item['text'] for item in transcript_list])
-        if not extracted_text.strip(): raise HTTPException(status_code=400, detail="자막을 추출할 수 없습니다.")
+# --- Status Endpoints ---
 
-        source_create = schemas.SourceCreate(type='youtube', path=source.url, content=extracted_text[:500])
-        crud.create_note_source(db=db, source=source_create, note_id=note_id)
+@app.get("/api/executors")
+def read_executor_stats(current_user: schemas.User = Depends(auth.get_current_user)):
+    """
+    블로킹 작업 실행기(cpu/io/vector/password)별 실행 중/대기 중 작업 수를 조회합니다.
+    """
+    return executor_handler.get_executor_stats()
 
-        return await _generate_ai_materials(text=extracted_text, db=db, note_id=note_id, source_path=source.url)
-    
-    except NoTranscriptFound:
-        raise HTTPException(status_code=404, detail="해당 영상에 분석 가능한 한국어 또는 영어 자막이 존재하지 않습니다.")
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"YouTube 처리 중 오류 발생: {str(e)}")
+@app.get("/api/embedding-cache")
+def read_embedding_cache_stats(current_user: schemas.User = Depends(auth.get_current_user)):
+    """
+    임베딩 캐시의 항목 수와 적중/미적중 횟수를 조회합니다.
+    """
+    return embedding_cache.get_embedding_cache().stats()
+
+@app.get("/api/embedding-dispatcher")
+def read_embedding_dispatcher_stats(current_user: schemas.User = Depends(auth.get_current_user)):
+    """
+    임베딩 배치 디스패처의 처리량, 재시도, 한도 대기 시간을 반환합니다.
+    """
+    return client_registry.embedding_dispatcher_stats()
+
+@app.get("/api/answer-cache")
+def read_answer_cache_stats(current_user: schemas.User = Depends(auth.get_current_user)):
+    """
+    노트 채팅 답변 캐시의 적중률과 적중으로 절약한 응답 시간을 조회합니다.
+    """
+    return answer_cache.get_answer_cache().stats()
 
+@app.get("/api/http-fetcher")
+def read_http_fetcher_stats(current_user: schemas.User = Depends(auth.get_current_user)):
+    """
+    웹 페이지 요청 수, 재시도 횟수, 디스크 캐시 적중/재검증 횟수를 조회합니다.
+    """
+    return http_fetcher.get_fetcher().stats()
 
 
-@app.get("/users/", response_model=list[schemas.User])
-def read_users(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    users = crud.get_users(db, skip=skip, limit=limit)
-    return users
+@app.get("/users/", response_model=schemas.UserPage)
+def read_users(
+    cursor: Optional[str] = None,
+    limit: int = Query(pagination.PAGE_SIZE_DEFAULT, ge=1, le=pagination.PAGE_SIZE_MAX),
+    db: Session = Depends(get_db)
+):
+    try:
+        after_id = pagination.decode_cursor(cursor)
+    except pagination.InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=e.detail)
+    users = crud.get_users(db, after_id=after_id, limit=limit + 1)
+    return pagination.make_page(users, limit)
 
 
 @app.get("/users/{user_id}", response_model=schemas.User)
@@ -0,0 +1,92 @@
+# backend/manage_vectors.py
+"""
+벡터 저장소(Chroma + BM25 색인)의 노트 조각을 삭제, 재색인, 정리, 압축하고 회수한 디스크 용량을 출력합니다.
+서버와 같은 설정(환경 변수)으로 실행합니다. 재색인에는 임베딩 모델(Gemini 백엔드는 GEMINI_API_KEY)이 필요합니다.
+EMBEDDING_BACKEND를 바꾼 뒤 reindex --all을 실행하면 BM25 색인에 저장된 조각으로 새 백엔드의 벡터 저장소를 채웁니다.
+압축할 컬렉션 목록은 Chroma 디렉터리에 저장되어 서버에서 일어난 삭제도 압축합니다. 압축은 서버의 쓰기와 잠금을
+공유하지 않으므로 서버를 멈춘 뒤 실행합니다.
+
+실행 (저장소 루트에서):
+  python -m backend.manage_vectors delete-note 3 4
+  python -m backend.manage_vectors remove-source 3 "https://example.com/a"
+  python -m backend.manage_vectors reindex 3 | --all
+  python -m backend.manage_vectors sweep
+  python -m backend.manage_vectors compact [notes_shard_0 ...]
+"""
+
+import argparse
+import time
+
+from dotenv import load_dotenv
+
+from . import client_registry, crud, rag_handler
+from .database import SessionLocal
+
+
+def _note_ids() -> set[int]:
+    db = SessionLocal()
+    try:
+        return crud.get_note_ids(db)
+    finally:
+        db.close()
+
+def _source_texts(note_id: int) -> dict[str, list[tuple[str, str | None]]]:
+    db = SessionLocal()
+    try:
+        return crud.get_source_texts(db, note_id)
+    finally:
+        db.close()
+
+def main():
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="벡터 저장소의 노트 조각을 관리합니다.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    delete_note = commands.add_parser("delete-note", help="노트의 모든 조각을 삭제합니다.")
+    delete_note.add_argument("note_ids", type=int, nargs="+")
+    remove_source = commands.add_parser("remove-source", help="노트에서 한 소스의 조각을 삭제합니다.")
+    remove_source.add_argument("note_id", type=int)
+    remove_source.add_argument("source_path")
+    reindex = commands.add_parser("reindex", help="노트의 조각을 현재 분할 설정으로 다시 색인합니다.")
+    reindex.add_argument("note_ids", type=int, nargs="*")
+    reindex.add_argument("--all", action="store_true", help="DB의 모든 노트를 다시 색인합니다.")
+    commands.add_parser("sweep", help="DB에 없는 노트의 조각을 삭제합니다.")
+    compact = commands.add_parser("compact", help="컬렉션을 압축합니다 (기본: 모든 노트 컬렉션).")
+    compact.add_argument("collections", nargs="*")
+    parser.add_argument("--no-compact", action="store_true", help="삭제 후 압축하지 않습니다.")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    before = rag_handler.vector_storage_bytes()
+
+    if args.command == "delete-note":
+        for note_id in args.note_ids:
+            rag_handler.delete_note_vectors(note_id)
+    elif args.command == "remove-source":
+        rag_handler.delete_source_vectors(args.note_id, args.source_path)
+    elif args.command == "reindex":
+        note_ids = sorted(_note_ids()) if args.all else args.note_ids
+        for note_id in note_ids:
+            chunks = rag_handler.reindex_note(note_id, _source_texts(note_id))
+            if chunks is None:
+                parser.error("임베딩 모델을 사용할 수 없습니다 (EMBEDDING_BACKEND, GEMINI_API_KEY 확인).")
+    elif args.command == "sweep":
+        note_ids = _note_ids()
+        removed = rag_handler.sweep_orphans(note_ids, max(note_ids, default=0))
+        print(f"고아 노트 {len(removed)}개 정리: {removed}")
+    elif args.command == "compact":
+        client = client_registry.get_chroma_client(rag_handler.CHROMA_DB_DIRECTORY)
+        names = args.collections or [name for name in rag_handler.list_collection_names(client)
+                                     if name.startswith(("note_", "notes_shard_"))]
+        for name in names:
+            rag_handler.compact_collection(name)
+
+    if not args.no_compact:
+        compacted = rag_handler.compact_dirty_collections()
+        print(f"압축한 컬렉션 {len(compacted)}개")
+
+    after = rag_handler.vector_storage_bytes()
+    print(f"완료 ({time.perf_counter() - started:.1f}s): {before:,} -> {after:,} bytes, {before - after:,} bytes 회수")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,584 @@
+# backend/material_handler.py
+
+import asyncio
+import hashlib
+import json
+import os
+import re
+import time
+import unicodedata
+from collections import deque
+from pathlib import Path
+
+# PDF 및 DOCX 처리를 위한 라이브러리 임포트
+import docx
+from pypdf import PdfReader # pypdf2 is deprecated, use pypdf
+import trafilatura
+from youtube_transcript_api import NoTranscriptFound, CouldNotRetrieveTranscript
+
+from . import models, schemas, client_registry, rag_handler, http_fetcher
+from .executor_handler import ExecutorBusyError, cpu_executor
+
+SUPPORTED_FILE_EXTENSIONS = (".txt", ".pdf", ".docx")
+# 업로드 파일에서 추출한 텍스트를 기록하는 파일의 접미사 (업로드 경로 + 접미사)
+EXTRACTED_TEXT_SUFFIX = ".extracted.txt"
+# 텍스트 파일을 한 번에 읽는 글자 수
+TEXT_BLOCK_CHARS = 1024 * 1024
+# PDF 병렬 추출 시 프로세스 하나가 한 번에 맡는 페이지 수
+PDF_PAGES_PER_TASK = int(os.getenv("PDF_PAGES_PER_TASK", "20"))
+
+# 받은 YouTube 자막을 디스크 캐시에서 재사용하는 기간
+YOUTUBE_TRANSCRIPT_CACHE_SECONDS = float(os.getenv("YOUTUBE_TRANSCRIPT_CACHE_SECONDS", str(7 * 24 * 3600)))
+GENERATION_MODEL_NAME = 'gemini-1.5-flash'
+# 추정 토큰 수가 이 값을 넘는 텍스트는 한 번의 프롬프트 대신 map-reduce로 생성합니다.
+MAP_REDUCE_TOKEN_BUDGET = int(os.getenv("MAP_REDUCE_TOKEN_BUDGET", "30000"))
+# map 단계에서 한 구간에 담을 토큰 수
+MAP_REDUCE_SECTION_TOKENS = int(os.getenv("MAP_REDUCE_SECTION_TOKENS", "8000"))
+# 동시에 실행할 map 호출 수
+MAP_REDUCE_CONCURRENCY = int(os.getenv("MAP_REDUCE_CONCURRENCY", "4"))
+# 부분 결과가 너무 많을 때 한 번에 합칠 개수
+MAP_REDUCE_COLLAPSE_GROUP_SIZE = 8
+# 한국어/영어가 섞인 텍스트의 대략적인 글자 수 대비 토큰 비율
+CHARS_PER_TOKEN = 3
+# 캐시된 생성 결과의 유효 기간 (0이면 만료 없음)
+GENERATION_CACHE_TTL_HOURS = float(os.getenv("GENERATION_CACHE_TTL_HOURS", str(24 * 30)))
+# 소스를 합쳐 갱신한 노트 학습 자료에 남길 퀴즈/용어 카드의 최대 개수
+CONSOLIDATED_MAX_ITEMS = int(os.getenv("CONSOLIDATED_MAX_ITEMS", "10"))
+
+
+class SourceExtractionError(Exception):
+    """소스에서 텍스트를 추출하지 못했을 때 발생합니다. status_code는 HTTP 응답 코드로 사용됩니다."""
+
+    def __init__(self, detail: str, status_code: int = 400):
+        super().__init__(detail)
+        self.detail = detail
+        self.status_code = status_code
+
+    def __reduce__(self):
+        # 프로세스 풀에서 발생한 예외도 status_code를 유지한 채 전달되도록 합니다.
+        return (self.__class__, (self.detail, self.status_code))
+
+
+# --- Text Extraction ---
+
+class ExtractedText:
+    """
+    소스에서 추출한 텍스트입니다. 업로드 파일처럼 클 수 있는 텍스트는 디스크의 텍스트 파일(path)로,
+    URL이나 자막처럼 작은 텍스트는 문자열(text)로 보관하여 필요한 만큼만 메모리에 올립니다.
+    """
+
+    def __init__(self, text: str | None = None, path: str | None = None, page_offsets: list[int] | None = None):
+        self.text = text
+        self.path = path
+        # PDF의 경우 각 페이지가 텍스트에서 시작하는 위치 (page_offsets[i]는 i+1쪽의 시작)
+        self.page_offsets = page_offsets
+
+    def iter_pieces(self):
+        """텍스트를 TEXT_BLOCK_CHARS 단위로 나누어 순서대로 반환합니다."""
+        if self.path is None:
+            yield self.text
+            return
+        with open(self.path, encoding="utf-8") as f:
+            while block := f.read(TEXT_BLOCK_CHARS):
+                yield block
+
+    def preview(self, length: int = 500) -> str:
+        if self.path is None:
+            return self.text[:length]
+        with open(self.path, encoding="utf-8") as f:
+            return f.read(length)
+
+    def read(self) -> str:
+        if self.path is None:
+            return self.text
+        with open(self.path, encoding="utf-8") as f:
+            return f.read()
+
+def iter_text_from_path(file_path: str, filename: str):
+    """
+    업로드 파일에서 텍스트를 조각(블록/페이지/문단) 단위로 추출합니다.
+    PDF는 파일 핸들에서 필요한 페이지만 읽으므로 전체 파일을 메모리에 올리지 않습니다.
+    """
+    if filename.endswith(".txt"):
+        with open(file_path, encoding="utf-8") as f:
+            while block := f.read(TEXT_BLOCK_CHARS):
+                yield block
+    elif filename.endswith(".pdf"):
+        with open(file_path, "rb") as f:
+            reader = PdfReader(f)
+            for page in reader.pages: yield page.extract_text() or ""
+    elif filename.endswith(".docx"):
+        doc = docx.Document(file_path)
+        for para in doc.paragraphs: yield para.text + "\n"
+
+def count_pdf_pages(file_path: str) -> int:
+    with open(file_path, "rb") as f:
+        return len(PdfReader(f).pages)
+
+def extract_pdf_page_range(file_path: str, start: int, end: int) -> list[str]:
+    """PDF의 [start, end) 페이지 텍스트를 추출합니다. 프로세스 풀의 각 프로세스에서 실행됩니다."""
+    with open(file_path, "rb") as f:
+        reader = PdfReader(f)
+        return [reader.pages[index].extract_text() or "" for index in range(start, end)]
+
+async def extract_pdf_to_file(file_path: str, executor=cpu_executor) -> ExtractedText:
+    """
+    PDF 페이지 범위를 PDF_PAGES_PER_TASK 단위로 나누어 프로세스 풀에서 병렬로 추출하고,
+    페이지 순서대로 텍스트 파일에 기록합니다. 각 페이지의 시작 위치를 page_offsets로 함께 반환합니다.
+    PDF 하나가 미리 예약하는 범위는 워커 수의 두 배이고, 실행기에 실제로 제출되는 범위는 모든 PDF가 함께 쓰는
+    실행기의 fan_out_limit으로 제한되어 여러 PDF를 동시에 처리해도 대기열이 넘치지 않습니다.
+    """
+    text_path = file_path + EXTRACTED_TEXT_SUFFIX
+    in_flight = deque()
+    try:
+        total_pages = await executor.run(count_pdf_pages, file_path)
+        ranges = iter([(start, min(start + PDF_PAGES_PER_TASK, total_pages))
+                       for start in range(0, total_pages, PDF_PAGES_PER_TASK)])
+        max_in_flight = executor.max_workers * 2
+
+        def schedule_next():
+            page_range = next(ranges, None)
+            if page_range is not None:
+                in_flight.append(asyncio.ensure_future(executor.run_fan_out(extract_pdf_page_range, file_path, *page_range)))
+
+        for _ in range(max_in_flight):
+            schedule_next()
+
+        page_offsets, offset, has_text = [], 0, False
+        with open(text_path, "w", encoding="utf-8") as out:
+            while in_flight:
+                pages = await in_flight.popleft()
+                schedule_next()
+                for page_text in pages:
+                    page_offsets.append(offset)
+                    out.write(page_text)
+                    offset += len(page_text)
+                    has_text = has_text or bool(page_text.strip())
+    except Exception as e:
+        for task in in_flight:
+            task.cancel()
+        Path(text_path).unlink(missing_ok=True)
+        if isinstance(e, ExecutorBusyError):
+            # 혼잡은 파일 오류가 아니므로 그대로 알려 다시 시도할 수 있게 합니다.
+            raise
+        raise SourceExtractionError(f"파일 처리 실패: {str(e)}", status_code=500)
+
+    if not has_text:
+        Path(text_path).unlink(missing_ok=True)
+        raise SourceExtractionError("파일에서 텍스트를 추출할 수 없습니다.")
+    return ExtractedText(path=text_path, page_offsets=page_offsets)
+
+async def extract_upload(file_path: str, filename: str) -> ExtractedText:
+    """업로드 파일에서 텍스트를 추출합니다. PDF는 페이지 단위로 병렬 추출합니다."""
+    if filename.endswith(".pdf"):
+        return await extract_pdf_to_file(file_path)
+    return await cpu_executor.run(extract_text_to_file, file_path, filename)
+
+def extract_text_to_file(file_path: str, filename: str) -> ExtractedText:
+    """
+    업로드 파일(.txt, .pdf, .docx)의 텍스트를 조각 단위로 옆의 텍스트 파일에 기록합니다.
+    문자열 이어 붙이기 없이 스트리밍으로 처리하므로 파일 크기와 관계없이 메모리 사용량이 일정합니다.
+    프로세스 풀에서 실행됩니다.
+    """
+    if not filename.endswith(SUPPORTED_FILE_EXTENSIONS):
+        raise SourceExtractionError("지원하지 않는 파일 형식입니다.")
+
+    text_path = file_path + EXTRACTED_TEXT_SUFFIX
+    has_text = False
+    try:
+        with open(text_path, "w", encoding="utf-8") as out:
+            for piece in iter_text_from_path(file_path, filename):
+                out.write(piece)
+                has_text = has_text or bool(piece.strip())
+    except Exception as e:
+        Path(text_path).unlink(missing_ok=True)
+        raise SourceExtractionError(f"파일 처리 실패: {str(e)}", status_code=500)
+
+    if not has_text:
+        Path(text_path).unlink(missing_ok=True)
+        raise SourceExtractionError("파일에서 텍스트를 추출할 수 없습니다.")
+    return ExtractedText(path=text_path)
+
+async def extract_text_from_url(url: str) -> str:
+    """공유 HTTP 클라이언트(디스크 캐시, 조건부 GET 사용)로 웹 페이지를 내려받아 본문 텍스트를 추출합니다."""
+    try:
+        fetched = await http_fetcher.get_fetcher().fetch(url)
+    except http_fetcher.FetchError:
+        raise SourceExtractionError("URL에서 콘텐츠를 가져올 수 없습니다.")
+    return await cpu_executor.run(extract_text_from_html, fetched.content, url)
+
+def extract_text_from_html(html: bytes, url: str | None = None) -> str:
+    """HTML에서 본문 텍스트를 추출합니다. 프로세스 풀에서 실행됩니다."""
+    extracted_text = trafilatura.extract(html, url=url)
+    if not extracted_text or not extracted_text.strip(): raise SourceExtractionError("URL에서 텍스트를 추출할 수 없습니다.")
+    return extracted_text
+
+def get_youtube_video_id(url: str):
+    regex = r"(?:https?:\/\/)?(?:www\.)?(?:youtube\.com\/(?:[^\/\n\s]+\/\S+\/|(?:v|e(?:mbed)?)\/|\S*?[?&]v=)|youtu\.be\/)([a-zA-Z0-9_-]{11})"
+    match = re.search(regex, url)
+    return match.group(1) if match else None
+
+def extract_text_from_youtube(url: str) -> str:
+    """YouTube 영상의 한국어 또는 영어 자막을 하나의 텍스트로 합칩니다. 받은 자막은 디스크 캐시에 보관합니다."""
+    video_id = get_youtube_video_id(url)
+    if not video_id: raise SourceExtractionError("유효하지 않은 YouTube URL입니다.")
+
+    http_cache = http_fetcher.get_http_cache()
+    cache_key = http_fetcher.make_cache_key(f"youtube-transcript:{video_id}:ko,en")
+    cached = http_cache.get(cache_key)
+    if cached is not None and time.time() - cached[0]["fetched_at"] < YOUTUBE_TRANSCRIPT_CACHE_SECONDS:
+        return cached[1].decode("utf-8")
+
+    try:
+        transcript = client_registry.get_transcript_api().fetch(video_id, languages=['ko', 'en'])
+    except NoTranscriptFound:
+        raise SourceExtractionError("해당 영상에 분석 가능한 한국어 또는 영어 자막이 존재하지 않습니다.", status_code=404)
+    except CouldNotRetrieveTranscript:
+        raise SourceExtractionError("YouTube 자막을 가져올 수 없습니다.")
+    extracted_text = " ".join([snippet.text for snippet in transcript])
+    if not extracted_text.strip(): raise SourceExtractionError("자막을 추출할 수 없습니다.")
+
+    http_cache.put(cache_key, {"url": url, "status_code": 200, "fetched_at": time.time()}, extracted_text.encode("utf-8"))
+    return extracted_text
+
+
+# --- Source Fingerprinting ---
+
+def normalize_text(text: str) -> str:
+    """유니코드 정규화와 공백 정리를 거쳐, 내용이 같은 텍스트가 같은 문자열이 되도록 합니다."""
+    return " ".join(unicodedata.normalize("NFKC", text).split())
+
+def fingerprint_pieces(pieces) -> str:
+    """
+    텍스트 조각들을 이어 붙인 것과 같은 지문(fingerprint_text)을 전체 텍스트를 만들지 않고 계산합니다.
+    단어가 조각 경계에서 잘리지 않도록 마지막 공백 이후의 부분은 다음 조각으로 넘깁니다.
+    """
+    digest = hashlib.sha256()
+    wrote = False
+    carry = ""
+
+    def feed(segment: str):
+        nonlocal wrote
+        normalized = normalize_text(segment)
+        if normalized:
+            digest.update(((" " if wrote else "") + normalized).encode("utf-8"))
+            wrote = True
+
+    for piece in pieces:
+        combined = carry + piece
+        cut = len(combined)
+        while cut > 0 and not combined[cut - 1].isspace():
+            cut -= 1
+        feed(combined[:cut])
+        carry = combined[cut:]
+    feed(carry)
+    return digest.hexdigest()
+
+def fingerprint_text(text: str) -> str:
+    return fingerprint_pieces([text])
+
+def fingerprint_extracted(extracted: ExtractedText) -> str:
+    """추출된 텍스트의 지문을 계산합니다. 프로세스 풀에서 실행됩니다."""
+    return fingerprint_pieces(extracted.iter_pieces())
+
+def fingerprint_sources(extracted_sources: list[ExtractedText]) -> list[str]:
+    """여러 소스의 지문을 한 번의 프로세스 풀 호출로 계산합니다."""
+    return [fingerprint_extracted(extracted) for extracted in extracted_sources]
+
+def combine_fingerprints(fingerprints: list[str]) -> str:
+    """여러 소스를 합쳐 생성할 때 사용할 지문입니다. 같은 소스를 같은 순서로 올리면 같은 값이 됩니다."""
+    if len(fingerprints) == 1:
+        return fingerprints[0]
+    return hashlib.sha256("\n".join(fingerprints).encode("utf-8")).hexdigest()
+
+def combine_source_texts(sources: list[tuple[str, ExtractedText]]) -> str:
+    """(출처, 추출된 텍스트) 목록을 출처 머리말과 함께 하나의 생성용 텍스트로 합칩니다."""
+    if len(sources) == 1:
+        return sources[0][1].read()
+    return "\n\n".join(f"# 출처: {source_path}\n\n{extracted.read()}" for source_path, extracted in sources)
+
+
+# --- AI Material Generation ---
+
+def is_gemini_configured() -> bool:
+    return client_registry.get_api_key() is not None
+
+def build_mock_material(source_path: str) -> schemas.LearningMaterialCreate:
+    """API 키가 없을 때 사용할 목업 학습 자료를 만듭니다."""
+    return schemas.LearningMaterialCreate(
+        summary=f"[목업 데이터] '{source_path}'의 내용을 요약한 결과입니다.",
+        key_topics=["핵심 주제 1", "핵심 주제 2"],
+        quiz=[schemas.QuizItemBase(question="첫 번째 질문입니다.", options=["A", "B", "C", "D"], answer="A")],
+        flashcards=[schemas.FlashcardItemBase(term="용어 1", definition="설명 1")],
+        mindmap={"name": "[목업] 중심 주제", "children": [{"name": "하위 주제 1"}]},
+        audio_url=None
+    )
+
+# 단일 생성과 map-reduce의 reduce 단계가 함께 사용하는 출력 형식
+MATERIAL_FIELD_GUIDE = """- summary: 텍스트의 핵심 내용을 요약한 문단.
+- key_topics: 텍스트의 핵심 주제나 키워드를 담은 문자열 배열.
+- quiz: 텍스트의 내용을 바탕으로 한 객관식 퀴즈 2개. options는 4개의 선택지를 포함해야 하고, answer는 그 중 정답 텍스트여야 해.
+- flashcards: 텍스트에 등장하는 중요 용어와 그 설명을 담은 용어 카드 2개.
+- mindmap: 텍스트의 핵심 개념들을 계층적으로 구조화한 마인드맵 데이터. 'name'과 'children' 키를 사용하는 중첩된(nested) JSON 객체 형식이어야 해. 최상위 객체는 하나여야 해."""
+
+MATERIAL_JSON_FORMAT = """{
+  "summary": "<요약 내용>",
+  "key_topics": ["<주제1>", "<주제2>", ...],
+  "quiz": [
+    {
+      "question": "<질문1>",
+      "options": ["<선택지1>", "<선택지2>", "<선택지3>", "<선택지4>"],
+      "answer": "<정답>"
+    },
+    {
+      "question": "<질문2>",
+      "options": ["<선택지1>", "<선택지2>", "<선택지3>", "<선택지4>"],
+      "answer": "<정답>"
+    }
+  ],
+  "flashcards": [
+    {
+      "term": "<용어1>",
+      "definition": "<설명1>"
+    },
+    {
+      "term": "<용어2>",
+      "definition": "<설명2>"
+    }
+  ],
+  "mindmap": {
+    "name": "<중심 주제>",
+    "children": [
+      {
+        "name": "<하위 주제 1>",
+        "children": [
+          { "name": "<세부 주제 1-1>" },
+          { "name": "<세부 주제 1-2>" }
+        ]
+      },
+      { "name": "<하위 주제 2>" }
+    ]
+  }
+}"""
+
+# map 단계(구간별 부분 결과)의 출력 형식
+PARTIAL_JSON_FORMAT = """{
+  "summary": "<이 구간의 요약>",
+  "key_topics": ["<주제1>", "<주제2>", ...],
+  "quiz": [
+    {
+      "question": "<질문>",
+      "options": ["<선택지1>", "<선택지2>", "<선택지3>", "<선택지4>"],
+      "answer": "<정답>"
+    }
+  ],
+  "flashcards": [
+    {
+      "term": "<용어>",
+      "definition": "<설명>"
+    }
+  ]
+}"""
+
+def build_material_prompt(text: str) -> str:
+    return f"""다음 텍스트를 분석하여 마이크로러닝 학습 자료를 생성해줘. 반드시 아래의 JSON 형식과 동일한 구조로 응답해야 해. 각 필드에 대한 설명은 다음과 같아.
+
+{MATERIAL_FIELD_GUIDE}
+
+**분석할 텍스트:**
+{text}
+
+**JSON 출력 형식:**
+{MATERIAL_JSON_FORMAT}
+"""
+
+def build_section_prompt(section: str, index: int, total: int) -> str:
+    return f"""다음은 긴 문서를 {total}개 구간으로 나눈 것 중 {index}번째 구간이야. 이 구간만 분석해서 나중에 전체 학습 자료로 합칠 부분 결과를 만들어줘. 반드시 아래의 JSON 형식으로만 응답해야 해.
+
+- summary: 이 구간의 핵심 내용을 요약한 짧은 문단.
+- key_topics: 이 구간의 핵심 주제나 키워드.
+- quiz: 이 구간의 내용으로 만든 객관식 퀴즈 후보 1~2개. options는 4개, answer는 그 중 정답 텍스트.
+- flashcards: 이 구간의 중요 용어와 설명 1~2개.
+
+**분석할 구간:**
+{section}
+
+**JSON 출력 형식:**
+{PARTIAL_JSON_FORMAT}
+"""
+
+def build_source_prompt(text: str, source_path: str) -> str:
+    return f"""다음은 학습 노트에 새로 추가된 소스 '{source_path}'의 텍스트야. 이 소스만 분석해서 노트의 기존 학습 자료에 합칠 부분 결과를 만들어줘. 반드시 아래의 JSON 형식으로만 응답해야 해.
+
+- summary: 이 소스의 핵심 내용을 요약한 짧은 문단.
+- key_topics: 이 소스의 핵심 주제나 키워드.
+- quiz: 이 소스의 내용으로 만든 객관식 퀴즈 후보 1~2개. options는 4개, answer는 그 중 정답 텍스트.
+- flashcards: 이 소스의 중요 용어와 설명 1~2개.
+
+**분석할 텍스트:**
+{text}
+
+**JSON 출력 형식:**
+{PARTIAL_JSON_FORMAT}
+"""
+
+def build_collapse_prompt(partials_json: str) -> str:
+    return f"""다음은 한 문서의 연속된 구간들에서 만든 부분 결과(JSON 배열)야. 이것들을 하나의 부분 결과로 합쳐줘. 요약은 내용을 모두 포괄하도록 다시 쓰고, 주제는 중복을 없애고, 퀴즈와 용어 카드는 가장 중요한 것만 남겨. 반드시 아래의 JSON 형식으로만 응답해야 해.
+
+**부분 결과:**
+{partials_json}
+
+**JSON 출력 형식:**
+{PARTIAL_JSON_FORMAT}
+"""
+
+def build_reduce_prompt(partials_json: str) -> str:
+    return f"""다음은 한 문서의 구간별 부분 결과(JSON 배열)야. 이것들을 종합하여 문서 전체에 대한 마이크로러닝 학습 자료를 생성해줘. 반드시 아래의 JSON 형식과 동일한 구조로 응답해야 해. 각 필드에 대한 설명은 다음과 같아.
+
+{MATERIAL_FIELD_GUIDE}
+
+퀴즈와 용어 카드는 부분 결과의 후보 중에서 문서 전체를 대표하는 것을 고르거나 다듬어서 만들어줘.
+
+**부분 결과:**
+{partials_json}
+
+**JSON 출력 형식:**
+{MATERIAL_JSON_FORMAT}
+"""
+
+def build_merge_prompt(material_json: str, partials_json: str) -> str:
+    return f"""다음은 학습 노트의 기존 학습 자료(JSON)와, 노트에 새로 추가된 소스들의 부분 결과(JSON 배열)야. 새 소스의 내용을 반영하여 노트 전체에 대한 학습 자료 하나로 갱신해줘. 반드시 아래의 JSON 형식과 동일한 구조로 응답해야 해. 각 필드에 대한 설명은 다음과 같아.
+
+{MATERIAL_FIELD_GUIDE}
+
+요약은 기존 요약과 새 소스의 내용을 모두 포괄하도록 다시 쓰고, 주제는 중복을 없애고, 마인드맵에는 새 소스의 개념을 알맞은 위치에 추가해줘.
+퀴즈와 용어 카드는 기존 항목을 유지하면서 새 소스의 후보를 더하되, 각각 최대 {CONSOLIDATED_MAX_ITEMS}개까지 노트 전체를 대표하는 것만 남겨.
+
+**기존 학습 자료:**
+{material_json}
+
+**새 소스의 부분 결과:**
+{partials_json}
+
+**JSON 출력 형식:**
+{MATERIAL_JSON_FORMAT}
+"""
+
+def _load_response_json(response_text: str) -> dict:
+    cleaned_response_text = response_text.strip().replace('```json', '').replace('```', '')
+    return json.loads(cleaned_response_text)
+
+def parse_material_response(response_text: str) -> schemas.LearningMaterialCreate:
+    """Gemini 응답 텍스트(JSON)를 검증된 학습 자료 구조로 변환합니다."""
+    response_json = _load_response_json(response_text)
+
+    if isinstance(response_json.get("mindmap"), str):
+        try:
+            response_json["mindmap"] = json.loads(response_json["mindmap"])
+        except json.JSONDecodeError:
+            response_json["mindmap"] = None
+
+    return schemas.LearningMaterialCreate(**response_json)
+
+def estimate_tokens(text: str) -> int:
+    """토크나이저 호출 없이 글자 수로 토큰 수를 대략 추정합니다."""
+    return len(text) // CHARS_PER_TOKEN + 1
+
+def split_into_sections(text: str) -> list[str]:
+    """map 단계에 사용할 구간으로 텍스트를 나눕니다. RAG 분할기와 같은 구분자를 사용합니다."""
+    splitter = rag_handler.get_text_splitter(chunk_size=MAP_REDUCE_SECTION_TOKENS * CHARS_PER_TOKEN, chunk_overlap=200)
+    return splitter.split_text(text)
+
+async def generate_material_content(text: str, model=None) -> schemas.LearningMaterialCreate:
+    """
+    Gemini를 호출하여 텍스트로부터 학습 자료(요약, 주제, 퀴즈, 카드, 마인드맵)를 생성합니다.
+    추정 토큰 수가 MAP_REDUCE_TOKEN_BUDGET을 넘으면 map-reduce 방식으로 생성합니다.
+    model은 generate_content_async(prompt)를 제공하는 객체이며, 없으면 공유 Gemini 모델을 사용합니다.
+    """
+    model = model or client_registry.get_generative_model(GENERATION_MODEL_NAME)
+
+    if estimate_tokens(text) > MAP_REDUCE_TOKEN_BUDGET:
+        return await generate_material_map_reduce(text, model)
+
+    response = await model.generate_content_async(build_material_prompt(text))
+    return parse_material_response(response.text)
+
+async def _generate_partial(model, prompt: str, semaphore: asyncio.Semaphore) -> dict:
+    async with semaphore:
+        response = await model.generate_content_async(prompt)
+    return _load_response_json(response.text)
+
+async def _map_sections(text: str, model, semaphore: asyncio.Semaphore) -> list[dict]:
+    """텍스트를 구간으로 나눠 구간별 부분 결과를 동시에 생성합니다."""
+    sections = await cpu_executor.run(split_into_sections, text)
+    return list(await asyncio.gather(*[
+        _generate_partial(model, build_section_prompt(section, index + 1, len(sections)), semaphore)
+        for index, section in enumerate(sections)
+    ]))
+
+async def _collapse_partials(partials: list[dict], model, semaphore: asyncio.Semaphore, single: bool = False) -> list[dict]:
+    """부분 결과가 예산을 넘으면(single이면 하나가 될 때까지) 묶음별로 합칩니다."""
+    while len(partials) > 1 and (single or estimate_tokens(json.dumps(partials, ensure_ascii=False)) > MAP_REDUCE_TOKEN_BUDGET):
+        groups = [partials[i:i + MAP_REDUCE_COLLAPSE_GROUP_SIZE] for i in range(0, len(partials), MAP_REDUCE_COLLAPSE_GROUP_SIZE)]
+        partials = await asyncio.gather(*[
+            _generate_partial(model, build_collapse_prompt(json.dumps(group, ensure_ascii=False)), semaphore) for group in groups
+        ])
+    return list(partials)
+
+async def generate_material_map_reduce(text: str, model) -> schemas.LearningMaterialCreate:
+    """
+    텍스트를 구간으로 나눠 구간별 부분 결과를 동시에(최대 MAP_REDUCE_CONCURRENCY개) 생성한 뒤,
+    하나의 학습 자료로 합칩니다. 부분 결과가 예산을 넘으면 먼저 묶음별로 합칩니다.
+    """
+    semaphore = asyncio.Semaphore(MAP_REDUCE_CONCURRENCY)
+    partials = await _collapse_partials(await _map_sections(text, model, semaphore), model, semaphore)
+
+    response = await model.generate_content_async(build_reduce_prompt(json.dumps(partials, ensure_ascii=False)))
+    return parse_material_response(response.text)
+
+
+# --- Incremental Consolidation ---
+# 노트에는 통합 학습 자료가 하나만 있습니다. 소스가 추가되면 새 소스만 부분 결과로 요약하고,
+# 기존 자료와 합치는 호출 한 번으로 갱신하므로 소스 수와 관계없이 비용이 일정합니다.
+
+async def generate_source_partial(text: str, source_path: str, model=None) -> dict:
+    """소스 하나의 부분 결과(요약, 주제, 퀴즈/카드 후보)를 만듭니다. 긴 소스는 구간별로 만든 뒤 하나로 합칩니다."""
+    model = model or client_registry.get_generative_model(GENERATION_MODEL_NAME)
+
+    if estimate_tokens(text) <= MAP_REDUCE_TOKEN_BUDGET:
+        response = await model.generate_content_async(build_source_prompt(text, source_path))
+        return _load_response_json(response.text)
+
+    semaphore = asyncio.Semaphore(MAP_REDUCE_CONCURRENCY)
+    partials = await _collapse_partials(await _map_sections(text, model, semaphore), model, semaphore, single=True)
+    return partials[0]
+
+async def merge_into_material(material: schemas.LearningMaterialCreate, partials: list[dict], model=None) -> schemas.LearningMaterialCreate:
+    """기존 노트 학습 자료에 새 소스들의 부분 결과를 합친 학습 자료를 만듭니다 (오디오는 새로 만들어야 합니다)."""
+    model = model or client_registry.get_generative_model(GENERATION_MODEL_NAME)
+    material_json = json.dumps(material.dict(exclude={"audio_url"}), ensure_ascii=False)
+    response = await model.generate_content_async(build_merge_prompt(material_json, json.dumps(partials, ensure_ascii=False)))
+    return parse_material_response(response.text)
+
+def material_from_db(db_material: models.LearningMaterial) -> schemas.LearningMaterialCreate:
+    """DB에 저장된 학습 자료를 생성 결과와 같은 구조로 변환합니다."""
+    return schemas.LearningMaterialCreate(
+        summary=db_material.summary,
+        key_topics=[topic.topic for topic in db_material.key_topics],
+        quiz=[schemas.QuizItemBase(question=item.question, options=item.options, answer=item.answer)
+              for item in db_material.quiz_items],
+        flashcards=[schemas.FlashcardItemBase(term=card.term, definition=card.definition) for card in db_material.flashcards],
+        mindmap=db_material.mindmap,
+        audio_url=db_material.audio_url
+    )
+
+
+# 프롬프트 템플릿이나 모델이 바뀌면 값이 달라져 이전에 캐시된 생성 결과가 무효화됩니다.
+PROMPT_VERSION = hashlib.sha256("\0".join([
+    GENERATION_MODEL_NAME, build_material_prompt(''), build_section_prompt('', 0, 0),
+    build_collapse_prompt(''), build_reduce_prompt(''),
+]).encode("utf-8")).hexdigest()[:16]
+# 소스별 부분 결과 캐시의 키 (소스 지문과 함께 GenerationCache에 저장합니다)
+PARTIAL_PROMPT_VERSION = "partial-" + hashlib.sha256("\0".join([
+    GENERATION_MODEL_NAME, build_source_prompt('', ''), build_section_prompt('', 0, 0), build_collapse_prompt(''),
+]).encode("utf-8")).hexdigest()[:16]
@@ -0,0 +1,72 @@
+# backend/migrate_vector_store.py
+"""
+노트별 Chroma 컬렉션(note_{id})의 조각을 공유 샤드 컬렉션(notes_shard_{n})으로 옮깁니다.
+저장된 임베딩을 그대로 복사하므로 임베딩 API를 다시 호출하지 않으며, 같은 ID로 upsert하므로 여러 번 실행해도 안전합니다.
+옮긴 뒤 VECTOR_STORE_LAYOUT=shared로 서버를 실행합니다.
+
+실행: python -m backend.migrate_vector_store [--delete-old] [--dry-run] (저장소 루트에서)
+"""
+
+import argparse
+import re
+import time
+
+from . import client_registry, rag_handler
+
+NOTE_COLLECTION_PATTERN = re.compile(r"^note_(\d+)$")
+MIGRATION_BATCH_SIZE = 1000
+
+
+def list_note_collections(client) -> list[tuple[int, str]]:
+    names = [getattr(collection, "name", collection) for collection in client.list_collections()]
+    return sorted((int(match.group(1)), name) for name in names if (match := NOTE_COLLECTION_PATTERN.match(name)))
+
+def migrate_note(client, note_id: int, collection_name: str, delete_old: bool = False) -> int:
+    """노트 컬렉션 하나를 샤드 컬렉션으로 옮기고 옮긴 조각 수를 반환합니다."""
+    source = client.get_collection(collection_name, embedding_function=None)
+    target = client.get_or_create_collection(rag_handler.note_collection_name(note_id, layout="shared"), embedding_function=None)
+
+    moved = 0
+    while True:
+        batch = source.get(include=["embeddings", "documents", "metadatas"], limit=MIGRATION_BATCH_SIZE, offset=moved)
+        if not batch["ids"]:
+            break
+        target.upsert(
+            ids=[f"note{note_id}-{chunk_id}" for chunk_id in batch["ids"]],
+            embeddings=batch["embeddings"],
+            documents=batch["documents"],
+            metadatas=[dict(metadata or {}, note_id=note_id) for metadata in batch["metadatas"]],
+        )
+        moved += len(batch["ids"])
+
+    if delete_old:
+        client.delete_collection(collection_name)
+        client_registry.evict_vector_store(collection_name)
+    return moved
+
+def main():
+    parser = argparse.ArgumentParser(description="노트별 Chroma 컬렉션을 공유 샤드 컬렉션으로 옮깁니다.")
+    parser.add_argument("--persist-directory", default=rag_handler.CHROMA_DB_DIRECTORY)
+    parser.add_argument("--delete-old", action="store_true", help="옮긴 뒤 노트별 컬렉션을 삭제합니다.")
+    parser.add_argument("--dry-run", action="store_true", help="옮길 컬렉션 목록만 출력합니다.")
+    args = parser.parse_args()
+
+    client = client_registry.get_chroma_client(args.persist_directory)
+    collections = list_note_collections(client)
+    print(f"노트 컬렉션 {len(collections)}개 -> 샤드 {rag_handler.VECTOR_STORE_SHARDS}개")
+    if args.dry_run:
+        for note_id, name in collections:
+            print(f"  {name} -> {rag_handler.note_collection_name(note_id, layout='shared')}")
+        return
+
+    started = time.perf_counter()
+    total = 0
+    for index, (note_id, name) in enumerate(collections, start=1):
+        total += migrate_note(client, note_id, name, delete_old=args.delete_old)
+        if index % 100 == 0 or index == len(collections):
+            print(f"  {index}/{len(collections)} 컬렉션, {total}개 조각 ({time.perf_counter() - started:.1f}s)")
+    print("완료. VECTOR_STORE_LAYOUT=shared로 서버를 실행하세요.")
+
+
+if __name__ == "__main__":
+    main()
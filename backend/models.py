@@ -1,4 +1,4 @@
-from sqlalchemy import Boolean, Column, Integer, String, ForeignKey, Text, JSON
+from sqlalchemy import Boolean, Column, Integer, String, ForeignKey, Text, JSON, DateTime, Index
 from sqlalchemy.orm import relationship
 
 from .database import Base
@@ -21,9 +21,13 @@ class LearningNote(Base):
     title = Column(String, index=True)
     owner_id = Column(Integer, ForeignKey("users.id"))
 
+    # 사용자별 노트 목록을 id 순서로 페이지 단위로 읽는 키셋 페이지네이션용 (owner_id = ? AND id > ? ORDER BY id)
+    __table_args__ = (Index("ix_learning_notes_owner_id_id", "owner_id", "id"),)
+
     owner = relationship("User", back_populates="notes")
     sources = relationship("Source", back_populates="note", cascade="all, delete-orphan")
     material = relationship("LearningMaterial", uselist=False, back_populates="note", cascade="all, delete-orphan")
+    chat_sessions = relationship("ChatSession", back_populates="note", cascade="all, delete-orphan")
 
 
 class Source(Base):
@@ -33,7 +37,11 @@ class Source(Base):
     type = Column(String, nullable=False)  # 'file', 'url'
     path = Column(String, nullable=False)
     content = Column(Text, nullable=True) # 요약 or 미리보기
-    note_id = Column(Integer, ForeignKey("learning_notes.id"))
+    fingerprint = Column(String, nullable=True, index=True)  # 정규화된 본문의 SHA-256
+    # 생성 작업의 진행: 'stored'(저장됨) → 'indexed'(벡터 저장 완료) → 'merged'(학습 자료에 반영됨)
+    # 'merged'인 소스만 같은 내용의 중복으로 봅니다. 이전 버전의 소스는 모두 반영된 것으로 봅니다.
+    status = Column(String, nullable=False, default="merged", server_default="merged")
+    note_id = Column(Integer, ForeignKey("learning_notes.id"), index=True)
 
     note = relationship("LearningNote", back_populates="sources")
 
@@ -45,7 +53,7 @@ class LearningMaterial(Base):
     summary = Column(Text, nullable=False)
     mindmap = Column(JSON, nullable=True)
     audio_url = Column(String, nullable=True)
-    note_id = Column(Integer, ForeignKey("learning_notes.id"))
+    note_id = Column(Integer, ForeignKey("learning_notes.id"), index=True)
 
     note = relationship("LearningNote", back_populates="material")
     key_topics = relationship("KeyTopic", back_populates="material", cascade="all, delete-orphan")
@@ -53,6 +61,16 @@ class LearningMaterial(Base):
     flashcards = relationship("Flashcard", back_populates="material", cascade="all, delete-orphan")
 
 
+class GenerationCache(Base):
+    __tablename__ = "generation_cache"
+
+    id = Column(Integer, primary_key=True, index=True)
+    fingerprint = Column(String, nullable=False, index=True)  # 정규화된 본문의 SHA-256
+    prompt_version = Column(String, nullable=False)  # 프롬프트/모델이 바뀌면 달라지는 키
+    payload = Column(JSON, nullable=False)  # LearningMaterialCreate (audio_url 포함)
+    created_at = Column(DateTime, nullable=False)
+
+
 class KeyTopic(Base):
     __tablename__ = "key_topics"
 
@@ -68,7 +86,7 @@ class QuizItem(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     question = Column(Text, nullable=False)
-    options = Column(String, nullable=False)  # JSON string
+    options = Column(JSON, nullable=False)  # 선택지 목록 (이전 버전의 json.dumps 문자열도 같은 형식으로 읽힙니다)
     answer = Column(String, nullable=False)
     material_id = Column(Integer, ForeignKey("learning_materials.id"))
 
@@ -84,3 +102,50 @@ class Flashcard(Base):
     material_id = Column(Integer, ForeignKey("learning_materials.id"))
 
     material = relationship("LearningMaterial", back_populates="flashcards")
+
+
+class Job(Base):
+    __tablename__ = "jobs"
+
+    id = Column(String, primary_key=True, index=True)  # uuid4 hex
+    type = Column(String, nullable=False)  # 'file', 'text', 'url', 'youtube'
+    status = Column(String, nullable=False, default="queued", index=True)  # 'queued', 'running', 'succeeded', 'failed'
+    payload = Column(JSON, nullable=False)  # 작업 입력 (텍스트, URL, 업로드 파일 경로 등)
+    stages = Column(JSON, nullable=True)  # 단계별 상태 및 소요 시간
+    result = Column(JSON, nullable=True)  # 목업 데이터 등 DB에 저장되지 않은 결과
+    error = Column(Text, nullable=True)
+    attempts = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime, nullable=False)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+    # 노트가 삭제되어도 작업 기록은 남기고 노트/자료와의 연결만 끊습니다 (crud.delete_note).
+    note_id = Column(Integer, ForeignKey("learning_notes.id", ondelete="SET NULL"))
+    owner_id = Column(Integer, ForeignKey("users.id"))
+    material_id = Column(Integer, ForeignKey("learning_materials.id", ondelete="SET NULL"), nullable=True)
+
+
+class ChatSession(Base):
+    __tablename__ = "chat_sessions"
+
+    id = Column(String, primary_key=True, index=True)  # uuid4 hex
+    summary = Column(Text, nullable=True)  # summarized_until까지의 대화를 압축한 요약
+    summarized_until = Column(Integer, nullable=False, default=0)  # 요약에 포함된 마지막 ChatMessage id
+    created_at = Column(DateTime, nullable=False)
+    updated_at = Column(DateTime, nullable=False)
+    note_id = Column(Integer, ForeignKey("learning_notes.id"), index=True)
+    owner_id = Column(Integer, ForeignKey("users.id"))
+
+    note = relationship("LearningNote", back_populates="chat_sessions")
+    messages = relationship("ChatMessage", back_populates="session", cascade="all, delete-orphan")
+
+
+class ChatMessage(Base):
+    __tablename__ = "chat_messages"
+
+    id = Column(Integer, primary_key=True, index=True)
+    role = Column(String, nullable=False)  # 'user', 'assistant'
+    content = Column(Text, nullable=False)
+    created_at = Column(DateTime, nullable=False)
+    session_id = Column(String, ForeignKey("chat_sessions.id"), index=True)
+
+    session = relationship("ChatSession", back_populates="messages")
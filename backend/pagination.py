@@ -0,0 +1,42 @@
+# backend/pagination.py
+
+import base64
+import binascii
+import json
+import os
+
+# 목록 API의 기본/최대 페이지 크기
+PAGE_SIZE_DEFAULT = int(os.getenv("PAGE_SIZE_DEFAULT", "50"))
+PAGE_SIZE_MAX = int(os.getenv("PAGE_SIZE_MAX", "200"))
+
+
+class InvalidCursorError(Exception):
+    """커서를 해석할 수 없을 때 발생합니다."""
+
+    def __init__(self, cursor: str):
+        super().__init__(cursor)
+        self.detail = "잘못된 페이지 커서입니다."
+
+
+# 커서는 마지막으로 받은 행의 id를 담은 불투명한 문자열입니다. 클라이언트는 형식에 의존하지 않고
+# 응답의 next_cursor를 그대로 다음 요청에 넘기며, 서버는 OFFSET 대신 "id > 마지막 id"로 다음 페이지를 찾습니다.
+
+def encode_cursor(last_id: int) -> str:
+    return base64.urlsafe_b64encode(json.dumps({"id": last_id}).encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str | None) -> int | None:
+    if not cursor:
+        return None
+    try:
+        last_id = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))["id"]
+    except (binascii.Error, UnicodeDecodeError, ValueError, TypeError, KeyError):
+        raise InvalidCursorError(cursor)
+    if not isinstance(last_id, int):
+        raise InvalidCursorError(cursor)
+    return last_id
+
+def make_page(rows: list, limit: int) -> dict:
+    """limit + 1개를 읽은 결과로 페이지를 만듭니다. 남는 행이 있으면 다음 페이지 커서를 함께 반환합니다."""
+    items = rows[:limit]
+    next_cursor = encode_cursor(items[-1].id) if len(rows) > limit and items else None
+    return {"items": items, "next_cursor": next_cursor}
@@ -2,84 +2,648 @@
 
 import os
 import json
-from langchain_google_genai import GoogleGenerativeAIEmbeddings, ChatGoogleGenerativeAI
+import time
+import bisect
+import sqlite3
+import threading
+from contextlib import contextmanager
 from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain_community.vectorstores.chroma import Chroma
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser
 from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
 from langchain.retrievers.merger_retriever import MergerRetriever
 
-# 벡터 데이터베이스를 저장할 디렉토리
-CHROMA_DB_DIRECTORY = "chroma_db"
+from . import chat_memory, client_registry, material_handler
+from .lexical_index import LexicalIndex, get_lexical_index
+from .answer_cache import ANSWER_CACHE_ENABLED, get_answer_cache
+from .executor_handler import io_executor, vector_executor, ExecutorBusyError
+
+# 벡터 데이터베이스를 저장할 디렉토리 (로컬 임베딩 백엔드는 벡터 차원이 다르므로 백엔드별로 나눕니다)
+CHROMA_DB_DIRECTORY = "chroma_db" if client_registry.EMBEDDING_BACKEND == "gemini" else f"chroma_db_{client_registry.embedding_backend_name()}"
+# 스트리밍 분할 시 한 번에 분할기에 넣는 글자 수
+STREAM_WINDOW_CHARS = 200_000
+# 한 번에 임베딩하여 저장하는 조각 수
+VECTOR_WRITE_BATCH_SIZE = 256
+# 채팅 컨텍스트로 사용할 조각 수
+RETRIEVAL_K = int(os.getenv("RETRIEVAL_K", "5"))
+# 벡터 검색과 BM25 검색을 함께 사용할지 여부와, 합치기 전에 각각에서 가져올 후보 수
+HYBRID_RETRIEVAL = os.getenv("HYBRID_RETRIEVAL", "true").lower() == "true"
+HYBRID_CANDIDATE_K = int(os.getenv("HYBRID_CANDIDATE_K", "20"))
+# Reciprocal Rank Fusion 상수 (클수록 하위 순위의 영향이 커집니다)
+RRF_K = 60
+# 벡터 저장 방식: 'per_note'(노트마다 컬렉션 하나) 또는 'shared'(모든 노트의 조각을 VECTOR_STORE_SHARDS개 컬렉션에
+# 나누어 저장하고 note_id 메타데이터로 필터링). 기존 데이터는 migrate_vector_store로 옮깁니다.
+VECTOR_STORE_LAYOUT = os.getenv("VECTOR_STORE_LAYOUT", "per_note")
+VECTOR_STORE_SHARDS = int(os.getenv("VECTOR_STORE_SHARDS", "8"))
+
+# RAG 조각의 크기와 이웃 조각과 겹치는 최대 글자 수
+CHUNK_SIZE = 1000
+CHUNK_OVERLAP = 200
+
+def get_text_splitter(chunk_size: int = CHUNK_SIZE, chunk_overlap: int = CHUNK_OVERLAP):
+    """RAG 조각과 생성용 구간 분할에서 공통으로 사용하는 텍스트 분할기를 반환합니다."""
+    return RecursiveCharacterTextSplitter(
+        chunk_size=chunk_size,
+        chunk_overlap=chunk_overlap,
+        separators=["\n\n", "\n", ". ", " ", ""]
+    )
 
 def get_embeddings_model():
     """
-    Google Generative AI 임베딩 모델을 초기화하고 반환합니다.
-    API 키가 없으면 None을 반환하여 RAG 기능을 비활성화합니다.
+    프로세스에서 공유하는 임베딩 모델(EMBEDDING_BACKEND)을 반환합니다.
+    사용할 수 없으면(Gemini 백엔드에 API 키가 없는 경우 등) None을 반환하여 RAG 기능을 비활성화합니다.
     """
-    api_key = os.getenv("GEMINI_API_KEY")
-    if not api_key or api_key == "YOUR_API_KEY_HERE":
-        print("[RAG 경고] GEMINI_API_KEY가 설정되지 않았습니다. '자료와 대화하기' 기능이 비활성화됩니다.")
-        return None
-    
-    return GoogleGenerativeAIEmbeddings(model="models/text-embedding-004", google_api_key=api_key)
+    embeddings = client_registry.get_embeddings()
+    if embeddings is None:
+        if client_registry.EMBEDDING_BACKEND == "gemini":
+            print("[RAG 경고] GEMINI_API_KEY가 설정되지 않았습니다. '자료와 대화하기' 기능이 비활성화됩니다.")
+        else:
+            print(f"[RAG 경고] 임베딩 백엔드 '{client_registry.EMBEDDING_BACKEND}'를 사용할 수 없습니다. '자료와 대화하기' 기능이 비활성화됩니다.")
+    return embeddings
+
+def get_vector_store(collection_name: str, embeddings):
+    """캐시된 Chroma 컬렉션 핸들을 반환합니다."""
+    return client_registry.get_vector_store(collection_name, CHROMA_DB_DIRECTORY, embeddings)
+
+def note_collection_name(note_id: int, layout: str | None = None) -> str:
+    """노트의 조각이 저장되는 컬렉션 이름을 반환합니다."""
+    if (layout or VECTOR_STORE_LAYOUT) == "shared":
+        return f"notes_shard_{note_id % VECTOR_STORE_SHARDS}"
+    return f"note_{note_id}"
+
+def note_filter(note_id: int, layout: str | None = None) -> dict | None:
+    """공유 컬렉션에서 노트의 조각만 조회하기 위한 메타데이터 필터를 반환합니다."""
+    if (layout or VECTOR_STORE_LAYOUT) == "shared":
+        return {"note_id": note_id}
+    return None
+
+def get_note_vector_store(note_id: int, embeddings):
+    return get_vector_store(note_collection_name(note_id), embeddings)
+
+def note_search_kwargs(note_id: int, k: int) -> dict:
+    search_kwargs = {"k": k}
+    if note_filter(note_id):
+        search_kwargs["filter"] = note_filter(note_id)
+    return search_kwargs
+
+def warm_up():
+    """앱 시작 시 임베딩/LLM/Chroma 클라이언트를 미리 생성합니다."""
+    try:
+        client_registry.warm_up(CHROMA_DB_DIRECTORY)
+    except Exception as e:
+        print(f"[RAG] 클라이언트 초기화(warm-up) 중 오류 발생: {e}")
+
+def iter_chunks(pieces):
+    """
+    텍스트 조각 스트림을 RAG 조각으로 나누어 (전체 텍스트 기준 시작 위치, 조각)을 반환합니다.
+    조각들을 STREAM_WINDOW_CHARS 단위로 모아 분할하고, 창의 마지막 조각부터는 다음 창 앞에 붙여
+    경계에서 문장이 잘리지 않도록 합니다.
+    """
+    text_splitter = get_text_splitter()
+    window, window_chars, window_start = [], 0, 0
+
+    def split_window(text: str):
+        chunks = text_splitter.split_text(text)
+        positions = []
+        for chunk in chunks:
+            if positions:
+                # 이전 조각과는 최대 CHUNK_OVERLAP자만 겹치므로 그 앞은 건너뜁니다.
+                # (바로 다음 위치부터 찾으면 반복되는 문단에서 앞쪽의 같은 내용을 찾게 됩니다)
+                previous_end = positions[-1] + len(chunks[len(positions) - 1])
+                search_from = max(positions[-1] + 1, previous_end - CHUNK_OVERLAP)
+            else:
+                search_from = 0
+            index = text.find(chunk, search_from)
+            positions.append(index if index >= 0 else search_from)
+        return chunks, positions
+
+    for piece in pieces:
+        window.append(piece)
+        window_chars += len(piece)
+        if window_chars >= STREAM_WINDOW_CHARS:
+            text = "".join(window)
+            chunks, positions = split_window(text)
+            for chunk, position in zip(chunks[:-1], positions[:-1]):
+                yield window_start + position, chunk
+            carry_from = positions[-1] if chunks else len(text)
+            window = [text[carry_from:]]
+            window_chars = len(window[0])
+            window_start += carry_from
+    if window:
+        chunks, positions = split_window("".join(window))
+        for chunk, position in zip(chunks, positions):
+            yield window_start + position, chunk
+
+def page_for_offset(page_offsets: list[int], offset: int) -> int:
+    """페이지별 시작 위치 목록에서 offset이 속한 페이지 번호(1부터)를 찾습니다."""
+    return max(1, bisect.bisect_right(page_offsets, offset))
 
 def add_source_to_vector_store(note_id: int, source_text: str, source_path: str):
     """
     주어진 텍스트를 노트의 벡터 저장소에 추가합니다.
     이제 material_id가 아닌 note_id를 사용합니다.
     """
-    embeddings = get_embeddings_model()
-    if embeddings is None: return
-
     if not source_text or not source_text.strip():
         print(f"[RAG] Note ID {note_id}: 소스 내용이 비어있어 처리를 건너뜁니다.")
         return
+    add_source_pieces_to_vector_store(note_id=note_id, pieces=[source_text], source_path=source_path)
 
-    text_splitter = RecursiveCharacterTextSplitter(
-        chunk_size=1000, 
-        chunk_overlap=200,
-        separators=["\n\n", "\n", ". ", " ", ""]
-    )
-    chunks = text_splitter.split_text(source_text)
-    
-    if not chunks:
+def add_source_pieces_to_vector_store(note_id: int, pieces, source_path: str, page_offsets: list[int] | None = None):
+    """
+    텍스트 조각 스트림(제너레이터)을 나누고 VECTOR_WRITE_BATCH_SIZE개씩 임베딩하여 노트의 벡터 저장소에 추가합니다.
+    전체 텍스트나 전체 조각 목록을 메모리에 올리지 않습니다.
+    page_offsets(PDF 페이지별 시작 위치)가 있으면 각 조각에 'page' 메타데이터를 붙입니다.
+    """
+    add_sources_to_vector_store(note_id=note_id, sources=[(pieces, source_path, page_offsets)])
+
+def add_sources_to_vector_store(note_id: int, sources):
+    """
+    여러 소스의 (텍스트 조각 스트림, source_path, page_offsets)를 노트의 벡터 저장소에 한 번에 추가합니다.
+    컬렉션은 한 번만 열고, 소스 경계와 관계없이 VECTOR_WRITE_BATCH_SIZE개씩 모아 임베딩하고 저장합니다.
+    도중에 실패하면 이번에 저장한 조각을 벡터 저장소와 BM25 색인에서 되돌리고 예외를 다시 발생시켜 작업이 실패하게 합니다.
+    """
+    embeddings = get_embeddings_model()
+    if embeddings is None: return
+
+    lexical_index = get_lexical_index()
+    written_ids = []
+    with collection_lock(note_collection_name(note_id)).shared():
+        vector_store = get_note_vector_store(note_id, embeddings)
+        lexical_mark = lexical_index.max_rowid()
+        try:
+            _write_sources(note_id, sources, vector_store, written_ids=written_ids)
+        except Exception as e:
+            print(f"[RAG] Note ID {note_id}: 소스 처리 중 오류 발생, 저장한 조각 {len(written_ids)}개를 되돌립니다: {e}")
+            _delete_ids(vector_store._collection, written_ids)
+            # 같은 노트에 동시에 추가되는 다른 소스의 조각은 남겨 둡니다.
+            for _, source_path, _ in sources:
+                lexical_index.delete(note_id, source=source_path, min_rowid=lexical_mark + 1)
+            raise
+
+    if not written_ids:
         print(f"[RAG] Note ID {note_id}: 소스에서 텍스트 조각을 생성할 수 없습니다.")
         return
+    # 노트 내용이 바뀌었으므로 이전에 캐시된 채팅 답변을 무효화합니다.
+    get_answer_cache().invalidate_note(note_id)
+    print(f"[RAG] Note ID {note_id}: 소스 처리 및 벡터 저장을 완료했습니다. ({len(written_ids)}개 조각)")
+
+def _write_sources(note_id: int, sources, vector_store, written_ids: list[str]) -> list[str]:
+    """
+    소스들을 나누어 벡터 저장소와 BM25 색인에 저장하고 저장한 조각 ID 목록을 반환합니다.
+    실패하면 예외를 그대로 발생시키며, 그때까지 저장한 ID는 written_ids에 남아 있어 되돌릴 수 있습니다.
+    """
+    lexical_index = get_lexical_index()
+
+    def write(documents):
+        # 같은 조각을 BM25 어휘 색인에도 추가합니다.
+        written_ids.extend(vector_store.add_documents(documents))
+        lexical_index.add(note_id, documents)
+
+    batch = []
+    for pieces, source_path, page_offsets in sources:
+        source_chunks = 0
+        for offset, chunk in iter_chunks(pieces):
+            # 각 chunk에 source_path(와 페이지 번호) 메타데이터 추가
+            # offset(원문에서의 시작 위치)은 다시 색인할 때 원문을 복원하는 데 사용합니다.
+            metadata = {"source": source_path, "note_id": note_id, "offset": offset}
+            if page_offsets:
+                metadata["page"] = page_for_offset(page_offsets, offset)
+            batch.append(Document(page_content=chunk, metadata=metadata))
+            source_chunks += 1
+            if len(batch) >= VECTOR_WRITE_BATCH_SIZE:
+                write(batch)
+                batch = []
+        if source_chunks == 0:
+            print(f"[RAG] Note ID {note_id}: 소스 '{source_path}'에서 텍스트 조각을 생성할 수 없습니다.")
+        else:
+            print(f"[RAG] Note ID {note_id}: 소스 '{source_path}'를 {source_chunks}개 조각으로 나누었습니다.")
+    if batch:
+        write(batch)
+    return written_ids
+
 
-    # 각 chunk에 source_path 메타데이터 추가
-    documents = [Document(page_content=chunk, metadata={"source": source_path}) for chunk in chunks]
+# --- Vector Store Lifecycle ---
 
+class _CollectionLock:
+    """
+    컬렉션 하나의 읽기/쓰기 잠금입니다. 조각 추가·삭제와 핸들 열기는 함께(shared) 실행되고,
+    압축(compact_collection)은 혼자(exclusive) 실행됩니다. 압축이 기다리는 동안에는 새 작업을 받지 않습니다.
+    """
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._active = 0
+        self._exclusive = False
+        self._waiting_exclusive = 0
+
+    @contextmanager
+    def shared(self):
+        with self._condition:
+            self._condition.wait_for(lambda: not self._exclusive and not self._waiting_exclusive)
+            self._active += 1
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._active -= 1
+                self._condition.notify_all()
+
+    @contextmanager
+    def exclusive(self):
+        with self._condition:
+            self._waiting_exclusive += 1
+            self._condition.wait_for(lambda: not self._exclusive and not self._active)
+            self._waiting_exclusive -= 1
+            self._exclusive = True
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._exclusive = False
+                self._condition.notify_all()
+
+_collection_locks: dict[str, _CollectionLock] = {}
+_collection_locks_guard = threading.Lock()
+
+def collection_lock(collection_name: str) -> _CollectionLock:
+    with _collection_locks_guard:
+        return _collection_locks.setdefault(collection_name, _CollectionLock())
+
+# 삭제가 일어나 압축(compact_collection)이 필요한 컬렉션 목록은 Chroma 디렉터리의 SQLite 파일에 저장하여
+# 서버와 manage_vectors CLI가 함께 봅니다.
+DIRTY_COLLECTIONS_FILE = "dirty_collections.sqlite3"
+
+def _dirty_collections_db() -> sqlite3.Connection:
+    os.makedirs(CHROMA_DB_DIRECTORY, exist_ok=True)
+    conn = sqlite3.connect(os.path.join(CHROMA_DB_DIRECTORY, DIRTY_COLLECTIONS_FILE), timeout=30)
+    conn.execute("CREATE TABLE IF NOT EXISTS dirty_collections (name TEXT PRIMARY KEY)")
+    return conn
+
+def mark_collection_dirty(collection_name: str):
+    conn = _dirty_collections_db()
     try:
-        collection_name = f"note_{note_id}"
-        
-        vector_store = Chroma(
-            collection_name=collection_name,
-            persist_directory=CHROMA_DB_DIRECTORY,
-            embedding_function=embeddings
-        )
-        vector_store.add_documents(documents)
-        
-        print(f"[RAG] Note ID {note_id}: 소스 '{source_path}' 처리 및 벡터 저장을 완료했습니다. ({len(chunks)}개 조각)")
+        with conn:
+            conn.execute("INSERT OR IGNORE INTO dirty_collections (name) VALUES (?)", (collection_name,))
+    finally:
+        conn.close()
 
-    except Exception as e:
-        print(f"[RAG] Note ID {note_id}: 소스 처리 중 오류 발생: {e}")
+def dirty_collection_names() -> list[str]:
+    conn = _dirty_collections_db()
+    try:
+        return [name for (name,) in conn.execute("SELECT name FROM dirty_collections ORDER BY name")]
+    finally:
+        conn.close()
+
+def _mark_collection_compacted(collection_name: str):
+    conn = _dirty_collections_db()
+    try:
+        with conn:
+            conn.execute("DELETE FROM dirty_collections WHERE name = ?", (collection_name,))
+    finally:
+        conn.close()
+
+# 한 번에 가져오거나 삭제하는 조각 수 (Chroma의 배치 크기 제한보다 작게)
+LIFECYCLE_BATCH_SIZE = 1000
+
+def _delete_ids(collection, ids: list[str]):
+    for start in range(0, len(ids), LIFECYCLE_BATCH_SIZE):
+        collection.delete(ids=ids[start:start + LIFECYCLE_BATCH_SIZE])
+
+def _forget_note(note_id: int):
+    _backfilled_notes.discard(note_id)
+    get_answer_cache().invalidate_note(note_id)
+
+def delete_note_vectors(note_id: int):
+    """노트가 삭제될 때 노트의 모든 조각을 벡터 저장소, BM25 색인, 답변 캐시에서 지웁니다."""
+    client = client_registry.get_chroma_client(CHROMA_DB_DIRECTORY)
+    collection_name = note_collection_name(note_id)
+    with collection_lock(collection_name).shared():
+        if note_filter(note_id) is None:
+            if collection_name in list_collection_names(client):
+                client.delete_collection(collection_name)
+            client_registry.evict_vector_store(collection_name)
+        else:
+            client.get_or_create_collection(collection_name, embedding_function=None).delete(where=note_filter(note_id))
+            mark_collection_dirty(collection_name)
+    get_lexical_index().delete(note_id)
+    _forget_note(note_id)
+    print(f"[RAG] Note ID {note_id}: 벡터 저장소에서 노트를 삭제했습니다.")
+
+def delete_source_vectors(note_id: int, source_path: str):
+    """노트에서 source 메타데이터가 source_path인 조각을 지웁니다."""
+    client = client_registry.get_chroma_client(CHROMA_DB_DIRECTORY)
+    collection_name = note_collection_name(note_id)
+    where = {"source": source_path}
+    if note_filter(note_id) is not None:
+        where = {"$and": [note_filter(note_id), where]}
+    with collection_lock(collection_name).shared():
+        client.get_or_create_collection(collection_name, embedding_function=None).delete(where=where)
+        mark_collection_dirty(collection_name)
+    get_lexical_index().delete(note_id, source=source_path)
+    _forget_note(note_id)
+    print(f"[RAG] Note ID {note_id}: 소스 '{source_path}'의 조각을 삭제했습니다.")
+
+def _chunks_fit(text: str, chunks) -> bool:
+    """모든 조각이 offset 위치에 그대로 있고, 텍스트 길이가 조각들이 덮는 범위와 같은지 확인합니다."""
+    end = max(offset + len(content) for offset, _, content, _ in chunks)
+    return len(text) == end and all(text[offset:offset + len(content)] == content for offset, _, content, _ in chunks)
+
+def reconstruct_sources(documents: list[str], metadatas: list[dict],
+                        stored_sources: dict[str, list[tuple[str, str | None]]] | None = None
+                        ) -> tuple[list[tuple[str, str, list[int] | None]], set[str]]:
+    """
+    저장된 조각들로 소스별 원문을 복원하여 ([(source_path, text, page_offsets)], 복원하지 못한 source_path 집합)을 반환합니다.
+    offset 메타데이터가 있으면 겹치는 부분을 정확히 합치고, 없는 예전 조각은 순서대로 이어 붙입니다.
+    stored_sources(crud.get_source_texts: 경로별 DB Source 행의 (내용, 지문))가 있으면 복원한 텍스트의 지문이
+    그 경로의 소스 중 하나와 같아야 하고, 다르면(예전 offset 오류, 같은 경로의 소스가 여럿인 경우 등) 지문이 맞는
+    Source 내용을 사용합니다. 그런 내용도 없으면 내용을 잃지 않도록 복원하지 못한 것으로 돌려줍니다.
+    """
+    groups: dict[str, list] = {}
+    for index, (content, metadata) in enumerate(zip(documents, metadatas)):
+        metadata = metadata or {}
+        groups.setdefault(metadata.get("source", "알 수 없음"), []).append((metadata.get("offset"), index, content, metadata.get("page")))
+
+    sources, unrecovered = [], set()
+    for source_path, chunks in groups.items():
+        page_starts = {}
+        if any(offset is None for offset, _, _, _ in chunks):
+            text = "\n\n".join(content for _, _, content, _ in sorted(chunks, key=lambda c: c[1]))
+            fits = True
+        else:
+            text = ""
+            for offset, _, content, page in sorted(chunks, key=lambda c: (c[0], c[1])):
+                if offset > len(text):
+                    # 분할기가 조각 양 끝에서 지운 공백 자리
+                    text += "\n" * (offset - len(text))
+                overlap = text[offset:]
+                if content.startswith(overlap):
+                    text = text[:offset] + content
+                elif not overlap.startswith(content):
+                    # 위치가 맞지 않는 조각은 뒤에 이어 붙입니다 (아래 확인에서 걸러집니다).
+                    text += "\n" + content
+                if page is not None:
+                    page_starts.setdefault(page, offset)
+            fits = _chunks_fit(text, chunks)
+
+        rows = (stored_sources or {}).get(source_path, [])
+        fingerprints = {fingerprint for _, fingerprint in rows if fingerprint}
+        if fingerprints and fits:
+            fits = material_handler.fingerprint_text(text) in fingerprints
+        if not fits:
+            # Source.content는 미리보기이므로 원문 전체가 담긴 경우에만 지문이 맞습니다.
+            text = next((content for content, fingerprint in rows
+                         if content and fingerprint and material_handler.fingerprint_text(content) == fingerprint), None)
+            if text is None:
+                unrecovered.add(source_path)
+                continue
+            page_starts = {}
+        page_offsets = None
+        if page_starts:
+            page_offsets, start = [], 0
+            for page in range(1, max(page_starts) + 1):
+                start = page_starts.get(page, start)
+                page_offsets.append(start)
+        sources.append((source_path, text, page_offsets))
+    return sources, unrecovered
+
+def reindex_note(note_id: int, stored_sources: dict[str, list[tuple[str, str | None]]] | None = None) -> int | None:
+    """
+    노트의 조각을 현재 분할기 설정으로 다시 나누고 임베딩합니다 (원문은 저장된 조각으로 복원하고
+    stored_sources(crud.get_source_texts)의 지문으로 확인합니다). 원문을 복원하지 못한 소스는 예전 조각을 그대로 둡니다.
+    새 조각을 모두 저장한 뒤에 예전 조각을 지우므로, 도중에 실패하면 새 조각만 되돌리고 예전 상태가 유지됩니다.
+    API 키가 없으면 None, 그 외에는 새 조각 수를 반환합니다.
+    """
+    embeddings = get_embeddings_model()
+    if embeddings is None: return None
+    with collection_lock(note_collection_name(note_id)).shared():
+        return _reindex_note(note_id, embeddings, stored_sources)
+
+def _reindex_note(note_id: int, embeddings, stored_sources) -> int:
+    vector_store = get_note_vector_store(note_id, embeddings)
+    stored = vector_store.get(where=note_filter(note_id), include=["documents", "metadatas"])
+    lexical_index = get_lexical_index()
+    from_lexical = not stored["ids"]
+    if from_lexical:
+        # 임베딩 백엔드를 바꾼 직후처럼 벡터 저장소가 비어 있으면 BM25 색인에 저장된 조각으로 복원합니다.
+        stored = lexical_index.documents(note_id)
+        stored["ids"] = []
+        if not stored["documents"]:
+            return 0
+    sources, unrecovered = reconstruct_sources(stored["documents"], stored["metadatas"], stored_sources)
+    for source_path in unrecovered:
+        print(f"[RAG] Note ID {note_id}: 소스 '{source_path}'의 원문을 복원할 수 없어 예전 조각을 그대로 둡니다.")
+
+    def source_of(metadata) -> str:
+        return (metadata or {}).get("source", "알 수 없음")
+
+    lexical_mark = lexical_index.max_rowid()
+    written_ids = []
+    try:
+        _write_sources(note_id, [([text], source_path, page_offsets) for source_path, text, page_offsets in sources],
+                       vector_store, written_ids=written_ids)
+        if from_lexical:
+            # 복원하지 못한 소스도 예전 조각 그대로 새 벡터 저장소에 넣습니다 (BM25 색인에는 이미 있음).
+            kept = [Document(page_content=content, metadata=metadata)
+                    for content, metadata in zip(stored["documents"], stored["metadatas"]) if source_of(metadata) in unrecovered]
+            if kept:
+                written_ids.extend(vector_store.add_documents(kept))
+    except Exception:
+        _delete_ids(vector_store._collection, written_ids)
+        lexical_index.delete(note_id, min_rowid=lexical_mark + 1)
+        raise
+
+    _delete_ids(vector_store._collection, [chunk_id for chunk_id, metadata in zip(stored["ids"], stored["metadatas"])
+                                           if source_of(metadata) not in unrecovered])
+    if unrecovered:
+        for source_path, _, _ in sources:
+            lexical_index.delete(note_id, source=source_path, max_rowid=lexical_mark)
+    else:
+        lexical_index.delete(note_id, max_rowid=lexical_mark)
+    mark_collection_dirty(note_collection_name(note_id))
+    _forget_note(note_id)
+    print(f"[RAG] Note ID {note_id}: 조각 {len(stored['documents'])}개를 {len(written_ids)}개로 다시 색인했습니다.")
+    return len(written_ids)
+
+def list_collection_names(client) -> list[str]:
+    return [getattr(collection, "name", collection) for collection in client.list_collections()]
+
+def compact_collection(collection_name: str):
+    """
+    컬렉션을 새 컬렉션으로 복사한 뒤 교체하여 삭제된 조각이 남긴 HNSW 색인 공간을 회수합니다.
+    저장된 임베딩을 그대로 복사하므로 임베딩 API를 호출하지 않습니다.
+    복사부터 교체까지 같은 컬렉션의 쓰기를 막아(collection_lock) 도중에 추가된 조각을 잃지 않으며,
+    교체 전후로 캐시된 핸들을 버려 이후 요청이 새 컬렉션을 열도록 합니다.
+    서버 밖(manage_vectors)에서 실행할 때는 서버의 쓰기와 잠금을 공유하지 않으므로 서버를 멈추고 실행합니다.
+    """
+    with collection_lock(collection_name).exclusive():
+        client = client_registry.get_chroma_client(CHROMA_DB_DIRECTORY)
+        if collection_name not in list_collection_names(client):
+            _mark_collection_compacted(collection_name)
+            return
+        source = client.get_collection(collection_name, embedding_function=None)
+        compact_name = f"{collection_name}__compact"
+        if compact_name in list_collection_names(client):
+            client.delete_collection(compact_name)
+        target = client.create_collection(compact_name, metadata=source.metadata, embedding_function=None)
+
+        copied = 0
+        while True:
+            batch = source.get(include=["embeddings", "documents", "metadatas"], limit=LIFECYCLE_BATCH_SIZE, offset=copied)
+            if not batch["ids"]:
+                break
+            target.add(ids=batch["ids"], embeddings=batch["embeddings"], documents=batch["documents"], metadatas=batch["metadatas"])
+            copied += len(batch["ids"])
+
+        client_registry.evict_vector_store(collection_name)
+        client.delete_collection(collection_name)
+        target.modify(name=collection_name)
+        client_registry.evict_vector_store(collection_name)
+        _mark_collection_compacted(collection_name)
+
+def compact_dirty_collections() -> list[str]:
+    """삭제가 일어난 컬렉션들을 압축하고 이름 목록을 반환합니다."""
+    compacted = []
+    for collection_name in dirty_collection_names():
+        compact_collection(collection_name)
+        compacted.append(collection_name)
+    get_lexical_index().optimize()
+    if compacted:
+        vacuum_chroma_database()
+    return compacted
+
+def vacuum_chroma_database(timeout: float = 5):
+    """삭제로 생긴 Chroma SQLite 파일의 빈 페이지를 회수합니다. 다른 쓰기가 진행 중이면 건너뜁니다."""
+    path = os.path.join(CHROMA_DB_DIRECTORY, "chroma.sqlite3")
+    if not os.path.exists(path):
+        return
+    conn = sqlite3.connect(path, timeout=timeout)
+    try:
+        conn.execute("VACUUM")
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    except sqlite3.OperationalError as e:
+        print(f"[RAG] Chroma DB VACUUM을 건너뜁니다: {e}")
+    finally:
+        conn.close()
+
+def sweep_orphans(valid_note_ids: set[int], max_note_id: int) -> list[int]:
+    """
+    DB에 없는 노트의 조각을 벡터 저장소와 BM25 색인에서 지우고 지운 노트 ID 목록을 반환합니다.
+    조회 이후에 만들어진 노트를 지우지 않도록 max_note_id 이하의 노트만 대상으로 합니다.
+    """
+    def is_orphan(note_id) -> bool:
+        return isinstance(note_id, int) and note_id <= max_note_id and note_id not in valid_note_ids
+
+    client = client_registry.get_chroma_client(CHROMA_DB_DIRECTORY)
+    removed = set()
+    for collection_name in list_collection_names(client):
+        if collection_name.startswith("note_") and collection_name[5:].isdigit():
+            note_id = int(collection_name[5:])
+            if is_orphan(note_id):
+                with collection_lock(collection_name).shared():
+                    client.delete_collection(collection_name)
+                    client_registry.evict_vector_store(collection_name)
+                removed.add(note_id)
+        elif collection_name.startswith("notes_shard_"):
+            with collection_lock(collection_name).shared():
+                collection = client.get_collection(collection_name, embedding_function=None)
+                orphans, offset = set(), 0
+                while True:
+                    batch = collection.get(include=["metadatas"], limit=LIFECYCLE_BATCH_SIZE, offset=offset)
+                    if not batch["ids"]:
+                        break
+                    orphans.update(metadata.get("note_id") for metadata in batch["metadatas"] if metadata and is_orphan(metadata.get("note_id")))
+                    offset += len(batch["ids"])
+                if orphans:
+                    collection.delete(where={"note_id": {"$in": sorted(orphans)}})
+                    mark_collection_dirty(collection_name)
+                    removed.update(orphans)
+
+    lexical_index = get_lexical_index()
+    for note_id in lexical_index.note_ids():
+        if is_orphan(note_id):
+            lexical_index.delete(note_id)
+            removed.add(note_id)
+    for note_id in removed:
+        _forget_note(note_id)
+    return sorted(removed)
+
+def vector_storage_bytes() -> int:
+    """벡터 저장소 디렉토리와 BM25 색인 파일의 크기 합계입니다."""
+    paths = [os.path.join(root, name) for root, _, names in os.walk(CHROMA_DB_DIRECTORY) for name in names]
+    lexical_path = get_lexical_index().path
+    paths += [lexical_path + suffix for suffix in ("", "-wal", "-shm")]
+    return sum(os.path.getsize(path) for path in paths if os.path.exists(path))
+
+def format_citation(metadata: dict) -> str:
+    """조각 메타데이터를 '출처 (p. 42)' 형태의 인용 문자열로 만듭니다."""
+    citation = metadata.get('source', '알 수 없음')
+    if metadata.get('page'):
+        citation += f" (p. {metadata['page']})"
+    return citation
+
+def reciprocal_rank_fusion(result_lists: list[list[Document]], k: int, rrf_k: int = RRF_K) -> list[Document]:
+    """여러 검색 결과를 순위 역수의 합(RRF)으로 합쳐 상위 k개를 반환합니다. 같은 조각(출처, 내용)은 하나로 합칩니다."""
+    scores, documents = {}, {}
+    for results in result_lists:
+        for rank, doc in enumerate(results):
+            key = (doc.metadata.get("source"), doc.page_content)
+            scores[key] = scores.get(key, 0.0) + 1.0 / (rrf_k + rank + 1)
+            documents.setdefault(key, doc)
+    return [documents[key] for key in sorted(scores, key=scores.get, reverse=True)[:k]]
+
+class LexicalRetriever(BaseRetriever):
+    """노트의 BM25 어휘 색인에서 조각을 검색합니다."""
+    note_id: int
+    index: LexicalIndex
+    k: int = HYBRID_CANDIDATE_K
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> list[Document]:
+        return [Document(page_content=content, metadata=metadata) for content, metadata in self.index.search(self.note_id, query, self.k)]
+
+class HybridRetriever(BaseRetriever):
+    """벡터 검색과 BM25 검색 결과를 Reciprocal Rank Fusion으로 합칩니다."""
+    retrievers: list[BaseRetriever]
+    k: int = RETRIEVAL_K
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> list[Document]:
+        result_lists = [retriever.invoke(query, config={"callbacks": run_manager.get_child()}) for retriever in self.retrievers]
+        return reciprocal_rank_fusion(result_lists, self.k)
+
+def build_hybrid_retriever(vector_store, note_id: int, index: LexicalIndex | None = None, k: int = RETRIEVAL_K) -> HybridRetriever:
+    return HybridRetriever(retrievers=[
+        vector_store.as_retriever(search_kwargs=note_search_kwargs(note_id, HYBRID_CANDIDATE_K)),
+        LexicalRetriever(note_id=note_id, index=index or get_lexical_index()),
+    ], k=k)
+
+_backfilled_notes: set[int] = set()
+
+def backfill_lexical_index(note_id: int, vector_store, index: LexicalIndex | None = None):
+    """어휘 색인이 생기기 전에 벡터화된 노트는 Chroma에 저장된 조각으로 색인을 한 번 채웁니다."""
+    if note_id in _backfilled_notes:
+        return
+    index = index or get_lexical_index()
+    if index.count(note_id) == 0:
+        stored = vector_store.get(where=note_filter(note_id), include=["documents", "metadatas"])
+        if stored["documents"]:
+            index.add(note_id, [Document(page_content=content, metadata=metadata or {})
+                                for content, metadata in zip(stored["documents"], stored["metadatas"])])
+            print(f"[RAG] Note ID {note_id}: 기존 조각 {len(stored['documents'])}개로 BM25 색인을 만들었습니다.")
+    _backfilled_notes.add(note_id)
 
 def get_retriever_for_note(note_id: int):
-    """지정된 note_id에 대한 retriever를 로드하고 반환합니다."""
+    """지정된 note_id에 대한 retriever(기본적으로 벡터 + BM25 하이브리드)를 로드하고 반환합니다."""
     embeddings = get_embeddings_model()
     if embeddings is None: return None
 
-    collection_name = f"note_{note_id}"
-    
     try:
-        vector_store = Chroma(
-            collection_name=collection_name,
-            persist_directory=CHROMA_DB_DIRECTORY,
-            embedding_function=embeddings
-        )
-        return vector_store.as_retriever(search_kwargs={"k": 5}) # 노트 전체에서 5개 조회
+        with collection_lock(note_collection_name(note_id)).shared():
+            vector_store = get_note_vector_store(note_id, embeddings)
+        if not HYBRID_RETRIEVAL:
+            return vector_store.as_retriever(search_kwargs=note_search_kwargs(note_id, RETRIEVAL_K)) # 노트 전체에서 5개 조회
+        backfill_lexical_index(note_id, vector_store)
+        return build_hybrid_retriever(vector_store, note_id)
     except Exception as e:
         # ChromaDB에서 collection이 존재하지 않을 때 발생하는 예외를 처리해야 할 수 있습니다.
         # 현재 Chroma는 collection이 없으면 자동으로 생성하려고 시도하므로, 
@@ -88,29 +652,77 @@ def get_retriever_for_note(note_id: int):
         print(f"[RAG] Note ID {note_id}: Retriever 로드 중 오류 발생 (Collection이 존재하지 않을 수 있음): {e}")
         return None
 
-async def stream_rag_response_from_note(note_id: int, question: str):
+async def stream_rag_response_from_note(note_id: int, question: str, session: chat_memory.ChatSessionState | None = None):
     """
-    '학습 노트' 전체를 대상으로 RAG 파이프라인을 실행하여 답변을 스트리밍합니다.
+    '학습 노트' 전체를 대상으로 RAG 파이프라인을 실행하여 답변을 {"type", "data"} 이벤트로 스트리밍합니다.
+    검색한 출처(source) 이벤트를 답변 생성 전에 먼저 보내고, 이어서 답변 토큰(token) 이벤트를 보냅니다.
+    세션이 주어지면 세션(session) 이벤트를 가장 먼저 보내고, 이전 대화로 검색 질문을 재작성하며
+    누적 요약과 최근 대화를 프롬프트에 넣은 뒤 답변이 끝나면 대화를 세션에 추가합니다.
+    SSE 프레이밍, 토큰 묶음, 연결 유지는 sse.stream_events가 담당합니다.
     """
+    if session is not None:
+        yield {"type": "session", "data": {"session_id": session.session_id}}
+
     api_key = os.getenv("GEMINI_API_KEY")
     if not api_key or api_key == "YOUR_API_KEY_HERE":
-        yield json.dumps({"type": "error", "data": "현재 API 키가 설정되지 않아 '자료와 대화하기' 기능을 사용할 수 없습니다."})
+        yield {"type": "error", "data": "현재 API 키가 설정되지 않아 '자료와 대화하기' 기능을 사용할 수 없습니다."}
         return
 
     try:
-        retriever = get_retriever_for_note(note_id)
+        started = time.perf_counter()
+        # 이전 대화가 있으면 같은 질문이라도 답이 달라지므로 답변 캐시를 사용하지 않습니다.
+        has_history = session is not None and session.has_history
+        # 같은 노트에 거의 같은 질문이 캐시되어 있으면 저장된 답변과 출처 이벤트를 그대로 재생합니다.
+        question_vector = None
+        embeddings = get_embeddings_model() if ANSWER_CACHE_ENABLED and not has_history else None
+        if embeddings is not None:
+            answer_cache = get_answer_cache()
+            question_vector = await vector_executor.run(embeddings.embed_query, question)
+            cached_events, cache_version = await vector_executor.run(answer_cache.lookup, note_id, question_vector)
+            if cached_events is not None:
+                answer = []
+                for event in cached_events:
+                    # 이전 버전은 이벤트를 JSON 문자열로 저장했습니다.
+                    event = json.loads(event) if isinstance(event, str) else event
+                    if event.get("type") == "token":
+                        answer.append(event["data"])
+                    yield event
+                if session is not None:
+                    await io_executor.run(chat_memory.append_turn, session, question, "".join(answer))
+                return
+
+        retriever = await vector_executor.run(get_retriever_for_note, note_id)
         if retriever is None:
             # 이 경우는 보통 노트에 아직 아무 소스도 추가되지 않은 경우입니다.
-            yield json.dumps({"type": "error", "data": "아직 노트에 분석된 소스가 없습니다. 먼저 소스를 추가하고 분석해주세요."})
+            yield {"type": "error", "data": "아직 노트에 분석된 소스가 없습니다. 먼저 소스를 추가하고 분석해주세요."}
             return
+
+        # "더 자세히 설명해줘" 같은 후속 질문은 이전 대화를 반영한 독립 질문으로 바꿔 검색합니다.
+        search_query = await chat_memory.rewrite_question(session, question) if has_history else question
+        relevant_docs = await vector_executor.run(retriever.get_relevant_documents, search_query)
+
+        # 출처는 생성을 기다리지 않고 바로 보내 사용자가 근거를 먼저 볼 수 있게 합니다.
+        events = []
+        for doc in relevant_docs:
+            event = {"type": "source", "data": {"page_content": doc.page_content, "metadata": doc.metadata}}
+            events.append(event)
+            yield event
         
-        relevant_docs = retriever.get_relevant_documents(question)
-        
-        context = "\n\n---\n\n".join([f"출처: {doc.metadata.get('source', '알 수 없음')}\n내용: {doc.page_content}" for doc in relevant_docs])
+        context = "\n\n---\n\n".join([f"출처: {format_citation(doc.metadata)}\n내용: {doc.page_content}" for doc in relevant_docs])
+
+        # 요약과 토큰 예산 안의 최근 대화만 넣으므로 대화가 길어져도 프롬프트 크기는 일정합니다.
+        history = ""
+        if has_history:
+            if session.summary:
+                history += f"이전 대화 요약:\n{session.summary}\n\n"
+            history += "최근 대화:\n" + chat_memory.format_history(session.recent_messages())
 
         template = """        당신은 주어진 내용을 바탕으로 질문에 답변하는 AI 어시스턴트입니다.
         내용을 벗어난 질문이나, 내용에서 답을 찾을 수 없는 경우에는 "제공된 문서의 내용만으로는 답변할 수 없습니다."라고 답변해주세요.
         답변은 항상 한국어로 해주세요. 각 답변의 근거가 된 출처를 명확히 언급해주세요.
+        이전 대화가 있으면 질문 속 '그것', '더 자세히' 같은 표현은 이전 대화를 참고하여 해석해주세요.
+
+        {history}
 
         내용:
         {context}
@@ -118,19 +730,31 @@ async def stream_rag_response_from_note(note_id: int, question: str):
         질문:
         {question}        """
         prompt = ChatPromptTemplate.from_template(template)
-        model = ChatGoogleGenerativeAI(model="gemini-1.5-flash", google_api_key=api_key, temperature=0)
+        model = client_registry.get_chat_model(temperature=0)
         
         chain = prompt | model | StrOutputParser()
 
-        async for chunk in chain.astream({"context": context, "question": question}):
-            yield json.dumps({"type": "token", "data": chunk})
+        answer = []
+        async for chunk in chain.astream({"history": history, "context": context, "question": question}):
+            event = {"type": "token", "data": chunk}
+            events.append(event)
+            answer.append(chunk)
+            yield event
 
-        for doc in relevant_docs:
-            yield json.dumps({"type": "source", "data": {"page_content": doc.page_content, "metadata": doc.metadata}})
+        if question_vector is not None:
+            await vector_executor.run(answer_cache.store, note_id, cache_version, question, question_vector, events,
+                                      (time.perf_counter() - started) * 1000)
+        if session is not None:
+            # 연결이 끊겨 중간에 멈춘 답변은 여기까지 오지 않으므로 저장되지 않습니다.
+            # DB 쓰기는 I/O 실행기에서 하여 이벤트 루프를 막지 않습니다.
+            await io_executor.run(chat_memory.append_turn, session, question, "".join(answer))
+            chat_memory.schedule_summary(session)
 
+    except ExecutorBusyError as e:
+        yield {"type": "error", "data": e.detail}
     except Exception as e:
         print(f"[RAG] Note ID {note_id}: 스트리밍 중 오류 발생: {e}")
-        yield json.dumps({"type": "error", "data": "스트리밍 답변 중 오류가 발생했습니다."})
+        yield {"type": "error", "data": "스트리밍 답변 중 오류가 발생했습니다."}
 
 
 # --- Deprecated Functions (material-centric) ---
@@ -156,12 +780,8 @@ def process_and_store_document(material_id: int, document_text: str):
 
     try:
         collection_name = f"material_{material_id}"
-        vector_store = Chroma.from_texts(
-            texts=chunks,
-            embedding=embeddings,
-            collection_name=collection_name,
-            persist_directory=CHROMA_DB_DIRECTORY
-        )
+        vector_store = get_vector_store(collection_name, embeddings)
+        vector_store.add_texts(chunks)
         print(f"[RAG] Material ID {material_id}: 문서 처리 및 벡터 저장을 완료했습니다. ({len(chunks)}개 조각)")
         return vector_store
     except Exception as e:
@@ -173,11 +793,7 @@ def get_retriever_for_material(material_id: int):
     embeddings = get_embeddings_model()
     if embeddings is None: return None
     collection_name = f"material_{material_id}"
-    vector_store = Chroma(
-        collection_name=collection_name,
-        persist_directory=CHROMA_DB_DIRECTORY,
-        embedding_function=embeddings
-    )
+    vector_store = get_vector_store(collection_name, embeddings)
     return vector_store.as_retriever(search_kwargs={"k": 3})
 
 async def stream_rag_response(material_id: int, question: str):
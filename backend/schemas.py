@@ -1,5 +1,6 @@
 from pydantic import BaseModel, Field
 from typing import Optional, List, Any
+from datetime import datetime
 
 
 # --- Source Models ---
@@ -8,6 +9,7 @@ class SourceBase(BaseModel):
     type: str
     path: str
     content: Optional[str] = None
+    fingerprint: Optional[str] = None
 
 class SourceCreate(SourceBase):
     pass
@@ -19,6 +21,16 @@ class Source(SourceBase):
     class Config:
         orm_mode = True
 
+class SourceSummary(BaseModel):
+    """목록 응답용 소스. 미리보기(content)와 지문은 포함하지 않습니다."""
+    id: int
+    type: str
+    path: str
+    note_id: int
+
+    class Config:
+        orm_mode = True
+
 
 # --- Learning Note Models ---
 
@@ -37,6 +49,29 @@ class LearningNote(LearningNoteBase):
     class Config:
         orm_mode = True
 
+class LearningNoteSummary(LearningNoteBase):
+    """사용자 응답(schemas.User)에 포함되는 노트."""
+    id: int
+    owner_id: int
+    sources: List[SourceSummary] = []
+
+    class Config:
+        orm_mode = True
+
+class LearningNoteListItem(LearningNoteBase):
+    """노트 목록 응답용 노트. 소스 대신 소스 수와 학습 자료 유무만 포함합니다."""
+    id: int
+    owner_id: int
+    source_count: int
+    has_material: bool
+
+    class Config:
+        orm_mode = True
+
+class NotePage(BaseModel):
+    items: List[LearningNoteListItem]
+    next_cursor: Optional[str] = None  # 마지막 페이지이면 None
+
 
 # --- MicroLearn Core Models ---
 
@@ -94,7 +129,33 @@ class LearningMaterial(BaseModel):
         orm_mode = True
 
 # 순환 참조 해결
-LearningNote.update_forward_refs(LearningMaterial=LearningMaterial)
+LearningNote.model_rebuild()
+
+
+# --- Job Models ---
+
+class JobStage(BaseModel):
+    name: str
+    status: str  # 'pending', 'running', 'done', 'cached', 'skipped', 'failed'
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    duration_ms: Optional[float] = None
+
+class Job(BaseModel):
+    id: str
+    type: str
+    status: str
+    note_id: int
+    stages: List[JobStage] = []
+    material_id: Optional[int] = None
+    result: Optional[Any] = None
+    error: Optional[str] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    class Config:
+        orm_mode = True
 
 
 # --- Auth Models ---
@@ -106,6 +167,7 @@ class Token(BaseModel):
 
 class TokenData(BaseModel):
     username: Optional[str] = None
+    user_id: Optional[int] = None
 
 
 class UserBase(BaseModel):
@@ -118,7 +180,21 @@ class UserCreate(UserBase):
 
 class User(UserBase):
     id: int
-    notes: List[LearningNote] = []
+    notes: List[LearningNoteSummary] = []
 
     class Config:
         orm_mode = True
+
+
+class UserListItem(UserBase):
+    """사용자 목록 응답용 사용자. 노트 대신 노트 수만 포함합니다."""
+    id: int
+    note_count: int
+
+    class Config:
+        orm_mode = True
+
+
+class UserPage(BaseModel):
+    items: List[UserListItem]
+    next_cursor: Optional[str] = None
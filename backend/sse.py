@@ -0,0 +1,115 @@
+# backend/sse.py
+
+import asyncio
+import json
+import os
+
+# 작은 토큰 이벤트를 모아 한 번에 보내는 시간 간격 (첫 토큰은 기다리지 않고 바로 보냄)
+SSE_COALESCE_MS = float(os.getenv("SSE_COALESCE_MS", "50"))
+# 모은 토큰이 이 글자 수를 넘으면 시간 간격을 기다리지 않고 보냅니다.
+SSE_COALESCE_MAX_CHARS = int(os.getenv("SSE_COALESCE_MAX_CHARS", "1024"))
+# 보낼 이벤트가 없을 때 프록시가 연결을 끊지 않도록 주석 줄을 보내는 주기
+SSE_HEARTBEAT_SECONDS = float(os.getenv("SSE_HEARTBEAT_SECONDS", "15"))
+# 생성 중인 이벤트를 쌓아두는 최대 개수. 클라이언트가 느리면 여기서 LLM 스트림 읽기를 멈춥니다.
+SSE_QUEUE_SIZE = int(os.getenv("SSE_QUEUE_SIZE", "64"))
+
+# 프록시(nginx)가 응답을 버퍼링하거나 캐시하지 않도록 합니다.
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+HEARTBEAT = ": keep-alive\n\n"
+
+_END = object()
+
+
+def format_event(data, event: str | None = None) -> str:
+    """SSE 프레임 하나를 만듭니다. dict는 JSON으로 바꾸고, 여러 줄 데이터는 줄마다 data: 를 붙입니다."""
+    if not isinstance(data, str):
+        data = json.dumps(data, ensure_ascii=False)
+    lines = [f"event: {event}"] if event else []
+    lines.extend(f"data: {line}" for line in data.split("\n"))
+    return "\n".join(lines) + "\n\n"
+
+
+async def stream_events(events, request=None, coalesce_ms: float = SSE_COALESCE_MS,
+                        max_buffer_chars: int = SSE_COALESCE_MAX_CHARS, heartbeat_seconds: float = SSE_HEARTBEAT_SECONDS,
+                        queue_size: int = SSE_QUEUE_SIZE):
+    """
+    {"type": ..., "data": ...} 이벤트를 내보내는 비동기 제너레이터를 SSE 응답 본문으로 바꿉니다.
+    - 연속된 token 이벤트는 coalesce_ms 동안 모아 하나의 이벤트로 보냅니다 (쓰기 횟수 감소).
+    - 보낼 것이 없으면 heartbeat_seconds마다 주석 줄을 보내 연결을 유지합니다.
+    - 이벤트는 크기가 정해진 대기열을 거치므로 클라이언트가 느리면 원본 스트림 읽기도 멈춥니다.
+    - 클라이언트 연결이 끊기면 원본 스트림(LLM 호출)을 닫아 더 이상 토큰을 생성하지 않도록 합니다.
+    """
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+    coalesce_seconds = coalesce_ms / 1000
+
+    async def produce():
+        try:
+            async for event in events:
+                await queue.put(event)
+        except Exception as e:
+            print(f"[SSE] 이벤트 생성 중 오류 발생: {e}")
+            await queue.put({"type": "error", "data": "스트리밍 답변 중 오류가 발생했습니다."})
+        finally:
+            # 취소된 경우에도 원본 제너레이터의 정리 코드(HTTP 스트림 닫기)가 실행되도록 합니다.
+            await events.aclose()
+        await queue.put(_END)
+
+    producer = asyncio.create_task(produce())
+    tokens: list[str] = []
+    tokens_chars = 0
+    flush_at = None
+    first_token = True
+    last_write = loop.time()
+
+    def flush_tokens() -> str:
+        nonlocal tokens, tokens_chars, flush_at
+        frame = format_event({"type": "token", "data": "".join(tokens)})
+        tokens, tokens_chars, flush_at = [], 0, None
+        return frame
+
+    try:
+        while True:
+            now = loop.time()
+            deadline = last_write + heartbeat_seconds
+            if flush_at is not None:
+                deadline = min(deadline, flush_at)
+            try:
+                item = await asyncio.wait_for(queue.get(), timeout=max(0.0, deadline - now))
+            except asyncio.TimeoutError:
+                item = None
+
+            out = []
+            # 이미 도착해 있는 이벤트는 기다리지 않고 함께 처리하여 한 번에 씁니다.
+            while item is not None:
+                if item is _END:
+                    if tokens:
+                        out.append(flush_tokens())
+                    out.append(format_event({"type": "done"}))
+                    yield "".join(out)
+                    return
+                if isinstance(item, dict) and item.get("type") == "token":
+                    tokens.append(item["data"])
+                    tokens_chars += len(item["data"])
+                    if flush_at is None:
+                        flush_at = loop.time() + (0 if first_token else coalesce_seconds)
+                        first_token = False
+                else:
+                    if tokens:
+                        out.append(flush_tokens())
+                    out.append(format_event(item))
+                item = queue.get_nowait() if not queue.empty() else None
+
+            if tokens and (tokens_chars >= max_buffer_chars or loop.time() >= flush_at):
+                out.append(flush_tokens())
+            if not out and loop.time() - last_write >= heartbeat_seconds:
+                if request is not None and await request.is_disconnected():
+                    return
+                out.append(HEARTBEAT)
+            if out:
+                yield "".join(out)
+                last_write = loop.time()
+    finally:
+        # 정상 종료, 클라이언트 연결 끊김(제너레이터 취소/닫힘) 모두에서 원본 스트림을 멈춥니다.
+        producer.cancel()
+        await asyncio.gather(producer, return_exceptions=True)
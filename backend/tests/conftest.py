@@ -0,0 +1,13 @@
+# backend/tests/conftest.py
+# 실행: python -m pytest backend/tests (저장소 루트에서)
+
+import os
+import tempfile
+
+# auth는 import 시점에 SECRET_KEY를 요구하고, database는 DATABASE_URL로 엔진을 만듭니다.
+os.environ.setdefault("SECRET_KEY", "test-secret")
+_directory = tempfile.mkdtemp()
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(_directory, 'test.db')}")
+# 답변 캐시와 BM25 색인도 저장소에 파일을 남기지 않도록 임시 디렉터리에 둡니다.
+os.environ.setdefault("ANSWER_CACHE_PATH", os.path.join(_directory, "answer_cache.db"))
+os.environ.setdefault("LEXICAL_INDEX_PATH", os.path.join(_directory, "lexical_index.db"))
@@ -0,0 +1,19 @@
+# backend/tests/test_answer_cache.py
+
+from backend.answer_cache import AnswerCache
+
+
+def test_answer_is_not_stored_after_note_changes(tmp_path):
+    cache = AnswerCache(str(tmp_path / "answers.db"))
+    vector = [1.0, 0.0, 0.0]
+
+    events, version = cache.lookup(1, vector)
+    assert events is None
+    # 답변을 만드는 동안 소스가 추가되면 이전 내용으로 만든 답변은 저장하지 않습니다.
+    cache.invalidate_note(1)
+    cache.store(1, version, "질문", vector, ["이전 답변"], 10.0)
+    events, version = cache.lookup(1, vector)
+    assert events is None
+
+    cache.store(1, version, "질문", vector, ["새 답변"], 10.0)
+    assert cache.lookup(1, vector) == (["새 답변"], version)
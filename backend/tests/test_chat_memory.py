@@ -0,0 +1,23 @@
+# backend/tests/test_chat_memory.py
+
+import asyncio
+import threading
+
+from langchain_core.language_models import FakeListChatModel
+
+from backend import chat_memory, client_registry, crud
+
+
+def test_summary_is_saved_off_the_event_loop(monkeypatch):
+    saved = []
+    monkeypatch.setattr(client_registry, "get_chat_model", lambda **kwargs: FakeListChatModel(responses=["요약"]))
+    monkeypatch.setattr(crud, "update_chat_summary", lambda db, session_id, summary, summarized_until: saved.append(
+        (threading.current_thread(), summary, summarized_until)))
+    messages = [(i, "user" if i % 2 else "assistant", "긴 대화 " * 400) for i in range(1, 7)]
+    state = chat_memory.ChatSessionState("s", note_id=1, owner_id=1, summary=None, summarized_until=0, messages=messages)
+
+    asyncio.run(chat_memory.summarize(state))
+
+    [(thread, summary, summarized_until)] = saved
+    assert thread is not threading.main_thread()
+    assert summary == "요약" and state.summarized_until == summarized_until
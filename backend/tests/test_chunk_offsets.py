@@ -0,0 +1,77 @@
+# backend/tests/test_chunk_offsets.py
+
+from backend import material_handler, rag_handler
+
+
+def paragraphs(count: int, repeated: str) -> str:
+    # 서로 다른 문단 사이사이에 같은 문단을 반복해서 넣습니다.
+    return "\n\n".join(repeated.strip() if i % 2 else (f"문단 {i}: " + f"고유한 내용 {i} " * 40).strip() for i in range(count))
+
+def test_offsets_point_at_each_chunk_in_repeated_text():
+    text = paragraphs(12, "반복되는 문단입니다. " * 20)
+    chunks = list(rag_handler.iter_chunks([text]))
+    assert len(chunks) >= 4
+    previous = -1
+    for offset, chunk in chunks:
+        assert text[offset:offset + len(chunk)] == chunk
+        assert offset > previous
+        previous = offset
+
+def test_offsets_follow_previous_chunk_not_earliest_repeat():
+    block = "같은 문장이 반복됩니다. " * 60
+    text = "\n\n".join([block] * 4)
+    chunks = list(rag_handler.iter_chunks([text]))
+    offsets = [offset for offset, _ in chunks]
+    assert offsets == sorted(set(offsets))
+    # 두 번째 조각은 첫 조각의 겹침 구간 이후에서 시작합니다.
+    assert offsets[1] >= len(chunks[0][1]) - rag_handler.CHUNK_OVERLAP
+
+def test_offsets_across_stream_windows(monkeypatch):
+    monkeypatch.setattr(rag_handler, "STREAM_WINDOW_CHARS", 3000)
+    text = paragraphs(30, "반복되는 문단입니다. " * 20)
+    pieces = [text[i:i + 700] for i in range(0, len(text), 700)]
+    for offset, chunk in rag_handler.iter_chunks(pieces):
+        assert text[offset:offset + len(chunk)] == chunk
+
+def test_reconstruct_sources_restores_repeated_text():
+    text = paragraphs(10, "반복되는 문단입니다. " * 20)
+    chunks = list(rag_handler.iter_chunks([text]))
+    documents = [chunk for _, chunk in chunks]
+    metadatas = [{"source": "a.txt", "offset": offset} for offset, _ in chunks]
+    sources, unrecovered = rag_handler.reconstruct_sources(
+        documents, metadatas, {"a.txt": [(text[:500], material_handler.fingerprint_text(text))]})
+    assert unrecovered == set()
+    [(source_path, restored, _)] = sources
+    assert source_path == "a.txt"
+    # 분할기가 지운 조각 경계의 공백은 줄바꿈으로 채워지므로 길이와 단어를 비교합니다.
+    assert len(restored) == len(text)
+    assert restored.split() == text.split()
+
+
+def test_reconstruct_sources_checks_fingerprint():
+    # 예전 조각은 반복되는 문단에서 첫 위치를 offset으로 저장했으므로, 합치면 뒷부분이 빠집니다.
+    text = paragraphs(10, "반복되는 문단입니다. " * 20)
+    documents = [chunk for _, chunk in rag_handler.iter_chunks([text])]
+    metadatas = [{"source": "text_input", "offset": text.find(chunk)} for chunk in documents]
+    fingerprint = material_handler.fingerprint_text(text)
+
+    sources, unrecovered = rag_handler.reconstruct_sources(documents, metadatas, {"text_input": [(text[:500], fingerprint)]})
+    assert sources == [] and unrecovered == {"text_input"}
+
+    # 지문이 맞는 Source 내용이 있으면 그 내용으로 복원합니다.
+    sources, unrecovered = rag_handler.reconstruct_sources(documents, metadatas, {"text_input": [("다른 입력", "x"), (text, fingerprint)]})
+    assert unrecovered == set()
+    assert sources == [("text_input", text, None)]
+
+def test_reconstruct_sources_keeps_same_path_sources_apart():
+    # 같은 경로("text_input")의 소스가 둘이면 offset이 겹쳐 조각만으로는 복원할 수 없습니다.
+    first, second = paragraphs(3, "첫 번째 입력입니다. " * 20), paragraphs(3, "두 번째 입력입니다. " * 20)
+    documents, metadatas = [], []
+    for text in (first, second):
+        for offset, chunk in rag_handler.iter_chunks([text]):
+            documents.append(chunk)
+            metadatas.append({"source": "text_input", "offset": offset})
+    stored_sources = {"text_input": [(text[:500], material_handler.fingerprint_text(text)) for text in (first, second)]}
+
+    sources, unrecovered = rag_handler.reconstruct_sources(documents, metadatas, stored_sources)
+    assert sources == [] and unrecovered == {"text_input"}
@@ -0,0 +1,96 @@
+# backend/tests/test_job_duplicates.py
+
+import asyncio
+
+import pytest
+
+from backend import crud, job_handler, material_handler, models, rag_handler, schemas
+from backend.database import Base, SessionLocal, engine
+
+
+def run_text_job(db, note_id: int, user_id: int, text: str) -> models.Job:
+    db_job = crud.create_job(db, "text", {"text": text}, job_handler.JOB_STAGES, note_id=note_id, user_id=user_id)
+    asyncio.run(job_handler._run_job(db, db_job))
+    db.refresh(db_job)
+    return db_job
+
+def empty_material() -> schemas.LearningMaterialCreate:
+    return schemas.LearningMaterialCreate(summary="", key_topics=[], quiz=[], flashcards=[])
+
+@pytest.fixture
+def calls(monkeypatch) -> dict:
+    """생성, 병합, 벡터 저장을 가짜로 바꾸고 호출을 기록합니다. calls["fail_merge"]를 켜면 병합이 실패합니다."""
+    Base.metadata.create_all(bind=engine)
+    calls = {"merged": [], "vectorized": [], "fail_merge": False}
+
+    async def generate(db, db_job, extracted_sources, fingerprint):
+        return empty_material()
+
+    async def merge(db, db_job, db_material, extracted_sources, fingerprints):
+        if calls["fail_merge"]:
+            raise RuntimeError("병합 실패")
+        calls["merged"].append([source_path for _, source_path, _ in extracted_sources])
+        return empty_material()
+
+    def vectorize(note_id, sources):
+        calls["vectorized"].append([source_path for _, source_path, _ in sources])
+
+    monkeypatch.setattr(material_handler, "is_gemini_configured", lambda: True)
+    monkeypatch.setattr(job_handler, "_generate_or_reuse_material", generate)
+    monkeypatch.setattr(job_handler, "_merge_into_note_material", merge)
+    monkeypatch.setattr(rag_handler, "add_sources_to_vector_store", vectorize)
+    return calls
+
+def create_note(db, username: str):
+    user = crud.create_user(db, schemas.UserCreate(username=username, password="x"), hashed_password="x")
+    return user, crud.create_learning_note(db, schemas.LearningNoteCreate(title="중복"), user_id=user.id)
+
+def test_same_source_is_not_stored_or_merged_twice(calls):
+    with SessionLocal() as db:
+        user, note = create_note(db, "dup-user")
+        first = run_text_job(db, note.id, user.id, "같은 내용의   소스입니다.")
+        # 공백만 다른 같은 내용은 같은 지문입니다.
+        second = run_text_job(db, note.id, user.id, "같은 내용의 소스입니다.")
+
+        assert first.status == second.status == "succeeded"
+        assert second.material_id == first.material_id
+        assert second.result == {"duplicate_sources": ["text_input"]}
+        assert len(crud.get_source_texts(db, note.id)["text_input"]) == 1
+        assert calls["vectorized"] == [["text_input"]] and calls["merged"] == []
+        assert {stage["name"]: stage["status"] for stage in second.stages}["store_source"] == "skipped"
+
+def test_failed_job_is_merged_on_retry(calls):
+    with SessionLocal() as db:
+        user, note = create_note(db, "retry-user")
+        assert run_text_job(db, note.id, user.id, "첫 번째 소스입니다.").status == "succeeded"
+
+        calls["fail_merge"] = True
+        assert run_text_job(db, note.id, user.id, "두 번째 소스입니다.").status == "failed"
+        calls["fail_merge"] = False
+        retry = run_text_job(db, note.id, user.id, "두 번째 소스입니다.")
+
+        # 다시 시도하면 남은 Source 행을 그대로 사용하여 병합만 이어서 합니다 (벡터는 이미 저장됨).
+        assert retry.status == "succeeded" and retry.result is None
+        assert calls["merged"] == [["text_input"]]
+        assert calls["vectorized"] == [["text_input"], ["text_input"]]
+        statuses = [status for (status,) in db.query(models.Source.status).filter(models.Source.note_id == note.id)]
+        assert statuses == ["merged", "merged"]
+
+        # 병합된 뒤에는 같은 내용이 중복으로 처리됩니다.
+        again = run_text_job(db, note.id, user.id, "두 번째 소스입니다.")
+        assert again.result == {"duplicate_sources": ["text_input"]}
+        assert calls["merged"] == [["text_input"]]
+
+def test_note_locks_are_released():
+    async def hold(note_id: int, order: list):
+        async with job_handler._note_lock(note_id):
+            order.append(note_id)
+            await asyncio.sleep(0)
+
+    async def main():
+        order = []
+        await asyncio.gather(hold(1, order), hold(1, order), hold(2, order))
+        return order
+
+    assert sorted(asyncio.run(main())) == [1, 1, 2]
+    assert job_handler._note_locks == {}
@@ -0,0 +1,37 @@
+# backend/tests/test_job_note_delete.py
+
+import asyncio
+
+from backend import crud, job_handler, material_handler, models, rag_handler, schemas
+from backend.database import Base, SessionLocal, engine
+
+
+def test_job_stops_when_note_is_deleted(monkeypatch):
+    Base.metadata.create_all(bind=engine)
+    deleted_vectors = []
+
+    async def generate(db, db_job, extracted_sources, fingerprint):
+        # 생성이 진행되는 동안 다른 요청이 노트를 삭제합니다.
+        with SessionLocal() as other:
+            assert crud.delete_note(other, note_id=db_job.note_id, user_id=db_job.owner_id)
+        return schemas.LearningMaterialCreate(summary="", key_topics=[], quiz=[], flashcards=[])
+
+    monkeypatch.setattr(material_handler, "is_gemini_configured", lambda: True)
+    monkeypatch.setattr(job_handler, "_generate_or_reuse_material", generate)
+    monkeypatch.setattr(rag_handler, "add_sources_to_vector_store", lambda note_id, sources: None)
+    monkeypatch.setattr(rag_handler, "delete_note_vectors", deleted_vectors.append)
+
+    with SessionLocal() as db:
+        user = crud.create_user(db, schemas.UserCreate(username="delete-user", password="x"), hashed_password="x")
+        note = crud.create_learning_note(db, schemas.LearningNoteCreate(title="삭제"), user_id=user.id)
+        note_id = note.id
+        db_job = crud.create_job(db, "text", {"text": "삭제될 노트의 소스"}, job_handler.JOB_STAGES, note_id=note_id, user_id=user.id)
+        asyncio.run(job_handler._run_job(db, db_job))
+        db.refresh(db_job)
+
+        # 작업은 실패로 남고 노트와의 연결만 끊기며, 삭제된 노트에 자료나 소스가 다시 생기지 않습니다.
+        assert db_job.status == "failed" and db_job.error == "노트가 삭제되어 작업을 중단했습니다."
+        assert db_job.note_id is None and db_job.material_id is None
+        assert db.query(models.LearningMaterial).filter(models.LearningMaterial.note_id == note_id).count() == 0
+        assert db.query(models.Source).filter(models.Source.note_id == note_id).count() == 0
+        assert deleted_vectors == [note_id]
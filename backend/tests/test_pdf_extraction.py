@@ -0,0 +1,51 @@
+# backend/tests/test_pdf_extraction.py
+
+import asyncio
+import os
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from backend import material_handler
+from backend.benchmarks.fixtures import write_text_pdf
+from backend.executor_handler import BoundedExecutor, ExecutorBusyError
+
+
+@pytest.fixture
+def pdf_path(tmp_path, monkeypatch):
+    monkeypatch.setattr(material_handler, "PDF_PAGES_PER_TASK", 2)
+    path = str(tmp_path / "doc.pdf")
+    write_text_pdf(path, pages=60, lines_per_page=5)
+    return path
+
+def test_concurrent_pdfs_share_the_queue_without_rejections(pdf_path):
+    # 추출한 텍스트는 PDF 옆 파일에 쓰므로 업로드마다 다른 파일을 사용합니다.
+    paths = [shutil.copy(pdf_path, f"{pdf_path}.{i}.pdf") for i in range(4)]
+
+    async def extract_many():
+        executor = BoundedExecutor("test", ThreadPoolExecutor, max_workers=8, max_queue=16)
+        try:
+            results = await asyncio.gather(*(material_handler.extract_pdf_to_file(path, executor=executor)
+                                             for path in paths))
+            return executor, results
+        finally:
+            executor.shutdown()
+
+    executor, results = asyncio.run(extract_many())
+    assert executor.rejected == 0
+    for extracted in results:
+        assert len(extracted.page_offsets) == 60
+        os.remove(extracted.path)
+
+def test_busy_executor_is_not_reported_as_file_error(pdf_path):
+    async def extract():
+        executor = BoundedExecutor("test", ThreadPoolExecutor, max_workers=1, max_queue=0)
+        try:
+            await material_handler.extract_pdf_to_file(pdf_path, executor=executor)
+        finally:
+            executor.shutdown()
+
+    with pytest.raises(ExecutorBusyError):
+        asyncio.run(extract())
+    assert not os.path.exists(pdf_path + material_handler.EXTRACTED_TEXT_SUFFIX)
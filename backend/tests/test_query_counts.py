@@ -0,0 +1,88 @@
+# backend/tests/test_query_counts.py
+"""
+노트 목록, 노트 상세, 채팅 요청이 실행하는 SQL 문 수를 셉니다. 데이터가 많아져도 (N+1 없이) 정해진 수를 넘지 않아야 합니다.
+"""
+
+from contextlib import contextmanager
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+from backend import auth, main, models, rag_handler
+from backend.database import Base, SessionLocal, engine
+
+NOTES, SOURCES_PER_NOTE = 30, 5
+
+
+@contextmanager
+def count_statements():
+    statements = []
+
+    def on_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", on_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", on_execute)
+
+@pytest.fixture(scope="module")
+def seeded() -> dict:
+    Base.metadata.create_all(bind=engine)
+    with SessionLocal() as db:
+        db_user = models.User(username="query-count-user", hashed_password="x")
+        db.add(db_user)
+        db.flush()
+        notes = [models.LearningNote(title=f"note {i}", owner_id=db_user.id) for i in range(NOTES)]
+        db.add_all(notes)
+        db.flush()
+        for note in notes:
+            db.add_all(models.Source(type="text", path=f"source {i}", content="미리보기", note_id=note.id) for i in range(SOURCES_PER_NOTE))
+            db.add(models.LearningMaterial(summary="요약", note_id=note.id))
+        db.commit()
+        return {"user_id": db_user.id, "username": db_user.username, "note_id": notes[-1].id}
+
+@pytest.fixture
+def client(seeded):
+    client = TestClient(main.app)
+    client.headers["Authorization"] = f"Bearer {auth.create_access_token({'sub': seeded['username'], 'uid': seeded['user_id']})}"
+    client.note_id = seeded["note_id"]
+    auth.forget_user(seeded["username"])
+    yield client
+    auth.forget_user(seeded["username"])
+
+def test_note_list_query_count(client):
+    client.get("/api/notes")  # 사용자 캐시 채우기
+    with count_statements() as statements:
+        response = client.get("/api/notes", params={"limit": NOTES})
+    assert response.status_code == 200 and len(response.json()["items"]) == NOTES
+    assert len(statements) == 1
+
+def test_note_detail_query_count(client):
+    client.get("/api/notes")
+    with count_statements() as statements:
+        response = client.get(f"/api/notes/{client.note_id}")
+    assert response.status_code == 200 and len(response.json()["sources"]) == SOURCES_PER_NOTE
+    # 노트 + 소스 (selectinload)
+    assert len(statements) == 2
+
+def test_chat_query_count(client, monkeypatch):
+    async def answer(note_id, question, session=None):
+        yield {"type": "token", "data": "답변"}
+
+    monkeypatch.setattr(rag_handler, "stream_rag_response_from_note", answer)
+    # 사용자 캐시가 비어 있으면 사용자와 노트를 한 번에 읽고, 새 세션을 하나 저장합니다.
+    with count_statements() as statements:
+        response = client.post(f"/api/notes/{client.note_id}/chat", json={"question": "질문"})
+    assert response.status_code == 200
+    assert len(statements) == 2
+
+    with SessionLocal() as db:
+        session_id = db.query(models.ChatSession.id).filter(models.ChatSession.note_id == client.note_id).scalar()
+    # 이어지는 질문은 캐시된 사용자와 메모리의 세션을 사용하므로 노트만 읽습니다.
+    with count_statements() as statements:
+        response = client.post(f"/api/notes/{client.note_id}/chat", json={"question": "질문", "session_id": session_id})
+    assert response.status_code == 200
+    assert len(statements) == 1
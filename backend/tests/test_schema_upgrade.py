@@ -0,0 +1,32 @@
+# backend/tests/test_schema_upgrade.py
+
+from sqlalchemy import create_engine, inspect, text
+
+from backend import database, models  # noqa: F401 (models가 Base.metadata에 테이블을 등록합니다)
+
+
+def test_upgrade_schema_on_database_without_fingerprint(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    with engine.begin() as connection:
+        # fingerprint 열이 추가되기 전 버전의 sources 테이블
+        connection.execute(text(
+            "CREATE TABLE sources (id INTEGER NOT NULL, type VARCHAR NOT NULL, path VARCHAR NOT NULL, content TEXT, "
+            "note_id INTEGER, PRIMARY KEY (id), FOREIGN KEY(note_id) REFERENCES learning_notes (id))"
+        ))
+        connection.execute(text("INSERT INTO sources (type, path, content, note_id) VALUES ('text', 'text_input', '내용', 1)"))
+
+    # 열을 추가하기 전에 인덱스만 만들어도 실패하지 않고 해당 인덱스를 건너뜁니다.
+    database.create_missing_indexes(engine)
+    assert "ix_sources_fingerprint" not in {index["name"] for index in inspect(engine).get_indexes("sources")}
+
+    database.upgrade_schema(engine)
+    database.upgrade_schema(engine)  # 여러 번 실행해도 안전합니다.
+
+    inspector = inspect(engine)
+    assert "fingerprint" in {column["name"] for column in inspector.get_columns("sources")}
+    assert {"ix_sources_fingerprint", "ix_sources_note_id"} <= {index["name"] for index in inspector.get_indexes("sources")}
+    assert "ix_learning_notes_owner_id_id" in {index["name"] for index in inspector.get_indexes("learning_notes")}
+    with engine.connect() as connection:
+        # 이전 버전의 소스는 학습 자료에 반영된 것으로 봅니다.
+        assert connection.execute(text("SELECT path, fingerprint, status FROM sources")).all() == [("text_input", None, "merged")]
+    engine.dispose()
@@ -0,0 +1,87 @@
+# backend/tests/test_vector_compaction.py
+
+import threading
+
+import pytest
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from backend import client_registry, lexical_index, rag_handler
+
+
+@pytest.fixture
+def vector_store_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(rag_handler, "CHROMA_DB_DIRECTORY", str(tmp_path / "chroma"))
+    monkeypatch.setattr(rag_handler, "VECTOR_STORE_LAYOUT", "per_note")
+    monkeypatch.setattr(rag_handler, "get_embeddings_model", lambda: embeddings)
+    monkeypatch.setattr(lexical_index, "_index", lexical_index.LexicalIndex(str(tmp_path / "lexical.db")))
+    return tmp_path
+
+embeddings = DeterministicFakeEmbedding(size=8)
+
+def count_chunks(note_id: int) -> int:
+    return rag_handler.get_note_vector_store(note_id, embeddings)._collection.count()
+
+def text_source(name: str, paragraphs: int = 5) -> tuple[list[str], str, None]:
+    return (["\n\n".join(f"{name} 문단 {i}: " + f"내용 {i} " * 150 for i in range(paragraphs))], name, None)
+
+def test_dirty_collections_are_shared_through_the_store(vector_store_dir):
+    rag_handler.add_sources_to_vector_store(1, [text_source("a.txt"), text_source("b.txt")])
+    rag_handler.delete_source_vectors(1, "a.txt")
+    # 다른 프로세스(manage_vectors)처럼 메모리 상태 없이도 압축할 컬렉션을 찾습니다.
+    assert rag_handler.dirty_collection_names() == ["note_1"]
+
+    remaining = count_chunks(1)
+    assert rag_handler.compact_dirty_collections() == ["note_1"]
+    assert rag_handler.dirty_collection_names() == []
+    assert count_chunks(1) == remaining
+
+def test_compaction_does_not_lose_concurrent_writes(vector_store_dir, monkeypatch):
+    rag_handler.add_sources_to_vector_store(1, [text_source("a.txt")])
+    before = count_chunks(1)
+    copied, written = threading.Event(), threading.Event()
+    evict = client_registry.evict_vector_store
+
+    def evict_after_write(collection_name):
+        # 복사를 마치고 예전 컬렉션을 지우기 직전에 다른 쓰기가 끝나기를 잠시 기다립니다 (잠금이 있으면 쓰기는 압축 뒤로 밀립니다).
+        if not copied.is_set():
+            copied.set()
+            written.wait(timeout=1)
+        evict(collection_name)
+
+    def write():
+        copied.wait()
+        rag_handler.add_sources_to_vector_store(1, [text_source("b.txt")])
+        written.set()
+
+    monkeypatch.setattr(client_registry, "evict_vector_store", evict_after_write)
+    writer = threading.Thread(target=write)
+    writer.start()
+    rag_handler.compact_collection("note_1")
+    writer.join()
+
+    added = len(list(rag_handler.iter_chunks(text_source("b.txt")[0])))
+    assert count_chunks(1) == before + added
+
+def test_failed_write_is_rolled_back_and_raised(vector_store_dir, monkeypatch):
+    rag_handler.add_sources_to_vector_store(1, [text_source("a.txt")])
+    before = count_chunks(1)
+
+    class FailingEmbeddings(DeterministicFakeEmbedding):
+        def embed_documents(self, texts):
+            if self.calls:
+                raise RuntimeError("임베딩 실패")
+            self.calls.append(len(texts))
+            return super().embed_documents(texts)
+
+    failing = FailingEmbeddings(size=8)
+    object.__setattr__(failing, "calls", [])
+    monkeypatch.setattr(rag_handler, "get_embeddings_model", lambda: failing)
+    monkeypatch.setattr(rag_handler, "VECTOR_WRITE_BATCH_SIZE", 2)
+    with pytest.raises(RuntimeError):
+        rag_handler.add_sources_to_vector_store(1, [text_source("b.txt")])
+
+    # 첫 배치는 저장되었다가 되돌려지고, 기존 소스의 조각은 그대로 남습니다.
+    assert failing.calls == [2]
+    assert count_chunks(1) == before
+    sources = {metadata["source"] for metadata in lexical_index.get_lexical_index().documents(1)["metadatas"]}
+    assert sources == {"a.txt"}
@@ -8,6 +8,15 @@ from dotenv import load_dotenv
 # .env 파일에서 환경 변수 로드
 load_dotenv()
 
+# Path(__file__).parent는 현재 파일(tts_handler.py)이 있는 디렉토리를 가리킵니다.
+STATIC_DIRECTORY = Path(__file__).parent / "static"
+
+def audio_file_exists(audio_url: str | None) -> bool:
+    """create_audio_briefing이 반환한 URL의 파일이 아직 디스크에 있는지 확인합니다."""
+    if not audio_url or not audio_url.startswith("/static/"):
+        return False
+    return (STATIC_DIRECTORY / audio_url[len("/static/"):]).is_file()
+
 def create_audio_briefing(text: str) -> str | None:
     """
     요약 텍스트를 받아 OpenAI TTS를 사용하여 오디오 파일을 생성하고,
@@ -22,8 +31,7 @@ def create_audio_briefing(text: str) -> str | None:
         client = OpenAI(api_key=api_key)
 
         # 오디오 파일을 저장할 경로 설정
-        # Path(__file__).parent는 현재 파일(tts_handler.py)이 있는 디렉토리를 가리킵니다.
-        speech_folder_path = Path(__file__).parent / "static" / "audio"
+        speech_folder_path = STATIC_DIRECTORY / "audio"
         speech_folder_path.mkdir(parents=True, exist_ok=True)
         
         # 고유한 파일명 생성
@@ -26,6 +26,8 @@ const ChatInterface: React.FC<ChatInterfaceProps> = ({ noteId }) => {
   const [input, setInput] = useState('');
   const [isLoading, setIsLoading] = useState(false);
   const [error, setError] = useState('');
+  // 서버에 저장된 대화 세션 ID. 후속 질문에 함께 보내 이전 대화를 이어갑니다.
+  const [sessionId, setSessionId] = useState<string | null>(null);
   const token = useAuthStore((state) => state.token);
   const messageListRef = useRef<HTMLDivElement>(null);
 
@@ -35,6 +37,13 @@ const ChatInterface: React.FC<ChatInterfaceProps> = ({ noteId }) => {
     }
   }, [messages]);
 
+  useEffect(() => {
+    // 다른 노트로 이동하면 새 대화를 시작합니다.
+    setMessages([]);
+    setSources([]);
+    setSessionId(null);
+  }, [noteId]);
+
   const handleSubmit = async (e: React.FormEvent) => {
     e.preventDefault();
     if (!input.trim() || isLoading) return;
@@ -52,7 +61,7 @@ const ChatInterface: React.FC<ChatInterfaceProps> = ({ noteId }) => {
       const response = await fetch(`${process.env.REACT_APP_API_URL}/api/notes/${noteId}/chat`, {
         method: 'POST',
         headers: { 'Content-Type': 'application/json', 'Authorization': `Bearer ${token}` },
-        body: JSON.stringify({ question: currentInput }),
+        body: JSON.stringify({ question: currentInput, session_id: sessionId }),
       });
 
       if (!response.ok) {
@@ -69,15 +78,24 @@ const ChatInterface: React.FC<ChatInterfaceProps> = ({ noteId }) => {
         const { value, done } = await reader.read();
         if (done) break;
 
+        // SSE 이벤트는 빈 줄로 구분되며, ':'로 시작하는 줄(연결 유지용)은 무시합니다.
         buffer += decoder.decode(value, { stream: true });
-        const lines = buffer.split('\n');
-        buffer = lines.pop() || '';
+        const frames = buffer.split('\n\n');
+        buffer = frames.pop() || '';
 
-        for (const line of lines) {
-          if (line.trim() === '') continue;
+        for (const frame of frames) {
+          const data = frame
+            .split('\n')
+            .filter((line) => line.startsWith('data:'))
+            .map((line) => line.slice(line.startsWith('data: ') ? 6 : 5))
+            .join('\n');
+          if (data === '') continue;
           try {
-            const parsed = JSON.parse(line);
+            const parsed = JSON.parse(data);
             switch (parsed.type) {
+              case 'session':
+                setSessionId(parsed.data.session_id);
+                break;
               case 'token':
                 setMessages(prev => {
                   const last = prev[prev.length - 1];
@@ -93,7 +111,7 @@ const ChatInterface: React.FC<ChatInterfaceProps> = ({ noteId }) => {
                 break;
             }
           } catch (e) {
-            console.error("Failed to parse stream line:", line, e);
+            console.error("Failed to parse stream event:", frame, e);
           }
         }
       }
@@ -1,4 +1,4 @@
-import React, { useEffect, useState } from 'react';
+import React, { useCallback, useEffect, useState } from 'react';
 import { Link } from 'react-router-dom';
 import { useAuthStore } from '../store/authStore';
 import ErrorMessage from '../components/ErrorMessage';
@@ -8,51 +8,62 @@ import '../App.css';
 interface LearningNote {
   id: number;
   title: string;
+  source_count: number;
+  has_material: boolean;
+}
+
+interface NotePage {
+  items: LearningNote[];
+  next_cursor: string | null;
 }
 
 function DashboardPage() {
   const [notes, setNotes] = useState<LearningNote[]>([]);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
   const [isLoading, setIsLoading] = useState<boolean>(false);
   const [error, setError] = useState<string>('');
   const token = useAuthStore((state) => state.token);
 
-  useEffect(() => {
-    const fetchNotes = async () => {
-      if (!token) {
-        setError('로그인이 필요합니다.');
-        return;
-      }
-
-      setIsLoading(true);
-      setError('');
+  // cursor가 없으면 첫 페이지를 읽어 목록을 새로 채우고, 있으면 다음 페이지를 목록 뒤에 붙입니다.
+  const fetchNotes = useCallback(async (cursor: string | null = null) => {
+    if (!token) {
+      setError('로그인이 필요합니다.');
+      return;
+    }
 
-      try {
-        const response = await fetch(`${process.env.REACT_APP_API_URL}/api/notes`, {
-          method: 'GET',
-          headers: {
-            'Authorization': `Bearer ${token}`,
-          },
-        });
+    setIsLoading(true);
+    setError('');
 
-        if (response.status === 401) {
-          throw new Error('인증이 만료되었습니다. 다시 로그인해주세요.');
-        }
-        if (!response.ok) {
-          throw new Error((await response.json()).detail || '학습 노트를 불러오는 중 오류 발생');
-        }
+    try {
+      const query = cursor ? `?cursor=${encodeURIComponent(cursor)}` : '';
+      const response = await fetch(`${process.env.REACT_APP_API_URL}/api/notes${query}`, {
+        method: 'GET',
+        headers: {
+          'Authorization': `Bearer ${token}`,
+        },
+      });
 
-        const data: LearningNote[] = await response.json();
-        setNotes(data);
-      } catch (err: any) {
-        setError(err.message);
-      } finally {
-        setIsLoading(false);
+      if (response.status === 401) {
+        throw new Error('인증이 만료되었습니다. 다시 로그인해주세요.');
+      }
+      if (!response.ok) {
+        throw new Error((await response.json()).detail || '학습 노트를 불러오는 중 오류 발생');
       }
-    };
 
-    fetchNotes();
+      const data: NotePage = await response.json();
+      setNotes(prev => (cursor ? [...prev, ...data.items] : data.items));
+      setNextCursor(data.next_cursor);
+    } catch (err: any) {
+      setError(err.message);
+    } finally {
+      setIsLoading(false);
+    }
   }, [token]);
 
+  useEffect(() => {
+    fetchNotes();
+  }, [fetchNotes]);
+
   return (
     <header className="App-header">
       <h1>내 학습 노트</h1>
@@ -70,6 +81,9 @@ function DashboardPage() {
         ) : (
           !isLoading && <p>아직 생성된 학습 노트가 없습니다.</p>
         )}
+        {nextCursor && !isLoading && (
+          <button onClick={() => fetchNotes(nextCursor)}>더 보기</button>
+        )}
       </div>
     </header>
   );